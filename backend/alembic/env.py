@@ -21,6 +21,7 @@ from src.apps.interactions.models import Comment, Like
 from src.apps.notifications.models import Notification
 from src.apps.tags.models import Tag, post_tags
 from src.apps.albums.models import Album, AlbumPost
+from src.apps.upload.models import ImageAsset
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,36 @@
+"""feat(notifications): add read watermarks
+
+Revision ID: 3e8a1c5f7d62
+Revises: b7d3f08e4a91
+Create Date: 2026-10-19 13:26:08.514027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e8a1c5f7d62'
+down_revision: Union[str, Sequence[str], None] = 'b7d3f08e4a91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('notification_read_states',
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('scope', sa.String(length=20), nullable=False),
+    sa.Column('last_read_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'scope')
+    )
+    op.create_index('ix_notifications_recipient_created', 'notifications', ['recipient_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notifications_recipient_created', table_name='notifications')
+    op.drop_table('notification_read_states')
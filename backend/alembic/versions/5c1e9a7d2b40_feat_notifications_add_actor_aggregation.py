@@ -0,0 +1,30 @@
+"""feat(notifications): add actor aggregation columns
+
+Revision ID: 5c1e9a7d2b40
+Revises: e96f17da80fd
+Create Date: 2026-10-19 10:12:31.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e9a7d2b40'
+down_revision: Union[str, Sequence[str], None] = 'e96f17da80fd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notifications', sa.Column('actor_count', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('notifications', sa.Column('actor_ids', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('notifications', 'actor_ids')
+    op.drop_column('notifications', 'actor_count')
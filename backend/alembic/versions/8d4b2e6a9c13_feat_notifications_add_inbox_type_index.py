@@ -0,0 +1,28 @@
+"""feat(notifications): add inbox type index
+
+Revision ID: 8d4b2e6a9c13
+Revises: 3e8a1c5f7d62
+Create Date: 2026-10-19 14:02:55.730164
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4b2e6a9c13'
+down_revision: Union[str, Sequence[str], None] = '3e8a1c5f7d62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # (recipient_id, created_at) was added with the read watermarks
+    op.create_index('ix_notifications_recipient_type_created', 'notifications', ['recipient_id', 'type', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notifications_recipient_type_created', table_name='notifications')
@@ -0,0 +1,30 @@
+"""feat(notifications): add outbox dead letter columns
+
+Revision ID: a9e4c7b2d350
+Revises: f7c3a9d1e248
+Create Date: 2026-10-20 10:04:51.227093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e4c7b2d350'
+down_revision: Union[str, Sequence[str], None] = 'f7c3a9d1e248'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notification_outbox', sa.Column('failed_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('notification_outbox', sa.Column('last_error', sa.String(length=500), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('notification_outbox', 'last_error')
+    op.drop_column('notification_outbox', 'failed_at')
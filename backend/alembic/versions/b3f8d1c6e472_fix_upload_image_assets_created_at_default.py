@@ -0,0 +1,37 @@
+"""fix(upload): give image_assets.created_at a server default
+
+Revision ID: b3f8d1c6e472
+Revises: a9e4c7b2d350
+Create Date: 2026-10-20 14:31:08.516204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f8d1c6e472'
+down_revision: Union[str, Sequence[str], None] = 'a9e4c7b2d350'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("UPDATE image_assets SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+    op.alter_column('image_assets', 'created_at',
+               existing_type=sa.DateTime(),
+               type_=sa.DateTime(timezone=True),
+               server_default=sa.func.now(),
+               nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('image_assets', 'created_at',
+               existing_type=sa.DateTime(timezone=True),
+               type_=sa.DateTime(),
+               server_default=None,
+               nullable=True)
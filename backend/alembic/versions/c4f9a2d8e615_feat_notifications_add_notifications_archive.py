@@ -0,0 +1,57 @@
+"""feat(notifications): add notifications archive
+
+Revision ID: c4f9a2d8e615
+Revises: 8d4b2e6a9c13
+Create Date: 2026-10-19 15:18:42.906731
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f9a2d8e615'
+down_revision: Union[str, Sequence[str], None] = '8d4b2e6a9c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('notifications_archive',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('recipient_id', sa.String(length=36), nullable=False),
+    sa.Column('sender_id', sa.String(length=36), nullable=True),
+    sa.Column('type', sa.Enum('LIKE', 'COMMENT', 'FOLLOW', 'SYSTEM', name='notificationtype'), nullable=False),
+    sa.Column('post_id', sa.String(length=36), nullable=True),
+    sa.Column('comment_id', sa.String(length=36), nullable=True),
+    sa.Column('content', sa.Text(), nullable=True),
+    sa.Column('actor_count', sa.Integer(), server_default='1', nullable=False),
+    sa.Column('actor_ids', sa.JSON(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id', 'created_at')
+    )
+    op.create_index('ix_notifications_archive_recipient_created', 'notifications_archive', ['recipient_id', 'created_at'], unique=False)
+    op.create_index('ix_notifications_created_at', 'notifications', ['created_at'], unique=False)
+
+    if op.get_bind().dialect.name == 'mysql':
+        # Monthly RANGE partitions; the retention job adds upcoming months
+        # by splitting p_future and drops expired ones.
+        month = date.today().replace(day=1)
+        next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        op.execute(
+            "ALTER TABLE notifications_archive PARTITION BY RANGE (TO_DAYS(created_at)) ("
+            f"PARTITION p{month:%Y%m} VALUES LESS THAN (TO_DAYS('{next_month:%Y-%m-%d}')), "
+            "PARTITION p_future VALUES LESS THAN MAXVALUE)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notifications_created_at', table_name='notifications')
+    op.drop_index('ix_notifications_archive_recipient_created', table_name='notifications_archive')
+    op.drop_table('notifications_archive')
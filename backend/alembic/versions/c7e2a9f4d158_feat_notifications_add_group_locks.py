@@ -0,0 +1,34 @@
+"""feat(notifications): add group locks
+
+Revision ID: c7e2a9f4d158
+Revises: b3f8d1c6e472
+Create Date: 2026-10-21 10:12:37.284519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2a9f4d158'
+down_revision: Union[str, Sequence[str], None] = 'b3f8d1c6e472'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('notification_group_locks',
+    sa.Column('recipient_id', sa.String(length=36), nullable=False),
+    sa.ForeignKeyConstraint(['recipient_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('recipient_id')
+    )
+    # Existing users get their row up front, so only new users race to create one
+    op.execute("INSERT INTO notification_group_locks (recipient_id) SELECT id FROM users")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('notification_group_locks')
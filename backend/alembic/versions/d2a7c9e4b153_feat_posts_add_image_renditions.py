@@ -0,0 +1,28 @@
+"""feat(posts): add image renditions
+
+Revision ID: d2a7c9e4b153
+Revises: c4f9a2d8e615
+Create Date: 2026-10-19 16:40:12.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7c9e4b153'
+down_revision: Union[str, Sequence[str], None] = 'c4f9a2d8e615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('post_images', sa.Column('renditions', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('post_images', 'renditions')
@@ -0,0 +1,40 @@
+"""feat(upload): add image assets
+
+Revision ID: e5b81f3c6a27
+Revises: d2a7c9e4b153
+Create Date: 2026-10-19 18:05:37.442918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b81f3c6a27'
+down_revision: Union[str, Sequence[str], None] = 'd2a7c9e4b153'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('image_assets',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('object_key', sa.String(length=255), nullable=False),
+    sa.Column('content_type', sa.String(length=50), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('width', sa.Integer(), nullable=True),
+    sa.Column('height', sa.Integer(), nullable=True),
+    sa.Column('exif', sa.JSON(), nullable=True),
+    sa.Column('tags', sa.JSON(), nullable=True),
+    sa.Column('renditions', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('image_assets')
@@ -0,0 +1,32 @@
+"""feat(posts): add image ai columns
+
+Revision ID: f7c3a9d1e248
+Revises: e5b81f3c6a27
+Create Date: 2026-10-19 21:12:08.530417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c3a9d1e248'
+down_revision: Union[str, Sequence[str], None] = 'e5b81f3c6a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('post_images', sa.Column('ai_tags', sa.JSON(), nullable=True))
+    op.add_column('post_images', sa.Column('ai_labels_version', sa.String(length=16), nullable=True))
+    op.add_column('post_images', sa.Column('embedding', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('post_images', 'embedding')
+    op.drop_column('post_images', 'ai_labels_version')
+    op.drop_column('post_images', 'ai_tags')
@@ -0,0 +1,60 @@
+import os
+
+import torch
+from src.core.config import settings
+
+# The CLIP vision encoder behind ImageTagger. Both backends take the
+# processor's pixel_values and return (unnormalized) image embeddings, so the
+# tagger scores them the same way whichever runs.
+
+ONNX_INPUT = "pixel_values"
+ONNX_OUTPUT = "image_embeds"
+
+
+class TorchVisionBackend:
+    name = "torch"
+
+    def __init__(self, model, device: str):
+        self.model = model
+        self.device = device
+
+    def image_features(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad():
+            return self.model.get_image_features(pixel_values=pixel_values.to(self.device))
+
+
+class OnnxVisionBackend:
+    """
+    The exported vision encoder (see `python -m src.apps.ai.export_onnx`) on
+    ONNX Runtime's CPU provider, optionally int8-quantized.
+    """
+    name = "onnx"
+
+    def __init__(self, path: str):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise RuntimeError("AI_BACKEND=onnx needs the onnx extra (onnxruntime)") from e
+        if not os.path.exists(path):
+            raise RuntimeError(f"ONNX vision encoder not found at {path}; run python -m src.apps.ai.export_onnx")
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if settings.AI_ONNX_THREADS:
+            options.intra_op_num_threads = settings.AI_ONNX_THREADS
+        self.path = path
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def image_features(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        (embeddings,) = self.session.run([ONNX_OUTPUT], {ONNX_INPUT: pixel_values.cpu().numpy()})
+        return torch.from_numpy(embeddings)
+
+
+def onnx_model_path(model_root: str, quantized: bool) -> str:
+    return os.path.join(model_root, "clip-vision-int8.onnx" if quantized else "clip-vision.onnx")
+
+
+def create_backend(model, device: str, model_root: str):
+    if settings.AI_BACKEND == "onnx":
+        return OnnxVisionBackend(settings.AI_ONNX_MODEL or onnx_model_path(model_root, settings.AI_ONNX_QUANTIZED))
+    return TorchVisionBackend(model, device)
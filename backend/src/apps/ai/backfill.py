@@ -0,0 +1,343 @@
+"""
+Re-tag existing post images and store their CLIP embeddings.
+
+    python -m src.apps.ai.backfill [--batch-size 16] [--concurrency 8] [--buffer-mb 256] [--force]
+
+Run it after changing LABELS_MAP, TAG_CATEGORIES or the CLIP model: every
+PostImage whose ai_labels_version isn't the current labels fingerprint is
+processed (all of them with --force). Images flow through a pipeline with
+bounded queues between stages, so memory stays flat however many there are:
+
+    database chunks -> concurrent downloads -> decode threads -> batched inference -> database
+
+Downloaded originals (up to 20 MB each) waiting for a decode thread are
+bounded by their total size (--buffer-mb), not by count.
+
+Progress is checkpointed after each completed chunk; an interrupted run
+resumes where it stopped. Throughput is reported in images per second.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence
+
+from PIL import Image
+from sqlalchemy import or_, select, update
+from src.apps.ai.cache import pack_embedding
+from src.apps.ai.labels import labels_fingerprint
+from src.apps.posts.models import PostImage
+from src.apps.upload.pipeline import process_image
+from src.utils.storage import ObjectStorage
+
+_DONE = None  # end-of-stream marker passed down the queues
+
+
+@dataclass
+class BackfillItem:
+    id: str
+    image_path: str
+    chunk: int
+    data: Optional[bytes] = None
+    image: Optional[Image.Image] = None
+
+
+@dataclass
+class BackfillStats:
+    processed: int = 0
+    failed: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    def images_per_second(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return (self.processed + self.failed) / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return f"{self.processed} images tagged, {self.failed} failed, {self.images_per_second():.1f} images/s"
+
+
+class ByteBudget:
+    """
+    Caps the total size of buffered items. An item larger than the whole
+    budget still goes through, on its own.
+    """
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._changed = asyncio.Condition()
+
+    async def acquire(self, size: int):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.used == 0 or self.used + size <= self.limit)
+            self.used += size
+
+    async def release(self, size: int):
+        async with self._changed:
+            self.used -= size
+            self._changed.notify_all()
+
+
+class Checkpoint:
+    """Last fully processed PostImage id, per labels version, in a JSON file."""
+    def __init__(self, path: Optional[str], version: str, restart: bool = False):
+        self.path = path
+        self.version = version
+        self.last_id: Optional[str] = None
+        if path and not restart and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state.get("version") == version:
+                self.last_id = state.get("last_id")
+
+    def save(self, last_id: str, stats: BackfillStats):
+        self.last_id = last_id
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "version": self.version,
+                "last_id": last_id,
+                "processed": stats.processed,
+                "failed": stats.failed,
+            }, f)
+        os.replace(tmp_path, self.path)
+
+
+class Backfill:
+    def __init__(
+        self,
+        session_factory,
+        storage: ObjectStorage,
+        analyze_batch: Callable[[List[Image.Image]], Sequence[dict]],
+        checkpoint: Checkpoint,
+        batch_size: int = 16,
+        chunk_size: int = 500,
+        concurrency: int = 8,
+        decode_workers: int = 2,
+        buffer_bytes: int = 256 * 1024 * 1024,
+        force: bool = False,
+        report_interval: float = 10.0,
+    ):
+        self.session_factory = session_factory
+        self.storage = storage
+        self.analyze_batch = analyze_batch
+        self.checkpoint = checkpoint
+        self.version = checkpoint.version
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.decode_workers = decode_workers
+        # Downloaded originals waiting for a decode thread
+        self.buffered = ByteBudget(buffer_bytes)
+        self.force = force
+        self.report_interval = report_interval
+        self.stats = BackfillStats()
+        # chunk -> [last id, items not yet written]; checkpoints advance in chunk order
+        self._chunks: "OrderedDict[int, list]" = OrderedDict()
+        self._last_report = time.perf_counter()
+
+    async def run(self) -> BackfillStats:
+        # Bounded queues: a slow stage holds back the ones before it
+        fetch_q: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        # Bounded by bytes (self.buffered): entries are whole originals
+        decode_q: asyncio.Queue = asyncio.Queue()
+        infer_q: asyncio.Queue = asyncio.Queue(maxsize=self.batch_size * 2)
+        write_q: asyncio.Queue = asyncio.Queue(maxsize=4)
+
+        async def stage(workers: int, worker, downstream: asyncio.Queue, downstream_workers: int):
+            await asyncio.gather(*(worker() for _ in range(workers)))
+            for _ in range(downstream_workers):
+                await downstream.put(_DONE)
+
+        await asyncio.gather(
+            stage(1, lambda: self._produce(fetch_q), fetch_q, self.concurrency),
+            stage(self.concurrency, lambda: self._fetch(fetch_q, decode_q, write_q), decode_q, self.decode_workers),
+            stage(self.decode_workers, lambda: self._decode(decode_q, infer_q, write_q), infer_q, 1),
+            stage(1, lambda: self._infer(infer_q, write_q), write_q, 1),
+            self._write(write_q),
+        )
+        return self.stats
+
+    async def _produce(self, fetch_q: asyncio.Queue):
+        last_id = self.checkpoint.last_id
+        chunk = 0
+        while True:
+            query = select(PostImage.id, PostImage.image_path).order_by(PostImage.id).limit(self.chunk_size)
+            if last_id is not None:
+                query = query.where(PostImage.id > last_id)
+            if not self.force:
+                query = query.where(or_(
+                    PostImage.ai_labels_version.is_(None), PostImage.ai_labels_version != self.version
+                ))
+            async with self.session_factory() as db:
+                rows = (await db.execute(query)).all()
+            if not rows:
+                return
+
+            last_id = rows[-1].id
+            self._chunks[chunk] = [last_id, len(rows)]
+            for row in rows:
+                await fetch_q.put(BackfillItem(id=row.id, image_path=row.image_path, chunk=chunk))
+            chunk += 1
+
+    async def _fetch(self, fetch_q: asyncio.Queue, decode_q: asyncio.Queue, write_q: asyncio.Queue):
+        while (item := await fetch_q.get()) is not _DONE:
+            key = self.storage.key_from_url(item.image_path)
+            if key is None:
+                print(f"Backfill: {item.id} has no stored object ({item.image_path})")
+                await write_q.put([(item, None)])
+                continue
+            try:
+                buffer = io.BytesIO()
+                await self.storage.download_to(key, buffer)
+                item.data = buffer.getvalue()
+            except Exception as e:
+                print(f"Backfill: downloading {key} failed: {e}")
+                await write_q.put([(item, None)])
+                continue
+            await self.buffered.acquire(len(item.data))
+            await decode_q.put(item)
+
+    async def _decode(self, decode_q: asyncio.Queue, infer_q: asyncio.Queue, write_q: asyncio.Queue):
+        while (item := await decode_q.get()) is not _DONE:
+            try:
+                # No renditions: only the model input, at reduced decode scale
+                processed = await asyncio.to_thread(process_image, io.BytesIO(item.data))
+            except Exception as e:
+                print(f"Backfill: decoding {item.id} failed: {e}")
+                processed = None
+            await self.buffered.release(len(item.data))
+            item.data = None
+            if processed is None or processed.model_input is None:
+                await write_q.put([(item, None)])
+                continue
+            item.image = processed.model_input
+            await infer_q.put(item)
+
+    async def _infer(self, infer_q: asyncio.Queue, write_q: asyncio.Queue):
+        finished = False
+        while not finished:
+            item = await infer_q.get()
+            if item is _DONE:
+                return
+            batch = [item]
+            # Whatever is already decoded joins the batch; never wait for more
+            while len(batch) < self.batch_size and not infer_q.empty():
+                item = infer_q.get_nowait()
+                if item is _DONE:
+                    finished = True
+                    break
+                batch.append(item)
+
+            try:
+                results = await asyncio.to_thread(self.analyze_batch, [item.image for item in batch])
+            except Exception as e:
+                print(f"Backfill: inference failed for {len(batch)} images: {e}")
+                results = [None] * len(batch)
+            for item in batch:
+                item.image = None
+            await write_q.put(list(zip(batch, results)))
+
+    async def _write(self, write_q: asyncio.Queue):
+        while (results := await write_q.get()) is not _DONE:
+            updates = [
+                {
+                    "id": item.id,
+                    "ai_tags": result["tags"],
+                    "ai_labels_version": self.version,
+                    "embedding": pack_embedding(result["embedding"]),
+                }
+                for item, result in results
+                if result is not None and result.get("embedding") is not None
+            ]
+            if updates:
+                async with self.session_factory() as db:
+                    await db.execute(update(PostImage), updates)
+                    await db.commit()
+
+            self.stats.processed += len(updates)
+            self.stats.failed += len(results) - len(updates)
+            for item, _ in results:
+                self._chunks[item.chunk][1] -= 1
+            self._advance_checkpoint()
+            self._report()
+
+        print(f"Backfill done: {self.stats.summary()}")
+
+    def _advance_checkpoint(self):
+        last_done = None
+        while self._chunks:
+            chunk, (last_id, remaining) = next(iter(self._chunks.items()))
+            if remaining > 0:
+                break
+            self._chunks.pop(chunk)
+            last_done = last_id
+        if last_done is not None:
+            self.checkpoint.save(last_done, self.stats)
+
+    def _report(self):
+        now = time.perf_counter()
+        if now - self._last_report >= self.report_interval:
+            self._last_report = now
+            print(f"Backfill: {self.stats.summary()}")
+
+
+def _load_model():
+    from src.apps.ai.model import tagger
+
+    tagger.load_model()
+
+
+def _analyze_batch(images):
+    from src.apps.ai.model import tagger
+
+    return tagger.analyze_batch(images)
+
+
+async def main(argv=None):
+    from src.database.session import SessionLocal
+    from src.utils.storage import close_storage, get_storage
+
+    parser = argparse.ArgumentParser(description="Re-tag post images and store their CLIP embeddings.")
+    parser.add_argument("--batch-size", type=int, default=16, help="images per forward pass")
+    parser.add_argument("--chunk-size", type=int, default=500, help="rows read from the database at a time")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent downloads")
+    parser.add_argument("--decode-workers", type=int, default=2)
+    parser.add_argument("--buffer-mb", type=int, default=256, help="downloaded originals held for decoding")
+    parser.add_argument("--checkpoint", default="ai-backfill.checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint")
+    parser.add_argument("--force", action="store_true", help="redo images already at the current labels version")
+    args = parser.parse_args(argv)
+
+    checkpoint = Checkpoint(args.checkpoint, labels_fingerprint(), restart=args.restart)
+    if checkpoint.last_id:
+        print(f"Resuming after {checkpoint.last_id}")
+
+    # Load the model before the clock starts
+    await asyncio.to_thread(_load_model)
+
+    backfill = Backfill(
+        SessionLocal,
+        get_storage(),
+        _analyze_batch,
+        checkpoint,
+        batch_size=args.batch_size,
+        chunk_size=args.chunk_size,
+        concurrency=args.concurrency,
+        decode_workers=args.decode_workers,
+        buffer_bytes=args.buffer_mb * 1024 * 1024,
+        force=args.force,
+    )
+    try:
+        await backfill.run()
+    finally:
+        await close_storage()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
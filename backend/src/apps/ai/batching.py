@@ -0,0 +1,134 @@
+import asyncio
+import time
+from typing import Any, Callable, List, Optional, Sequence, Set
+
+from src.core.config import settings
+from src.utils.metrics import Histogram
+
+batch_size_histogram = Histogram(
+    "ai_inference_batch_size", "Images per inference forward pass", labelnames=("model",),
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+queue_wait_histogram = Histogram(
+    "ai_inference_queue_wait_seconds", "Time a request waited for its inference batch to start",
+    labelnames=("model",)
+)
+
+
+class InferenceBatcher:
+    """
+    Collects concurrent inference requests into batches: a batch starts once
+    `max_batch_size` requests are waiting or `max_wait` seconds after its first
+    request, whichever comes first. Up to `concurrency` batches run at once in
+    worker threads; while they are busy, arriving requests form the next batch.
+
+    `run_batch` is blocking and maps a list of inputs to a list of results in
+    the same order.
+    """
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: Optional[int] = None,
+        max_wait: Optional[float] = None,
+        name: str = "clip",
+        concurrency: int = 1,
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size or settings.AI_BATCH_MAX_SIZE)
+        self.max_wait = max_wait if max_wait is not None else settings.AI_BATCH_MAX_WAIT_MS / 1000
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running: Set[asyncio.Task] = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((time.perf_counter(), item, future))
+        return await future
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._running):
+            task.cancel()
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, _, future = self._queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+            self._queue = None
+
+    async def _collect(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Callers that gave up (timeouts, disconnects) don't take a slot in the forward pass
+        return [entry for entry in batch if not entry[2].done()]
+
+    async def _run(self):
+        while True:
+            # Only collect once a batch can start, so waiting requests keep joining it
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            if not batch:
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._execute(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, batch: list):
+        try:
+            started = time.perf_counter()
+            for enqueued_at, _, _ in batch:
+                queue_wait_histogram.observe(started - enqueued_at, model=self.name)
+            batch_size_histogram.observe(len(batch), model=self.name)
+
+            try:
+                results = await asyncio.to_thread(self.run_batch, [item for _, item, _ in batch])
+            except asyncio.CancelledError:
+                for _, _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
@@ -0,0 +1,108 @@
+import array
+import base64
+import hashlib
+import json
+from collections import OrderedDict
+from typing import List, Optional
+
+from PIL import Image
+from redis.exceptions import RedisError
+from src.apps.ai.labels import labels_fingerprint
+from src.core.config import settings
+from src.database.redis import redis_client
+from src.utils.metrics import Counter
+
+# Tags and embeddings by content hash of the decoded model input, so the same
+# picture (a retry, a re-upload, an edit that only touched metadata) skips
+# inference. A small in-process LRU answers repeats first; Redis shares results
+# between workers and restarts. Keys include the label fingerprint and the
+# vision encoder variant (backend, and which ONNX export), so changing either
+# starts a fresh cache. In remote mode the variant is the inference worker's.
+
+cache_requests = Counter(
+    "ai_cache_requests", "Tag/embedding cache lookups", labelnames=("result", "tier")
+)
+
+_local: "OrderedDict[str, dict]" = OrderedDict()
+
+
+def pixel_hash(image: Image.Image) -> str:
+    """SHA-256 of the decoded pixels, independent of file format and metadata."""
+    digest = hashlib.sha256(f"{image.mode}:{image.width}x{image.height}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def backend_variant() -> str:
+    """The vision encoder this process's settings select; results differ between variants."""
+    if settings.AI_BACKEND != "onnx":
+        return settings.AI_BACKEND
+    if settings.AI_ONNX_MODEL:
+        return "onnx-" + hashlib.sha256(settings.AI_ONNX_MODEL.encode()).hexdigest()[:12]
+    return "onnx-int8" if settings.AI_ONNX_QUANTIZED else "onnx-fp32"
+
+
+def _key(content_hash: str, variant: Optional[str] = None) -> str:
+    return f"ai:analysis:{variant or backend_variant()}:{labels_fingerprint()}:{content_hash}"
+
+
+def pack_embedding(embedding: List[float]) -> bytes:
+    """float32 bytes: a quarter of the embedding's JSON size."""
+    return array.array("f", embedding).tobytes()
+
+
+def unpack_embedding(data: bytes) -> List[float]:
+    embedding = array.array("f")
+    embedding.frombytes(data)
+    return embedding.tolist()
+
+
+def _encode(result: dict) -> str:
+    embedding = base64.b64encode(pack_embedding(result["embedding"])).decode("ascii")
+    return json.dumps({"tags": result["tags"], "embedding": embedding})
+
+
+def _decode(raw) -> dict:
+    data = json.loads(raw)
+    return {"tags": data["tags"], "embedding": unpack_embedding(base64.b64decode(data["embedding"]))}
+
+
+def _remember(key: str, result: dict):
+    _local[key] = result
+    _local.move_to_end(key)
+    while len(_local) > settings.AI_CACHE_LOCAL_SIZE:
+        _local.popitem(last=False)
+
+
+async def get_analysis(content_hash: str, variant: Optional[str] = None) -> Optional[dict]:
+    key = _key(content_hash, variant)
+    result = _local.get(key)
+    if result is not None:
+        _local.move_to_end(key)
+        cache_requests.inc(result="hit", tier="local")
+        return result
+
+    try:
+        raw = await redis_client.get(key)
+        if raw is not None:
+            result = _decode(raw)
+            _remember(key, result)
+            cache_requests.inc(result="hit", tier="redis")
+            return result
+    except RedisError as e:
+        print(f"AI cache read failed: {e}")
+
+    cache_requests.inc(result="miss", tier="")
+    return None
+
+
+async def set_analysis(content_hash: str, result: dict, variant: Optional[str] = None) -> None:
+    """Only complete results are cached; a failed inference is retried next time."""
+    if result.get("embedding") is None:
+        return
+    key = _key(content_hash, variant)
+    _remember(key, result)
+    try:
+        await redis_client.set(key, _encode(result), ex=settings.AI_CACHE_TTL)
+    except RedisError as e:
+        print(f"AI cache write failed: {e}")
@@ -0,0 +1,84 @@
+import asyncio
+from typing import List, Optional, Tuple
+
+from PIL import Image
+from src.apps.ai.protocol import encode_image, read_frame, write_frame
+from src.core.config import settings
+
+
+class InferenceUnavailable(Exception):
+    pass
+
+
+class RemoteTagger:
+    """
+    Client of the inference worker (src/apps/ai/worker.py). Keeps a few idle
+    unix socket connections for reuse; every request is bounded by
+    AI_REQUEST_TIMEOUT. Raises InferenceUnavailable when the worker is down,
+    overloaded or too slow.
+
+    `variant` is the worker's vision encoder (see cache.backend_variant), as
+    last reported by a ping or an analysis; None until the worker has answered.
+    """
+    def __init__(self, socket_path: Optional[str] = None, timeout: Optional[float] = None, max_idle: int = 8):
+        self.socket_path = socket_path or settings.AI_WORKER_SOCKET
+        self.timeout = timeout if timeout is not None else settings.AI_REQUEST_TIMEOUT
+        self.max_idle = max_idle
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self.variant: Optional[str] = None
+
+    async def _connection(self):
+        if self._idle:
+            return self._idle.pop()
+        return await asyncio.open_unix_connection(self.socket_path)
+
+    def _release(self, connection):
+        if len(self._idle) < self.max_idle:
+            self._idle.append(connection)
+        else:
+            connection[1].close()
+
+    async def _request(self, header: dict, body: bytes) -> dict:
+        reader, writer = await self._connection()
+        try:
+            await write_frame(writer, header, body)
+            response, _ = await read_frame(reader)
+        except BaseException:
+            # Timed out or broken mid-request: the connection's state is unknown
+            writer.close()
+            raise
+        self._release((reader, writer))
+        return response
+
+    async def analyze(self, image) -> dict:
+        """{"tags": [...], "embedding": [...]} for one image."""
+        if not isinstance(image, Image.Image):
+            image = await asyncio.to_thread(lambda: Image.open(image).convert("RGB"))
+        header, body = encode_image(image)
+        try:
+            response = await asyncio.wait_for(self._request(header, body), self.timeout)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+            raise InferenceUnavailable(f"inference worker unavailable: {e!r}") from e
+        if "error" in response:
+            raise InferenceUnavailable(f"inference worker: {response['error']}")
+        self.variant = response.pop("variant", self.variant)
+        return response
+
+    async def ping(self) -> bool:
+        try:
+            response = await asyncio.wait_for(self._request({"op": "ping"}, b""), self.timeout)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            return False
+        self.variant = response.get("variant", self.variant)
+        return bool(response.get("ok"))
+
+    async def backend_variant(self) -> Optional[str]:
+        """The worker's encoder variant, asking the worker the first time."""
+        if self.variant is None:
+            await self.ping()
+        return self.variant
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
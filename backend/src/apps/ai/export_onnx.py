@@ -0,0 +1,170 @@
+"""
+Export the CLIP vision encoder to ONNX, optionally quantize it to int8, and
+check the exported model's tags against PyTorch on a fixed image set.
+
+    python -m src.apps.ai.export_onnx --quantize [--images path/to/more/images]
+
+Then set AI_BACKEND=onnx (and AI_ONNX_QUANTIZED to match). Needs the `onnx`
+extra (uv sync --extra onnx) in addition to the usual torch/transformers.
+"""
+import argparse
+import os
+import random
+import sys
+from typing import List, Tuple
+
+import torch
+from PIL import Image, ImageDraw
+from src.apps.ai.backends import ONNX_INPUT, ONNX_OUTPUT, OnnxVisionBackend, TorchVisionBackend, onnx_model_path
+from src.apps.ai.model import MODEL_ROOT, tagger
+from src.core.config import settings
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+REFERENCE_SEED = 20261019
+
+
+class VisionEncoder(torch.nn.Module):
+    """pixel_values -> image embeddings, the part of CLIP run per image."""
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model.get_image_features(pixel_values=pixel_values)
+
+
+def export(model, image_size: int, path: str, opset: int):
+    """`model` is a CLIPModel on the CPU; `image_size` its processor's crop size."""
+    dummy = torch.randn(1, 3, image_size, image_size)
+    torch.onnx.export(
+        VisionEncoder(model).eval(),
+        (dummy,),
+        path,
+        input_names=[ONNX_INPUT],
+        output_names=[ONNX_OUTPUT],
+        dynamic_axes={ONNX_INPUT: {0: "batch"}, ONNX_OUTPUT: {0: "batch"}},
+        opset_version=opset,
+    )
+
+
+def quantize(source: str, target: str):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    # Dynamic quantization: int8 weights, activations quantized at run time; no calibration set needed
+    quantize_dynamic(source, target, weight_type=QuantType.QInt8)
+
+
+def reference_images(count: int = 32, size: int = 224) -> List[Tuple[str, Image.Image]]:
+    """
+    The fixed check set: flat colours, gradients and overlapping shapes drawn
+    from a seeded generator, so every export is compared on the same pixels.
+    """
+    rng = random.Random(REFERENCE_SEED)
+    images = []
+    for i in range(count):
+        image = Image.new("RGB", (size, size), tuple(rng.randrange(256) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        if i % 4 == 1:
+            start, end = [tuple(rng.randrange(256) for _ in range(3)) for _ in range(2)]
+            for y in range(size):
+                t = y / max(1, size - 1)
+                draw.line([(0, y), (size, y)], fill=tuple(round(a + (b - a) * t) for a, b in zip(start, end)))
+        for _ in range(rng.randint(1, 6)):
+            x0, x1 = sorted(rng.randrange(size) for _ in range(2))
+            y0, y1 = sorted(rng.randrange(size) for _ in range(2))
+            fill = tuple(rng.randrange(256) for _ in range(3))
+            shape = rng.choice(("rectangle", "ellipse", "line"))
+            if shape == "line":
+                draw.line([(x0, y0), (x1, y1)], fill=fill, width=rng.randint(1, max(1, size // 16)))
+            else:
+                getattr(draw, shape)([x0, y0, x1, y1], fill=fill)
+        images.append((f"reference-{i:02d}", image))
+    return images
+
+
+def load_images(image_dir: str) -> List[Tuple[str, Image.Image]]:
+    images = []
+    for name in sorted(os.listdir(image_dir)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            with Image.open(os.path.join(image_dir, name)) as img:
+                images.append((name, img.convert("RGB")))
+    return images
+
+
+def check(path: str, images: List[Tuple[str, Image.Image]], min_agreement: float) -> bool:
+    """
+    Tags and embeddings of `images` from PyTorch and from the ONNX model.
+    Passes when the share of images with identical tags reaches `min_agreement`.
+    """
+    if not images:
+        print("No images to check")
+        return False
+
+    torch_backend = TorchVisionBackend(tagger.model, tagger.device)
+    onnx_backend = OnnxVisionBackend(path)
+    matches = 0
+    similarities = []
+    try:
+        for name, image in images:
+            pixel_values = tagger.processor(images=image, return_tensors="pt")["pixel_values"]
+            expected_embedding = torch_backend.image_features(pixel_values).cpu()
+            actual_embedding = onnx_backend.image_features(pixel_values)
+            similarities.append(torch.nn.functional.cosine_similarity(expected_embedding, actual_embedding).item())
+
+            tagger.backend = torch_backend
+            expected = tagger.predict(image)
+            tagger.backend = onnx_backend
+            actual = tagger.predict(image)
+            if expected == actual:
+                matches += 1
+            else:
+                print(f"  {name}: torch {expected} / onnx {actual}")
+    finally:
+        tagger.backend = torch_backend
+
+    agreement = matches / len(images)
+    print(
+        f"{len(images)} images: tag agreement {agreement:.1%}, "
+        f"embedding cosine similarity min {min(similarities):.4f} mean {sum(similarities) / len(similarities):.4f}"
+    )
+    return agreement >= min_agreement
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output-dir", default=MODEL_ROOT)
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--quantize", action="store_true", help="also write the int8 model")
+    parser.add_argument("--images", metavar="IMAGE_DIR", help="also compare tags with PyTorch on these images")
+    parser.add_argument("--skip-check", action="store_true", help="don't compare the export with PyTorch")
+    parser.add_argument("--min-agreement", type=float, default=0.9)
+    args = parser.parse_args(argv)
+
+    # The reference is always PyTorch, whatever the configured backend
+    settings.AI_BACKEND = "torch"
+    tagger.load_model()
+
+    fp32_path = onnx_model_path(args.output_dir, quantized=False)
+    print(f"Exporting vision encoder to {fp32_path}...")
+    export(tagger.model.cpu(), tagger.processor.image_processor.crop_size["height"], fp32_path, args.opset)
+    tagger.model.to(tagger.device)
+    exported = [fp32_path]
+
+    if args.quantize:
+        int8_path = onnx_model_path(args.output_dir, quantized=True)
+        print(f"Quantizing to {int8_path}...")
+        quantize(fp32_path, int8_path)
+        exported.append(int8_path)
+
+    if args.skip_check:
+        return 0
+    images = reference_images() + (load_images(args.images) if args.images else [])
+    ok = True
+    for path in exported:
+        print(f"Checking {path}")
+        ok = check(path, images, args.min_agreement) and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import hashlib
+import json
+from functools import lru_cache
+
+from src.common.constants import TAG_CATEGORIES
+
+# Define our labels based on centralized config
+# We need to map English keywords (for CLIP) to Chinese tags (for our app)
+# Since TAG_CATEGORIES only has Chinese, we might need to enhance the constants or keep a mapping here.
+# For now, let's keep the mapping here but validate against TAG_CATEGORIES if needed, 
+# or better yet, let's move the English mapping to constants.py as well?
+# To avoid over-complicating constants.py with AI-specific stuff, let's keep the AI mapping here,
+# but ensure the output Chinese tags exist in our system.
+
+LABELS_MAP = {
+    # Lighting
+    "sunny": "晴天",
+    "overcast": "阴天",
+    "indoor": "室内",
+    "night": "夜景",
+    "sunset": "日落",
+    "golden hour": "黄金时刻",
+    
+    # Location
+    "street": "街拍",
+    "cafe": "咖啡厅",
+    "sea": "海边",
+    "park": "公园",
+    "home": "居家",
+    "mountain": "山",
+    "city": "城市",
+    
+    # Subject
+    "portrait": "人像",
+    "person": "人像",
+    "cat": "猫",
+    "dog": "狗",
+    "food": "美食",
+    "flower": "花",
+    "architecture": "建筑",
+    "car": "汽车"
+}
+
+ENGLISH_LABELS = list(LABELS_MAP.keys())
+
+# Hugging Face id of the CLIP checkpoint; stored locally under core/model/<name>
+CLIP_MODEL_ID = "openai/clip-vit-base-patch32"
+
+
+@lru_cache(maxsize=None)
+def labels_fingerprint() -> str:
+    """
+    Changes whenever the model, the label set or the tag categories do. Label
+    text embeddings cached under core/model are rebuilt when it no longer
+    matches, and stored PostImage tags older than it are redone by the backfill.
+    Computed once per process: the labels only change with a deploy.
+    """
+    payload = json.dumps(
+        {"model": CLIP_MODEL_ID, "labels": LABELS_MAP, "categories": TAG_CATEGORIES},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
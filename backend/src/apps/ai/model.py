@@ -0,0 +1,206 @@
+import os
+import threading
+import time
+
+import torch
+from PIL import Image
+from transformers import CLIPModel, CLIPProcessor
+from src.apps.ai.backends import create_backend
+from src.apps.ai.labels import CLIP_MODEL_ID, ENGLISH_LABELS, LABELS_MAP, labels_fingerprint
+from src.apps.upload.pipeline import MODEL_INPUT_SIZE
+from src.core.config import settings
+
+# Local model files: backend/src/core/model
+# __file__ is backend/src/apps/ai/model.py
+# dirname(abspath(__file__)) -> backend/src/apps/ai
+# dirname(...) -> backend/src/apps
+# dirname(...) -> backend/src
+MODEL_ROOT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "core", "model"
+)
+
+class ImageTagger:
+    _instance = None
+    _lock = threading.Lock()
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ImageTagger, cls).__new__(cls)
+            cls._instance.model = None
+            cls._instance.ready = False
+            cls._instance.processor = None
+            cls._instance.backend = None
+            cls._instance.label_embeddings = None
+            cls._instance.logit_scale = None
+            cls._instance.device = "cuda" if torch.cuda.is_available() else "cpu"
+        return cls._instance
+
+    def load_model(self):
+        """
+        Load CLIP once per process. Safe to call from several threads: the
+        first caller loads, the others wait for it under the lock.
+        """
+        if self.ready:
+            return
+        with self._lock:
+            if self.ready:
+                return
+            try:
+                self._load()
+            except Exception:
+                self.model = None
+                raise
+            self.ready = True
+
+    def _load(self):
+        model_id = CLIP_MODEL_ID
+        model_dir = os.path.join(MODEL_ROOT, model_id.split("/")[-1])
+        
+        print(f"Loading CLIP model on {self.device}...")
+        
+        # Check if local model exists
+        if os.path.exists(model_dir) and os.path.exists(os.path.join(model_dir, "config.json")):
+            print(f"Loading from local directory: {model_dir}")
+            self.model = CLIPModel.from_pretrained(model_dir, local_files_only=True).to(self.device)
+            self.processor = CLIPProcessor.from_pretrained(model_dir, local_files_only=True)
+        elif settings.AI_OFFLINE:
+            # Only the Hugging Face cache; fails fast instead of downloading
+            print(f"Local model not found. Loading {model_id} from the local cache (offline)...")
+            try:
+                self.model = CLIPModel.from_pretrained(model_id, local_files_only=True).to(self.device)
+                self.processor = CLIPProcessor.from_pretrained(model_id, local_files_only=True)
+            except OSError as e:
+                raise RuntimeError(f"CLIP model not found in {model_dir} or the local cache, and AI_OFFLINE is set") from e
+        else:
+            print(f"Local model not found. Downloading {model_id}...")
+            self.model = CLIPModel.from_pretrained(model_id).to(self.device)
+            self.processor = CLIPProcessor.from_pretrained(model_id)
+            
+            # Save to local directory for future use
+            print(f"Saving model to {model_dir}...")
+            self.model.save_pretrained(model_dir)
+            self.processor.save_pretrained(model_dir)
+
+        self.model.eval()
+        self.logit_scale = self.model.logit_scale.exp().item()
+        self.label_embeddings = self._load_label_embeddings(
+            os.path.join(MODEL_ROOT, "clip-label-embeddings.pt")
+        )
+        self.backend = create_backend(self.model, self.device, MODEL_ROOT)
+            
+        print(f"CLIP model loaded ({self.backend.name} vision backend).")
+
+    def warmup(self):
+        """One forward pass on a blank image, so the first upload doesn't pay for lazy initialization."""
+        self.load_model()
+        started = time.perf_counter()
+        self.predict_batch([Image.new("RGB", (MODEL_INPUT_SIZE, MODEL_INPUT_SIZE))])
+        print(f"CLIP warmup took {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def _encode_labels(self):
+        inputs = self.processor(text=ENGLISH_LABELS, return_tensors="pt", padding=True).to(self.device)
+        with torch.no_grad():
+            features = self.model.get_text_features(**inputs)
+        return features / features.norm(dim=-1, keepdim=True)
+
+    def _load_label_embeddings(self, path):
+        """
+        Normalized text embeddings of ENGLISH_LABELS. The labels never change
+        between calls, so the text tower runs once per label set: the result
+        is stored next to the model and recomputed when the fingerprint differs.
+        """
+        fingerprint = labels_fingerprint()
+        if os.path.exists(path):
+            try:
+                cached = torch.load(path, map_location=self.device)
+                if cached.get("fingerprint") == fingerprint and cached.get("labels") == ENGLISH_LABELS:
+                    return cached["embeddings"]
+            except Exception as e:
+                print(f"Ignoring unreadable label embeddings {path}: {e}")
+
+        print("Encoding CLIP label embeddings...")
+        embeddings = self._encode_labels()
+        try:
+            torch.save({"fingerprint": fingerprint, "labels": ENGLISH_LABELS, "embeddings": embeddings.cpu()}, path)
+        except OSError as e:
+            print(f"Could not cache label embeddings: {e}")
+        return embeddings
+
+    def predict(self, image, top_k=3, threshold=0.2) -> list[str]:
+        """
+        `image` is a PIL image (e.g. the upload pipeline's decoded model input)
+        or a path / file object to open.
+        """
+        return self.predict_batch([image], top_k, threshold)[0]
+
+    def predict_batch(self, images, top_k=3, threshold=0.2) -> list[list[str]]:
+        """
+        Tags for several images in one forward pass, in input order.
+        An image that can't be opened gets no tags.
+        """
+        return [result["tags"] for result in self.analyze_batch(images, top_k, threshold)]
+
+    def analyze_batch(self, images, top_k=3, threshold=0.2) -> list[dict]:
+        """
+        {"tags": [...], "embedding": [...]} per image from one forward pass.
+        `embedding` is the normalized CLIP image embedding, None when the image
+        couldn't be processed (its tags are then empty).
+        """
+        if not self.ready:
+            self.load_model()
+
+        results = [{"tags": [], "embedding": None} for _ in images]
+        opened = []
+        for i, image in enumerate(images):
+            try:
+                opened.append((i, image if isinstance(image, Image.Image) else Image.open(image)))
+            except Exception as e:
+                print(f"Error in AI tagging: {e}")
+        if not opened:
+            return results
+
+        try:
+            # Prepare inputs
+            inputs = self.processor(
+                images=[image for _, image in opened], 
+                return_tensors="pt"
+            )
+
+            # Inference: vision tower only, labels are pre-encoded
+            image_embeddings = self.backend.image_features(inputs["pixel_values"]).to(self.device)
+            image_embeddings = image_embeddings / image_embeddings.norm(dim=-1, keepdim=True)
+            
+            # Calculate probabilities
+            logits_per_image = self.logit_scale * image_embeddings @ self.label_embeddings.T  # same as CLIPModel's
+            probs = logits_per_image.softmax(dim=1)  # softmax to get probabilities
+
+            embeddings = image_embeddings.cpu().tolist()
+            for row, (i, _) in enumerate(opened):
+                results[i] = {"tags": self._top_labels(probs[row], top_k, threshold), "embedding": embeddings[row]}
+        except Exception as e:
+            print(f"Error in AI tagging: {e}")
+        return results
+
+    def _top_labels(self, probs, top_k, threshold) -> list[str]:
+        # Get top k
+        values, indices = probs.topk(len(ENGLISH_LABELS))
+
+        results = []
+        for i in range(len(indices)):
+            score = values[i].item()
+            idx = indices[i].item()
+            label_en = ENGLISH_LABELS[idx]
+
+            # Filter by threshold and top_k limit
+            if score > threshold:
+                label_cn = LABELS_MAP[label_en]
+                if label_cn not in results:
+                    results.append(label_cn)
+
+            if len(results) >= top_k:
+                break
+
+        return results
+
+# Singleton instance
+tagger = ImageTagger()
@@ -0,0 +1,46 @@
+import asyncio
+import json
+import struct
+from typing import Tuple
+
+from PIL import Image
+
+# Messages between API workers and the inference worker (src/apps/ai/worker.py).
+# A frame is a JSON header plus an optional binary body:
+#   4 bytes header length | 4 bytes body length | header | body
+# Requests carry one image as raw pixels; responses {"tags": [...], "embedding": [...]}
+# or {"error": ...}.
+
+_LENGTHS = struct.Struct(">II")
+MAX_HEADER_SIZE = 64 * 1024
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    pass
+
+
+async def write_frame(writer: asyncio.StreamWriter, header: dict, body: bytes = b""):
+    encoded = json.dumps(header).encode("utf-8")
+    writer.write(_LENGTHS.pack(len(encoded), len(body)) + encoded + body)
+    await writer.drain()
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[dict, bytes]:
+    header_size, body_size = _LENGTHS.unpack(await reader.readexactly(_LENGTHS.size))
+    if header_size > MAX_HEADER_SIZE or body_size > MAX_BODY_SIZE:
+        raise ProtocolError(f"frame too large ({header_size} + {body_size} bytes)")
+    header = json.loads(await reader.readexactly(header_size))
+    body = await reader.readexactly(body_size) if body_size else b""
+    return header, body
+
+
+def encode_image(image: Image.Image) -> Tuple[dict, bytes]:
+    """Raw RGB pixels: the model input is small, so this beats re-encoding it."""
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return {"size": list(image.size), "mode": "RGB"}, image.tobytes()
+
+
+def decode_image(header: dict, body: bytes) -> Image.Image:
+    return Image.frombytes(header["mode"], tuple(header["size"]), body)
@@ -1,140 +1,131 @@
 import asyncio
-import os
+import sys
+from typing import Optional, Tuple
 
-import torch
 from PIL import Image
-from transformers import CLIPModel, CLIPProcessor
-
-# Define our labels based on centralized config
-# We need to map English keywords (for CLIP) to Chinese tags (for our app)
-# Since TAG_CATEGORIES only has Chinese, we might need to enhance the constants or keep a mapping here.
-# For now, let's keep the mapping here but validate against TAG_CATEGORIES if needed, 
-# or better yet, let's move the English mapping to constants.py as well?
-# To avoid over-complicating constants.py with AI-specific stuff, let's keep the AI mapping here,
-# but ensure the output Chinese tags exist in our system.
-
-LABELS_MAP = {
-    # Lighting
-    "sunny": "晴天",
-    "overcast": "阴天",
-    "indoor": "室内",
-    "night": "夜景",
-    "sunset": "日落",
-    "golden hour": "黄金时刻",
-    
-    # Location
-    "street": "街拍",
-    "cafe": "咖啡厅",
-    "sea": "海边",
-    "park": "公园",
-    "home": "居家",
-    "mountain": "山",
-    "city": "城市",
-    
-    # Subject
-    "portrait": "人像",
-    "person": "人像",
-    "cat": "猫",
-    "dog": "狗",
-    "food": "美食",
-    "flower": "花",
-    "architecture": "建筑",
-    "car": "汽车"
-}
-
-ENGLISH_LABELS = list(LABELS_MAP.keys())
-
-class ImageTagger:
-    _instance = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(ImageTagger, cls).__new__(cls)
-            cls._instance.model = None
-            cls._instance.processor = None
-            cls._instance.device = "cuda" if torch.cuda.is_available() else "cpu"
-        return cls._instance
-
-    def load_model(self):
-        if self.model is None:
-            # Define local path: backend/src/core/model/clip-vit-base-patch32
-            # __file__ is backend/src/apps/ai/service.py
-            # dirname(abspath(__file__)) -> backend/src/apps/ai
-            # dirname(...) -> backend/src/apps
-            # dirname(...) -> backend/src
-            base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            model_dir = os.path.join(base_dir, "core", "model", "clip-vit-base-patch32")
-            model_id = "openai/clip-vit-base-patch32"
-            
-            print(f"Loading CLIP model on {self.device}...")
-            
-            # Check if local model exists
-            if os.path.exists(model_dir) and os.path.exists(os.path.join(model_dir, "config.json")):
-                print(f"Loading from local directory: {model_dir}")
-                self.model = CLIPModel.from_pretrained(model_dir).to(self.device)
-                self.processor = CLIPProcessor.from_pretrained(model_dir)
-            else:
-                print(f"Local model not found. Downloading {model_id}...")
-                self.model = CLIPModel.from_pretrained(model_id).to(self.device)
-                self.processor = CLIPProcessor.from_pretrained(model_id)
-                
-                # Save to local directory for future use
-                print(f"Saving model to {model_dir}...")
-                self.model.save_pretrained(model_dir)
-                self.processor.save_pretrained(model_dir)
-                
-            print("CLIP model loaded.")
-
-    def predict(self, image_path: str, top_k=3, threshold=0.2) -> list[str]:
-        if self.model is None:
-            self.load_model()
-            
+from src.apps.ai import cache
+from src.apps.ai.batching import InferenceBatcher
+from src.apps.ai.client import RemoteTagger
+from src.core.config import settings
+
+# Tagging entry point for the API. With AI_INFERENCE_MODE=local the model runs
+# in this process (torch is imported on first use); with "remote" images go to
+# the inference worker (python -m src.apps.ai.worker) and this process never
+# imports torch or transformers.
+
+_batcher: Optional[InferenceBatcher] = None
+_remote: Optional[RemoteTagger] = None
+_preload_error: Optional[str] = None
+
+
+def _analyze_batch(images):
+    from src.apps.ai.model import tagger
+
+    return tagger.analyze_batch(images)
+
+
+def _prepare(image) -> Tuple[Image.Image, str]:
+    if not isinstance(image, Image.Image):
+        with Image.open(image) as opened:
+            image = opened.convert("RGB")
+    return image, cache.pixel_hash(image)
+
+
+async def analyze_image(image) -> dict:
+    """
+    {"tags": [...], "embedding": [...]} for a PIL image (or a path / file
+    object). Served from the content-hash cache when this picture was seen before.
+    """
+    global _batcher, _remote
+    image, content_hash = await asyncio.to_thread(_prepare, image)
+    if settings.AI_INFERENCE_MODE == "remote":
+        if _remote is None:
+            _remote = RemoteTagger()
+        # The worker's settings pick the encoder, not this process's
+        variant = await _remote.backend_variant()
+    else:
+        variant = cache.backend_variant()
+    cached = await cache.get_analysis(content_hash, variant) if variant else None
+    if cached is not None:
+        return cached
+
+    if settings.AI_INFERENCE_MODE == "remote":
+        result = await _remote.analyze(image)
+        variant = _remote.variant
+    else:
+        # Concurrent uploads share forward passes; batches run in a worker thread,
+        # so model loading and inference never block the event loop
+        if _batcher is None:
+            _batcher = InferenceBatcher(_analyze_batch)
+        result = await _batcher.submit(image)
+
+    if variant:
+        await cache.set_analysis(content_hash, result, variant)
+    return result
+
+
+async def get_image_tags(image) -> list[str]:
+    return (await analyze_image(image))["tags"]
+
+
+def _load_and_warm_up():
+    from src.apps.ai.model import tagger
+
+    tagger.warmup()
+
+
+async def preload():
+    """
+    Load and warm up the local model at startup (in a thread, under the
+    model's lock), so no upload waits for it. Failures are retried with
+    exponential backoff until the model is loaded: with AI_PRELOAD, /health
+    keeps the worker out of rotation until then, so no upload would ever load
+    it lazily. Nothing to do in remote mode.
+    """
+    global _preload_error
+    if settings.AI_INFERENCE_MODE == "remote":
+        return
+    attempt = 0
+    while True:
+        attempt += 1
         try:
-            image = Image.open(image_path)
-            
-            # Prepare inputs
-            inputs = self.processor(
-                text=ENGLISH_LABELS, 
-                images=image, 
-                return_tensors="pt", 
-                padding=True
-            ).to(self.device)
-
-            # Inference
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-            
-            # Calculate probabilities
-            logits_per_image = outputs.logits_per_image  # image-text similarity score
-            probs = logits_per_image.softmax(dim=1)  # softmax to get probabilities
-            
-            # Get top k
-            values, indices = probs[0].topk(len(ENGLISH_LABELS))
-            
-            results = []
-            for i in range(len(indices)):
-                score = values[i].item()
-                idx = indices[i].item()
-                label_en = ENGLISH_LABELS[idx]
-                
-                # Filter by threshold and top_k limit
-                if score > threshold:
-                    label_cn = LABELS_MAP[label_en]
-                    if label_cn not in results:
-                        results.append(label_cn)
-                
-                if len(results) >= top_k:
-                    break
-                    
-            return results
+            await asyncio.to_thread(_load_and_warm_up)
+            _preload_error = None
+            return
         except Exception as e:
-            print(f"Error in AI tagging: {e}")
-            return []
+            _preload_error = str(e)
+            print(f"CLIP preload attempt {attempt} failed: {e}")
+        # Exponent bounded so the delay never overflows before the cap applies
+        delay = settings.AI_PRELOAD_BACKOFF * 2 ** min(attempt - 1, 30)
+        await asyncio.sleep(min(delay, settings.AI_PRELOAD_MAX_BACKOFF))
+
+
+async def readiness() -> dict:
+    """Whether tagging can serve requests right now, for /health."""
+    global _remote, _preload_error
+    if settings.AI_INFERENCE_MODE == "remote":
+        if _remote is None:
+            _remote = RemoteTagger()
+        return {"mode": "remote", "ready": await _remote.ping()}
+
+    # Never import torch just to answer a health check
+    model = sys.modules.get("src.apps.ai.model")
+    loaded = bool(model and model.tagger.ready)
+    # Without preloading the model loads on first use: not a reason to take the worker out of rotation
+    status = {"mode": "local", "ready": loaded or not settings.AI_PRELOAD, "loaded": loaded}
+    if loaded:
+        # Loaded after all, by a retry or lazily by an upload
+        _preload_error = None
+    if _preload_error:
+        status["error"] = _preload_error
+    return status
 
-# Singleton instance
-tagger = ImageTagger()
 
-async def get_image_tags(image_path: str) -> list[str]:
-    # Run in thread pool to avoid blocking async loop
-    # Since loading model might be slow, the first call will block the thread, but not the loop.
-    return await asyncio.to_thread(tagger.predict, image_path)
+async def shutdown():
+    global _batcher, _remote
+    if _batcher is not None:
+        await _batcher.stop()
+        _batcher = None
+    if _remote is not None:
+        await _remote.close()
+        _remote = None
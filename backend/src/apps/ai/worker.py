@@ -0,0 +1,142 @@
+"""
+Inference worker: owns the CLIP model so API processes don't have to.
+
+    python -m src.apps.ai.worker
+
+Listens on the AI_WORKER_SOCKET unix socket and tags images for API workers
+running with AI_INFERENCE_MODE=remote. Requests are micro-batched and run on
+AI_WORKER_PROCESSES model processes. At most AI_WORKER_MAX_PENDING requests
+are admitted at a time; further ones are rejected with "overloaded" right away
+instead of queueing behind work that would time out anyway.
+"""
+import asyncio
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from src.apps.ai.batching import InferenceBatcher
+from src.apps.ai.cache import backend_variant
+from src.apps.ai.protocol import decode_image, read_frame, write_frame
+from src.core.config import settings
+
+RawImage = Tuple[str, Tuple[int, int], bytes]
+
+
+def _init_process():
+    import torch
+
+    from src.apps.ai.model import tagger
+
+    if settings.AI_WORKER_THREADS:
+        torch.set_num_threads(settings.AI_WORKER_THREADS)
+    tagger.warmup()
+
+
+def _analyze_batch(images: List[RawImage]) -> List[dict]:
+    from PIL import Image
+
+    from src.apps.ai.model import tagger
+
+    return tagger.analyze_batch([Image.frombytes(mode, size, data) for mode, size, data in images])
+
+
+class InferenceServer:
+    """
+    Serves tag requests over a unix socket. `run_batch` maps a list of
+    (mode, size, pixels) tuples to their analysis ({"tags", "embedding"}); it is blocking and runs in a
+    thread (in production it hands the batch to a model process).
+    """
+    def __init__(
+        self,
+        run_batch: Callable[[List[RawImage]], Sequence[dict]],
+        socket_path: Optional[str] = None,
+        max_pending: Optional[int] = None,
+        timeout: Optional[float] = None,
+        concurrency: int = 1,
+    ):
+        self.socket_path = socket_path or settings.AI_WORKER_SOCKET
+        self.max_pending = max_pending if max_pending is not None else settings.AI_WORKER_MAX_PENDING
+        self.timeout = timeout if timeout is not None else settings.AI_REQUEST_TIMEOUT
+        self.batcher = InferenceBatcher(run_batch, name="clip-worker", concurrency=concurrency)
+        self.pending = 0
+        self._server: Optional[asyncio.Server] = None
+
+    async def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.batcher.stop()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # One connection may send several requests, one at a time
+        try:
+            while True:
+                try:
+                    header, body = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                await write_frame(writer, await self._tag(header, body))
+        except Exception as e:
+            print(f"Inference connection error: {e}")
+        finally:
+            writer.close()
+
+    async def _tag(self, header: dict, body: bytes) -> dict:
+        if header.get("op") == "ping":
+            # The socket only opens once every model process is warm
+            return {"ok": True, "pending": self.pending, "variant": backend_variant()}
+        if self.pending >= self.max_pending:
+            return {"error": "overloaded"}
+        self.pending += 1
+        try:
+            # Checks the pixel data before it reaches a model process
+            image = decode_image(header, body)
+            raw = (image.mode, image.size, body)
+            result = await asyncio.wait_for(self.batcher.submit(raw), self.timeout)
+            # API processes cache results under the encoder that produced them
+            return {**result, "variant": backend_variant()}
+        except asyncio.TimeoutError:
+            return {"error": "timeout"}
+        except Exception as e:
+            print(f"Inference request failed: {e}")
+            return {"error": "failed"}
+        finally:
+            self.pending -= 1
+
+
+async def serve():
+    processes = max(1, settings.AI_WORKER_PROCESSES)
+    executor = ProcessPoolExecutor(max_workers=processes, initializer=_init_process)
+    # Load the model in every process before accepting requests
+    await asyncio.gather(*(
+        asyncio.get_running_loop().run_in_executor(executor, _analyze_batch, []) for _ in range(processes)
+    ))
+
+    server = InferenceServer(
+        lambda images: executor.submit(_analyze_batch, images).result(),
+        concurrency=processes,
+    )
+    await server.start()
+    print(f"Inference worker listening on {server.socket_path} ({processes} processes)")
+
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopped.set)
+    await stopped.wait()
+
+    await server.stop()
+    executor.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(serve())
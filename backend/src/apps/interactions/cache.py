@@ -0,0 +1,82 @@
+from typing import Dict, List, Optional, Tuple
+
+from redis.exceptions import RedisError
+from src.core.config import settings
+from src.database.redis import redis_client
+
+# Relations cached as one Redis hash per user: target id -> "1" / "0".
+# Only ids that were actually asked about are cached, so a user with 100k
+# likes costs nothing until their feed shows those posts.
+LIKED = "liked"
+BOOKMARKED = "bookmarked"
+FOLLOWING = "following"
+
+# Writes bump a per-user version before dropping the hash. A reader that
+# queried the database before the write committed carries the old version,
+# so its warm is refused instead of caching stale flags for the whole TTL.
+_WARM_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then
+    return 0
+end
+for i = 3, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+if redis.call('TTL', KEYS[1]) < 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+
+def _key(user_id: str, relation: str) -> str:
+    return f"interactions:{relation}:{user_id}"
+
+
+def _version_key(user_id: str, relation: str) -> str:
+    return f"interactions:{relation}:{user_id}:version"
+
+
+async def get_members(user_id: str, relation: str, ids: List[str]) -> Tuple[Dict[str, bool], List[str], Optional[str]]:
+    """
+    Cached flags for `ids`, the ids the cache doesn't know, and the version
+    to hand to `warm` once those have been loaded. Everything is missing
+    (and the version None) when Redis is unavailable.
+    """
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hmget(_key(user_id, relation), ids)
+        pipe.get(_version_key(user_id, relation))
+        flags, version = await pipe.execute()
+    except RedisError as e:
+        print(f"Interaction cache read failed: {e}")
+        return {}, list(ids), None
+
+    cached = {item_id: flag == "1" for item_id, flag in zip(ids, flags) if flag is not None}
+    missing = [item_id for item_id in ids if item_id not in cached]
+    return cached, missing, version or ""
+
+
+async def warm(user_id: str, relation: str, flags: Dict[str, bool], version: Optional[str]) -> None:
+    if version is None or not flags:
+        return
+    args = [version, settings.INTERACTION_STATUS_CACHE_TTL]
+    for item_id, flag in flags.items():
+        args += [item_id, "1" if flag else "0"]
+    try:
+        await redis_client.eval(
+            _WARM_SCRIPT, 2, _key(user_id, relation), _version_key(user_id, relation), *args
+        )
+    except RedisError as e:
+        print(f"Interaction cache warm failed: {e}")
+
+
+async def invalidate(user_id: str, relation: str) -> None:
+    # Drop the whole hash on writes; the next status reads rebuild what they need.
+    try:
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.incr(_version_key(user_id, relation))
+        pipe.expire(_version_key(user_id, relation), settings.INTERACTION_STATUS_CACHE_TTL * 2)
+        pipe.delete(_key(user_id, relation))
+        await pipe.execute()
+    except RedisError as e:
+        print(f"Interaction cache invalidate failed: {e}")
@@ -7,6 +7,7 @@ from src.apps.interactions import service
 from src.apps.interactions import schemas
 from src.apps.users.models import User
 from src.core import deps
+from src.core.config import settings
 
 router = APIRouter()
 
@@ -73,6 +74,24 @@ async def get_like_status(
     is_liked = await service.get_post_like_status(db, post_id, current_user.id)
     return {"status": "liked" if is_liked else "unliked"}
 
+@router.post("/status", response_model=schemas.InteractionStatusResponse)
+async def read_interaction_status(
+    status_in: schemas.InteractionStatusRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Liked / bookmarked / following flags for many posts and users in one call.
+    """
+    if len(status_in.post_ids) + len(status_in.user_ids) > settings.INTERACTION_STATUS_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.INTERACTION_STATUS_MAX_IDS} ids per request"
+        )
+    return await service.get_interaction_status(
+        db, current_user.id, status_in.post_ids, status_in.user_ids
+    )
+
 @router.post("/follow", response_model=schemas.FollowResponse)
 async def follow_user(
     follow_in: schemas.FollowCreate,
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 from src.apps.users.schemas import UserResponse
 
 class CommentBase(BaseModel):
@@ -39,3 +39,13 @@ class BookmarkCreate(BaseModel):
 
 class BookmarkResponse(BaseModel):
     status: str # "bookmarked" or "unbookmarked"
+
+
+class InteractionStatusRequest(BaseModel):
+    post_ids: List[str] = []
+    user_ids: List[str] = []
+
+class InteractionStatusResponse(BaseModel):
+    liked: Dict[str, bool] = {}
+    bookmarked: Dict[str, bool] = {}
+    following: Dict[str, bool] = {}
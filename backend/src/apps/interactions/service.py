@@ -2,8 +2,9 @@ from sqlalchemy import update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
+from src.apps.interactions import cache
 from src.apps.interactions.models import Bookmark, Comment, CommentLike, Follow, Like
-from src.apps.notifications.service import create_notification
+from src.apps.notifications.outbox import enqueue_notification, outbox_dispatcher
 from src.apps.notifications.schemas import NotificationCreate, NotificationType
 from src.apps.posts.models import Post
 
@@ -16,6 +17,7 @@ async def bookmark_post(db: AsyncSession, post_id: str, user_id: str) -> bool:
         new_bookmark = Bookmark(user_id=user_id, post_id=post_id)
         db.add(new_bookmark)
         await db.commit()
+        await cache.invalidate(user_id, cache.BOOKMARKED)
         return True # Bookmarked
     except IntegrityError:
         await db.rollback()
@@ -31,6 +33,7 @@ async def bookmark_post(db: AsyncSession, post_id: str, user_id: str) -> bool:
         if existing_bookmark:
             await db.delete(existing_bookmark)
             await db.commit()
+            await cache.invalidate(user_id, cache.BOOKMARKED)
             return False # Unbookmarked
         # If we are here, it means integrity error was something else or race condition resolved weirdly.
         return False
@@ -43,6 +46,7 @@ async def delete_bookmarks(db: AsyncSession, post_ids: list[str], user_id: str):
         )
     )
     await db.commit()
+    await cache.invalidate(user_id, cache.BOOKMARKED)
 
 async def get_bookmark_status(db: AsyncSession, post_id: str, user_id: str) -> bool:
     if not user_id:
@@ -64,61 +68,66 @@ async def create_comment(db: AsyncSession, comment_in: CommentCreate, user_id: s
         content=comment_in.content
     )
     db.add(db_comment)
-    await db.commit()
-    await db.refresh(db_comment)
-    
-    # Reload with user relationship for response
-    result = await db.execute(
-        select(Comment)
-        .options(
-            selectinload(Comment.user),
-            selectinload(Comment.replies),
-            selectinload(Comment.likes),
-            selectinload(Comment.post) # Load post to get author
-        )
-        .filter(Comment.id == db_comment.id)
-    )
-    comment = result.scalars().first()
-    
-    # Set computed fields for schema
-    comment.likes_count = 0
-    comment.is_liked = False
-    
+    await db.flush() # flush to get ID for the notifications
+
     # --- Notification Trigger ---
+    # Staged in the same transaction (outbox); created and pushed by the dispatcher
+    post_result = await db.execute(select(Post.user_id).filter(Post.id == db_comment.post_id))
+    post_author_id = post_result.scalar()
+
     # Notify Post Author
-    if comment.post.user_id != user_id:
-        await create_notification(
+    if post_author_id and post_author_id != user_id:
+        enqueue_notification(
             db,
             NotificationCreate(
-                recipient_id=comment.post.user_id,
+                recipient_id=post_author_id,
                 sender_id=user_id,
                 type=NotificationType.COMMENT,
-                post_id=comment.post_id,
-                comment_id=comment.id,
-                content=f"评论了你的作品: {comment.content[:20]}"
+                post_id=db_comment.post_id,
+                comment_id=db_comment.id,
+                content=f"评论了你的作品: {db_comment.content[:20]}"
             )
         )
-        
+
     # Notify Parent Comment Author (if reply)
-    if comment.parent_id:
+    if db_comment.parent_id:
         # We need to fetch parent comment to get its author
-        parent_result = await db.execute(select(Comment).filter(Comment.id == comment.parent_id))
-        parent_comment = parent_result.scalars().first()
-        
-        if parent_comment and parent_comment.user_id != user_id and parent_comment.user_id != comment.post.user_id:
+        parent_result = await db.execute(select(Comment.user_id).filter(Comment.id == db_comment.parent_id))
+        parent_author_id = parent_result.scalar()
+
+        if parent_author_id and parent_author_id != user_id and parent_author_id != post_author_id:
             # Avoid double notification if parent author is also post author
-             await create_notification(
+            enqueue_notification(
                 db,
                 NotificationCreate(
-                    recipient_id=parent_comment.user_id,
+                    recipient_id=parent_author_id,
                     sender_id=user_id,
                     type=NotificationType.COMMENT,
-                    post_id=comment.post_id,
-                    comment_id=comment.id,
-                    content=f"回复了你的评论: {comment.content[:20]}"
+                    post_id=db_comment.post_id,
+                    comment_id=db_comment.id,
+                    content=f"回复了你的评论: {db_comment.content[:20]}"
                 )
             )
 
+    await db.commit()
+    outbox_dispatcher.notify()
+
+    # Reload with user relationship for response
+    result = await db.execute(
+        select(Comment)
+        .options(
+            selectinload(Comment.user),
+            selectinload(Comment.replies),
+            selectinload(Comment.likes)
+        )
+        .filter(Comment.id == db_comment.id)
+    )
+    comment = result.scalars().first()
+
+    # Set computed fields for schema
+    comment.likes_count = 0
+    comment.is_liked = False
+
     return comment
 
 from sqlalchemy.orm.attributes import set_committed_value
@@ -248,18 +257,17 @@ async def like_post(db: AsyncSession, post_id: str, user_id: str) -> bool:
         await db.execute(
             update(Post).where(Post.id == post_id).values(likes_count=Post.likes_count + 1)
         )
-        await db.commit()
-        
+
         # --- Notification Trigger ---
-        # Fetch post to get author
-        post_result = await db.execute(select(Post).filter(Post.id == post_id))
-        post = post_result.scalars().first()
-        
-        if post and post.user_id != user_id:
-            await create_notification(
+        # Fetch post author; the notification is committed with the like (outbox)
+        post_result = await db.execute(select(Post.user_id).filter(Post.id == post_id))
+        post_author_id = post_result.scalar()
+
+        if post_author_id and post_author_id != user_id:
+            enqueue_notification(
                 db,
                 NotificationCreate(
-                    recipient_id=post.user_id,
+                    recipient_id=post_author_id,
                     sender_id=user_id,
                     type=NotificationType.LIKE,
                     post_id=post_id,
@@ -267,6 +275,10 @@ async def like_post(db: AsyncSession, post_id: str, user_id: str) -> bool:
                 )
             )
 
+        await db.commit()
+        await cache.invalidate(user_id, cache.LIKED)
+        outbox_dispatcher.notify()
+
         return True # Liked
     except IntegrityError:
         await db.rollback()
@@ -283,6 +295,7 @@ async def like_post(db: AsyncSession, post_id: str, user_id: str) -> bool:
                 update(Post).where(Post.id == post_id).values(likes_count=Post.likes_count - 1)
             )
             await db.commit()
+            await cache.invalidate(user_id, cache.LIKED)
             return False # Unliked
         return False
 
@@ -322,14 +335,15 @@ async def follow_user(db: AsyncSession, target_user_id: str, current_user_id: st
     if existing:
         await db.delete(existing)
         await db.commit()
+        await cache.invalidate(current_user_id, cache.FOLLOWING)
         return False # Unfollowed
     else:
         new_follow = Follow(follower_id=current_user_id, followed_id=target_user_id)
         db.add(new_follow)
-        await db.commit()
-        
+
         # --- Notification Trigger ---
-        await create_notification(
+        # Committed with the follow (outbox); created and pushed by the dispatcher
+        enqueue_notification(
             db,
             NotificationCreate(
                 recipient_id=target_user_id,
@@ -338,7 +352,11 @@ async def follow_user(db: AsyncSession, target_user_id: str, current_user_id: st
                 content="关注了你"
             )
         )
-        
+
+        await db.commit()
+        await cache.invalidate(current_user_id, cache.FOLLOWING)
+        outbox_dispatcher.notify()
+
         return True # Followed
 
 async def get_follow_status(db: AsyncSession, target_user_id: str, current_user_id: str) -> bool:
@@ -348,3 +366,35 @@ async def get_follow_status(db: AsyncSession, target_user_id: str, current_user_
         select(Follow).filter(Follow.follower_id == current_user_id, Follow.followed_id == target_user_id)
     )
     return result.scalars().first() is not None
+
+async def _relation_status(db: AsyncSession, user_id: str, relation: str, ids: list[str], owner, target) -> dict[str, bool]:
+    if not ids:
+        return {}
+
+    status, missing, version = await cache.get_members(user_id, relation, ids)
+    if missing:
+        # Only the ids the cache doesn't know: one lookup on the (user_id, target_id) primary key
+        result = await db.execute(select(target).where(owner == user_id, target.in_(missing)))
+        members = set(result.scalars().all())
+        loaded = {item_id: item_id in members for item_id in missing}
+        await cache.warm(user_id, relation, loaded, version)
+        status.update(loaded)
+    return {item_id: status[item_id] for item_id in ids}
+
+async def get_interaction_status(
+    db: AsyncSession, user_id: str, post_ids: list[str], user_ids: list[str]
+) -> dict[str, dict[str, bool]]:
+    # De-duplicate while keeping request order
+    post_ids = list(dict.fromkeys(post_ids))
+    user_ids = list(dict.fromkeys(user_ids))
+
+    liked = await _relation_status(
+        db, user_id, cache.LIKED, post_ids, Like.user_id, Like.post_id
+    )
+    bookmarked = await _relation_status(
+        db, user_id, cache.BOOKMARKED, post_ids, Bookmark.user_id, Bookmark.post_id
+    )
+    following = await _relation_status(
+        db, user_id, cache.FOLLOWING, user_ids, Follow.follower_id, Follow.followed_id
+    )
+    return {"liked": liked, "bookmarked": bookmarked, "following": following}
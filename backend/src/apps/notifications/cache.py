@@ -0,0 +1,157 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from redis.exceptions import RedisError
+from src.core.config import settings
+from src.database.redis import redis_client
+
+# Writers bracket each change of a user's unread rows: `begin_unread_change`
+# before the commit, `adjust_unread_count` after it. While a change is pending a
+# rebuild can't tell whether its count already includes it, so it isn't stored.
+# Pending changes expire in case the writer dies between the two calls.
+_PENDING_TTL = 60
+
+# Settle one pending change: adjust the counter only while it is cached, never
+# below zero, and bump the generation so rebuilds that began before the change
+# don't store their count. Without a pending change to settle (Redis failed at
+# begin, or it expired) a rebuild may already have counted the change, so the
+# counter is dropped and the next read rebuilds it.
+_ADJUST_IF_EXISTS = """
+local pending = tonumber(redis.call('GET', KEYS[3]) or '0')
+if pending > 1 then
+    redis.call('DECR', KEYS[3])
+else
+    redis.call('DEL', KEYS[3])
+end
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+if pending < 1 or redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('DEL', KEYS[1])
+    return nil
+end
+local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+if value < 0 then
+    redis.call('SET', KEYS[1], 0, 'KEEPTTL')
+    value = 0
+end
+return value
+"""
+
+# Store a rebuilt count unless the generation moved since the rebuild started
+# or a change is still being committed
+_STORE_REBUILT = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] or redis.call('EXISTS', KEYS[3]) == 1 then
+    return 0
+end
+if redis.call('SET', KEYS[1], ARGV[2], 'NX', 'EX', ARGV[3]) then
+    return 1
+end
+return 0
+"""
+
+
+def _unread_key(user_id: str) -> str:
+    return f"notifications:unread:{user_id}"
+
+
+def _generation_key(user_id: str) -> str:
+    return f"notifications:unread-gen:{user_id}"
+
+
+def _pending_key(user_id: str) -> str:
+    return f"notifications:unread-pending:{user_id}"
+
+
+async def get_unread_count(user_id: str) -> Tuple[Optional[int], Optional[str]]:
+    """
+    The cached count (None if not cached) and the generation to pass to
+    `store_rebuilt_unread_count` after counting in the database.
+    """
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.get(_unread_key(user_id))
+        pipe.get(_generation_key(user_id))
+        value, generation = await pipe.execute()
+    except RedisError as e:
+        print(f"Unread counter read failed: {e}")
+        return None, None
+    return (int(value) if value is not None else None), generation or ""
+
+
+async def store_rebuilt_unread_count(user_id: str, count: int, generation: Optional[str]) -> None:
+    if generation is None:
+        return
+    try:
+        await redis_client.eval(
+            _STORE_REBUILT, 3, _unread_key(user_id), _generation_key(user_id), _pending_key(user_id),
+            generation, count, settings.NOTIFICATION_UNREAD_CACHE_TTL
+        )
+    except RedisError as e:
+        print(f"Unread counter write failed: {e}")
+
+
+async def begin_unread_change(user_id: str, changes: int = 1) -> None:
+    """Call before committing `changes` changes to the user's unread notifications."""
+    try:
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.incrby(_pending_key(user_id), changes)
+        pipe.expire(_pending_key(user_id), _PENDING_TTL)
+        await pipe.execute()
+    except RedisError as e:
+        print(f"Unread counter update failed: {e}")
+
+
+async def adjust_unread_count(user_id: str, delta: int) -> Optional[int]:
+    """
+    Settle a change begun with `begin_unread_change`, once it is committed (or
+    rolled back, with delta 0). Returns the new count, or None if not cached.
+    """
+    try:
+        value = await redis_client.eval(
+            _ADJUST_IF_EXISTS, 3, _unread_key(user_id), _generation_key(user_id), _pending_key(user_id),
+            delta, settings.NOTIFICATION_UNREAD_CACHE_TTL
+        )
+    except RedisError as e:
+        print(f"Unread counter update failed: {e}")
+        await invalidate_unread_count(user_id)
+        return None
+    return int(value) if value is not None else None
+
+
+async def invalidate_unread_count(user_id: str) -> None:
+    try:
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.incr(_generation_key(user_id))
+        pipe.expire(_generation_key(user_id), settings.NOTIFICATION_UNREAD_CACHE_TTL)
+        pipe.delete(_unread_key(user_id))
+        await pipe.execute()
+    except RedisError as e:
+        print(f"Unread counter invalidate failed: {e}")
+
+
+# Fallback throttle state while Redis is unavailable: notification_id -> end of its
+# interval (monotonic), oldest first so expired slots are pruned from the front
+_LOCAL_MAX_PUSH_SLOTS = 10000
+_local_push_slots: "OrderedDict[str, float]" = OrderedDict()
+
+
+async def acquire_push_slot(notification_id: str, interval: int) -> bool:
+    """True at most once per `interval` seconds for the same (grouped) notification."""
+    try:
+        acquired = await redis_client.set(
+            f"notifications:push-slot:{notification_id}", 1, ex=interval, nx=True
+        )
+        return bool(acquired)
+    except RedisError as e:
+        print(f"Push throttle check failed, using in-process throttle: {e}")
+
+    now = time.monotonic()
+    while _local_push_slots and (
+        next(iter(_local_push_slots.values())) <= now or len(_local_push_slots) >= _LOCAL_MAX_PUSH_SLOTS
+    ):
+        _local_push_slots.popitem(last=False)
+    if notification_id in _local_push_slots:
+        return False
+    _local_push_slots[notification_id] = now + interval
+    return True
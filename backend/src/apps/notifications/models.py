@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, String, Boolean, ForeignKey, Enum, Text, DateTime
+from sqlalchemy import Column, String, Boolean, ForeignKey, Enum, Text, DateTime, Integer, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from src.database.base import Base
@@ -13,6 +13,14 @@ class NotificationType(str, enum.Enum):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # Unread counts and inbox pages are range scans over a user's timeline
+        Index("ix_notifications_recipient_created", "recipient_id", "created_at"),
+        # Type tabs of the inbox
+        Index("ix_notifications_recipient_type_created", "recipient_id", "type", "created_at"),
+        # Retention sweeps walk the oldest rows first
+        Index("ix_notifications_created_at", "created_at"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     recipient_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
@@ -25,7 +33,14 @@ class Notification(Base):
     comment_id = Column(String(36), ForeignKey("comments.id"), nullable=True)
     
     content = Column(Text, nullable=True) # Preview text or system message
+    # Per-row override for items read individually; bulk reads move the
+    # watermark in NotificationReadState instead of touching rows
     is_read = Column(Boolean, default=False, index=True)
+
+    # Aggregation: one row per (type, target) burst, e.g. "Alice and 37 others liked your photo".
+    # sender_id is the latest actor; actor_ids keeps the few most recent ones.
+    actor_count = Column(Integer, default=1, server_default="1", nullable=False)
+    actor_ids = Column(JSON, nullable=True)
     
     created_at = Column(DateTime(timezone=True), default=func.now(), server_default=func.now(), nullable=False)
     
@@ -34,3 +49,64 @@ class Notification(Base):
     sender = relationship("User", foreign_keys=[sender_id], backref="notifications_sent")
     post = relationship("Post")
     comment = relationship("Comment")
+
+class NotificationOutbox(Base):
+    """
+    Notifications staged in the same transaction as the interaction that caused them.
+    The outbox dispatcher turns them into `Notification` rows and deletes them.
+    Rows that keep failing are dead-lettered: `failed_at` is set, the dispatcher
+    skips them and they stay for inspection.
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    payload = Column(JSON, nullable=False) # NotificationCreate as JSON
+    attempts = Column(Integer, default=0, server_default="0", nullable=False)
+    failed_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(String(500), nullable=True)
+    created_at = Column(DateTime(timezone=True), default=func.now(), server_default=func.now(), nullable=False)
+
+class NotificationReadState(Base):
+    """
+    Per-user read watermark. Notifications created before `last_read_at` count as read.
+    scope is "all" or a NotificationType value for "mark all likes as read".
+    """
+    __tablename__ = "notification_read_states"
+
+    user_id = Column(String(36), ForeignKey("users.id"), primary_key=True)
+    scope = Column(String(20), primary_key=True)
+    last_read_at = Column(DateTime(timezone=True), nullable=False)
+
+class NotificationGroupLock(Base):
+    """
+    One row per recipient, locked while a grouped notification is merged so that
+    concurrent merges for the same user serialize. A row of its own: locking the
+    users row would also hold up inserts referencing the user (follows, comments,
+    likes on their posts) until the dispatcher's batch commits.
+    """
+    __tablename__ = "notification_group_locks"
+
+    recipient_id = Column(String(36), ForeignKey("users.id"), primary_key=True)
+
+class NotificationArchive(Base):
+    """
+    Read notifications moved out of the hot table by the retention job.
+    No foreign keys and created_at in the primary key, so MySQL can
+    RANGE-partition it by month and expire history by dropping partitions.
+    """
+    __tablename__ = "notifications_archive"
+    __table_args__ = (
+        Index("ix_notifications_archive_recipient_created", "recipient_id", "created_at"),
+    )
+
+    id = Column(String(36), primary_key=True)
+    created_at = Column(DateTime(timezone=True), primary_key=True)
+    recipient_id = Column(String(36), nullable=False)
+    sender_id = Column(String(36), nullable=True)
+    type = Column(Enum(NotificationType), nullable=False)
+    post_id = Column(String(36), nullable=True)
+    comment_id = Column(String(36), nullable=True)
+    content = Column(Text, nullable=True)
+    actor_count = Column(Integer, default=1, server_default="1", nullable=False)
+    actor_ids = Column(JSON, nullable=True)
+    archived_at = Column(DateTime(timezone=True), default=func.now(), server_default=func.now(), nullable=False)
@@ -0,0 +1,131 @@
+import asyncio
+from typing import List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import delete, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from src.apps.notifications import service
+from src.apps.notifications.models import Notification, NotificationOutbox
+from src.apps.notifications.schemas import NotificationCreate
+from src.core.config import settings
+from src.database.session import SessionLocal
+
+
+def enqueue_notification(db: AsyncSession, notification_in: NotificationCreate) -> None:
+    """
+    Stage a notification in the caller's transaction. It is committed (or rolled back)
+    together with the interaction, and created + pushed later by the dispatcher.
+    """
+    db.add(NotificationOutbox(payload=notification_in.model_dump(mode="json")))
+
+
+async def dispatch_batch(db: AsyncSession, limit: int) -> int:
+    """Process up to `limit` outbox rows. Returns the number of rows consumed."""
+    result = await db.execute(
+        select(NotificationOutbox)
+        .where(NotificationOutbox.failed_at.is_(None))
+        .order_by(NotificationOutbox.id)
+        .limit(limit)
+        # Several workers may run a dispatcher; each row is handled by one of them
+        .with_for_update(skip_locked=True)
+    )
+    rows = result.scalars().all()
+    if not rows:
+        return 0
+    # Read before a rollback expires the rows
+    row_ids = [r.id for r in rows]
+
+    try:
+        stored = []
+        # Grouped notifications lock their recipient; a fixed order avoids deadlocks
+        # with other dispatchers (the sort is stable, so per-recipient order is kept)
+        for row in sorted(rows, key=lambda r: r.payload.get("recipient_id") or ""):
+            stored.append(await service.store_notification(db, NotificationCreate(**row.payload)))
+        await db.execute(delete(NotificationOutbox).where(NotificationOutbox.id.in_(row_ids)))
+        await service.commit_notifications(db, stored)
+    except Exception as e:
+        # e.g. the post or comment was deleted in the meantime: isolate the bad row
+        print(f"Outbox batch failed, retrying rows one by one: {e}")
+        await db.rollback()
+        stored = await _dispatch_one_by_one(db, row_ids)
+
+    await service.push_notifications(db, stored)
+    return len(row_ids)
+
+
+async def _dispatch_one_by_one(db: AsyncSession, row_ids: List[int]) -> List[Tuple[Notification, str]]:
+    stored = []
+    for row_id in row_ids:
+        result = await db.execute(
+            select(NotificationOutbox).where(NotificationOutbox.id == row_id).with_for_update(skip_locked=True)
+        )
+        row = result.scalars().first()
+        if row is None:
+            continue
+        # Read before a rollback expires the row
+        attempts = row.attempts + 1
+        try:
+            item = await service.store_notification(db, NotificationCreate(**row.payload))
+            await db.delete(row)
+            await service.commit_notifications(db, [item])
+            stored.append(item)
+        except Exception as e:
+            # Any error counts, or the row would be picked up again by every batch
+            await db.rollback()
+            values = {"attempts": attempts, "last_error": str(e)[:500]}
+            # A payload that doesn't validate never will
+            if isinstance(e, ValidationError) or attempts >= settings.NOTIFICATION_OUTBOX_MAX_ATTEMPTS:
+                print(f"Dead-lettering outbox row {row_id} after {attempts} attempts: {e}")
+                values["failed_at"] = func.now()
+            await db.execute(update(NotificationOutbox).where(NotificationOutbox.id == row_id).values(**values))
+            await db.commit()
+    return stored
+
+
+class OutboxDispatcher:
+    """
+    Background task draining the notification outbox.
+    Interactions call `notify()` after committing so delivery doesn't wait for the poll interval.
+    """
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self):
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        batch_size = settings.NOTIFICATION_OUTBOX_BATCH_SIZE
+        while True:
+            self._wakeup.clear()
+            try:
+                async with SessionLocal() as db:
+                    # Keep draining while batches come back full
+                    while await dispatch_batch(db, batch_size) == batch_size:
+                        pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Outbox dispatcher error: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.NOTIFICATION_OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+outbox_dispatcher = OutboxDispatcher()
@@ -0,0 +1,183 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import and_, delete, insert, or_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from src.apps.notifications import service
+from src.apps.notifications.models import Notification, NotificationArchive
+from src.core.config import settings
+from src.database.session import SessionLocal
+
+# Copied verbatim from the hot table; archived rows are read by definition
+ARCHIVED_COLUMNS = [
+    "id", "created_at", "recipient_id", "sender_id", "type",
+    "post_id", "comment_id", "content", "actor_count", "actor_ids",
+]
+
+# --- Archive partitions (MySQL) ---
+# notifications_archive is RANGE-partitioned on TO_DAYS(created_at), one
+# partition per month named pYYYYMM plus a catch-all p_future. The hot
+# `notifications` table has foreign keys, which InnoDB does not allow on
+# partitioned tables, so it is kept small by the sweep below instead.
+
+def _add_months(month: date, n: int) -> date:
+    index = month.month - 1 + n
+    return date(month.year + index // 12, index % 12 + 1, 1)
+
+def _partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+def _partition_month(name: str) -> Optional[date]:
+    try:
+        return datetime.strptime(name, "p%Y%m").date()
+    except ValueError:
+        return None  # p_future
+
+async def maintain_archive_partitions(db: AsyncSession) -> None:
+    """Create upcoming monthly partitions and drop expired ones. No-op outside MySQL."""
+    if db.get_bind().dialect.name != "mysql":
+        return
+
+    result = await db.execute(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL"
+    ), {"table": NotificationArchive.__tablename__})
+    months = sorted(m for m in (_partition_month(row[0]) for row in result) if m is not None)
+    if not months:
+        return  # not partitioned
+
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    upcoming = [
+        _add_months(this_month, i)
+        for i in range(settings.NOTIFICATION_ARCHIVE_PARTITIONS_AHEAD + 1)
+        if _add_months(this_month, i) > months[-1]
+    ]
+    if upcoming:
+        definitions = ", ".join(
+            f"PARTITION {_partition_name(m)} VALUES LESS THAN (TO_DAYS('{_add_months(m, 1):%Y-%m-%d}'))"
+            for m in upcoming
+        )
+        await db.execute(text(
+            f"ALTER TABLE {NotificationArchive.__tablename__} REORGANIZE PARTITION p_future INTO "
+            f"({definitions}, PARTITION p_future VALUES LESS THAN MAXVALUE)"
+        ))
+
+    if settings.NOTIFICATION_ARCHIVE_RETENTION_MONTHS > 0:
+        oldest_kept = _add_months(this_month, -settings.NOTIFICATION_ARCHIVE_RETENTION_MONTHS)
+        expired = [_partition_name(m) for m in months if m < oldest_kept]
+        if expired:
+            # Dropping a partition is a metadata operation, unlike DELETE
+            await db.execute(text(
+                f"ALTER TABLE {NotificationArchive.__tablename__} DROP PARTITION {', '.join(expired)}"
+            ))
+
+# --- Sweep ---
+
+async def sweep_batch(db: AsyncSession, cutoff: datetime, limit: int) -> int:
+    """
+    Move (or delete) up to `limit` read notifications created before `cutoff`.
+    Returns the number of rows removed from the hot table.
+    """
+    result = await db.execute(
+        select(Notification.id)
+        .where(and_(Notification.created_at < cutoff, service.read_clause()))
+        .order_by(Notification.created_at)
+        .limit(limit)
+        # Every worker runs the job; each row is handled by one of them
+        .with_for_update(skip_locked=True)
+    )
+    ids = result.scalars().all()
+    if not ids:
+        return 0
+
+    if settings.NOTIFICATION_RETENTION_MODE == "archive":
+        await db.execute(
+            insert(NotificationArchive).from_select(
+                ARCHIVED_COLUMNS,
+                select(*[getattr(Notification, c) for c in ARCHIVED_COLUMNS]).where(Notification.id.in_(ids))
+            )
+        )
+    await db.execute(delete(Notification).where(Notification.id.in_(ids)))
+    await db.commit()
+    return len(ids)
+
+async def run_retention(db: AsyncSession) -> int:
+    """One retention pass. Returns the number of notifications moved out of the hot table."""
+    if settings.NOTIFICATION_RETENTION_DAYS <= 0:
+        return 0
+
+    if settings.NOTIFICATION_RETENTION_MODE == "archive":
+        await maintain_archive_partitions(db)
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.NOTIFICATION_RETENTION_DAYS)
+    batch_size = settings.NOTIFICATION_RETENTION_BATCH_SIZE
+    total = 0
+    while True:
+        moved = await sweep_batch(db, cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
+        # Short transactions; let request handlers in between
+        await asyncio.sleep(0)
+
+# --- Archive reads ---
+
+async def get_archived_notifications(
+    db: AsyncSession,
+    user_id: str,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> List[NotificationArchive]:
+    """Archived history, newest first, paged like the inbox (`cursor` = last id shown)."""
+    query = select(NotificationArchive).where(NotificationArchive.recipient_id == user_id)
+
+    if cursor:
+        anchor = select(NotificationArchive.created_at).where(
+            and_(NotificationArchive.id == cursor, NotificationArchive.recipient_id == user_id)
+        ).scalar_subquery()
+        query = query.where(or_(
+            NotificationArchive.created_at < anchor,
+            and_(NotificationArchive.created_at == anchor, NotificationArchive.id < cursor)
+        ))
+
+    query = query.order_by(NotificationArchive.created_at.desc(), NotificationArchive.id.desc()).limit(limit)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
+class RetentionJob:
+    """Background task running `run_retention` every NOTIFICATION_RETENTION_INTERVAL seconds."""
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                async with SessionLocal() as db:
+                    moved = await run_retention(db)
+                if moved:
+                    print(f"Notification retention: moved {moved} read notifications out of the hot table")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Notification retention error: {e}")
+
+            await asyncio.sleep(settings.NOTIFICATION_RETENTION_INTERVAL)
+
+
+retention_job = RetentionJob()
@@ -1,31 +1,61 @@
 import asyncio
 import json
-from typing import Any, List
+import random
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.apps.notifications import schemas, service
+from src.apps.notifications import retention, schemas, service
+from src.apps.notifications.models import NotificationType
 from src.apps.notifications.service import manager
 from src.apps.users.models import User
 from src.core import deps
+from src.core.config import settings
 from src.database.session import get_db
 
 router = APIRouter()
 
+
+def _sse_event(data: dict, event_id: Optional[int] = None) -> str:
+    """
+    One SSE frame. Messages with an "event" key (e.g. upload_processed) become
+    named events, so EventSource.onmessage keeps receiving notifications only.
+    """
+    frame = f"id: {event_id}\n" if event_id is not None else ""
+    if "event" in data:
+        frame += f"event: {data['event']}\n"
+    return frame + f"data: {json.dumps(data)}\n\n"
+
 @router.get("/", response_model=List[schemas.NotificationResponse])
 async def read_notifications(
     skip: int = 0,
     limit: int = 20,
-    type: str = None,
+    type: Optional[NotificationType] = None,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
     """
     Get current user's notifications.
+    For the next page pass the id of the last returned notification as `cursor`.
     """
     return await service.get_notifications(
-        db, user_id=current_user.id, skip=skip, limit=limit, type=type
+        db, user_id=current_user.id, skip=skip, limit=limit, type=type, cursor=cursor
+    )
+
+@router.get("/archive", response_model=List[schemas.NotificationArchiveResponse])
+async def read_archived_notifications(
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Notifications moved out of the inbox by the retention job.
+    """
+    return await retention.get_archived_notifications(
+        db, user_id=current_user.id, limit=limit, cursor=cursor
     )
 
 @router.get("/unread-count", response_model=schemas.UnreadCount)
@@ -49,39 +79,96 @@ async def mark_as_read(
 
 @router.post("/read-all")
 async def mark_all_as_read(
+    type: Optional[NotificationType] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
-    await service.mark_all_as_read(db, user_id=current_user.id)
+    """
+    Mark all notifications (or all of one type) as read.
+    """
+    await service.mark_all_as_read(db, user_id=current_user.id, type=type)
     return {"message": "All marked as read"}
 
+@router.get("/stream/stats")
+async def read_stream_stats(
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Queue depth, lag and dropped-message counters of the current user's
+    SSE connections held by this worker.
+    """
+    return manager.stats(current_user.id)
+
 @router.get("/stream")
 async def stream_notifications(
     token: str,
+    last_event_id: Optional[str] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
     db: AsyncSession = Depends(get_db)
 ):
     """
     SSE Endpoint.
+
+    Events carry per-user increasing ids. On reconnect the browser sends
+    `Last-Event-ID` (or pass `last_event_id` when re-creating the EventSource)
+    and only the missed events are replayed. If they are no longer buffered a
+    `resync` event tells the client to refetch the list and unread count.
     """
     # Authenticate manually since EventSource doesn't support headers
     user = await deps.get_current_user_from_token(token, db)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    resume_from = last_event_id_header or last_event_id
+    try:
+        resume_from = int(resume_from) if resume_from else None
+    except ValueError:
+        resume_from = None
+
     async def event_generator():
-        queue = await manager.connect(user.id)
+        # Subscribe before reading the replay buffer so nothing falls in between;
+        # events delivered both ways are skipped by id below.
+        connection = await manager.connect(user.id)
+        last_sent = resume_from or 0
         try:
+            # Spread reconnects out so a deploy doesn't bring every client back at once
+            retry = settings.SSE_RECONNECT_DELAY_MS
+            yield f"retry: {random.randint(retry, retry * 2)}\n\n"
+
+            if resume_from is not None:
+                missed, complete = await manager.replay(user.id, resume_from)
+                if not complete:
+                    # Ids may have been reset, so don't filter live events by the stale id
+                    last_sent = 0
+                    yield "event: resync\ndata: {}\n\n"
+                for event_id, data in missed:
+                    yield _sse_event(data, event_id)
+                    last_sent = event_id
+
             while True:
                 # Wait for messages
                 # Add timeout to send keep-alive
                 try:
-                    data = await asyncio.wait_for(queue.get(), timeout=15.0)
-                    yield f"data: {json.dumps(data)}\n\n"
+                    event_id, data = await connection.get(timeout=15.0)
                 except asyncio.TimeoutError:
                     # Send comment as keep-alive to prevent connection close
                     yield ": keep-alive\n\n"
+                    continue
+                if data is None:
+                    # Evicted as a slow consumer; EventSource reconnects on its own
+                    break
+                if event_id is None:
+                    # Unnumbered (e.g. sent while Redis was down): never filtered by id
+                    yield _sse_event(data)
+                    continue
+                if event_id <= last_sent:
+                    continue
+                yield _sse_event(data, event_id)
+                last_sent = event_id
         except asyncio.CancelledError:
-            manager.disconnect(user.id, queue)
             print(f"Stream cancelled for user {user.id}")
+            raise
+        finally:
+            manager.disconnect(user.id, connection)
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
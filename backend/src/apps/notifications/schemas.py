@@ -1,6 +1,6 @@
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from src.apps.notifications.models import NotificationType
 from src.apps.users.schemas import UserResponse
 
@@ -23,9 +23,25 @@ class NotificationResponse(NotificationBase):
     id: str
     created_at: Optional[datetime] = None
     sender: Optional[UserResponse] = None
+    actor_count: int = 1
+    actor_ids: Optional[List[str]] = None
     # We could include post preview here if needed, but let's keep it simple for now
     
     model_config = ConfigDict(from_attributes=True)
 
+class NotificationArchiveResponse(BaseModel):
+    id: str
+    sender_id: Optional[str] = None
+    type: NotificationType
+    post_id: Optional[str] = None
+    comment_id: Optional[str] = None
+    content: Optional[str] = None
+    actor_count: int = 1
+    actor_ids: Optional[List[str]] = None
+    created_at: datetime
+    archived_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
 class UnreadCount(BaseModel):
     count: int
\ No newline at end of file
@@ -1,49 +1,446 @@
 import asyncio
-from typing import Dict, List
+import json
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Dict, List, Optional, Set, Tuple
 from fastapi import APIRouter
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, update, and_
-from src.apps.notifications.models import Notification, NotificationType
+from sqlalchemy import func, update, and_, or_
+from sqlalchemy.orm.attributes import set_committed_value
+from src.apps.notifications import cache
+from src.apps.notifications.models import Notification, NotificationGroupLock, NotificationReadState, NotificationType
 from src.apps.notifications.schemas import NotificationCreate, NotificationUpdate
+from src.core.config import settings
+from src.database.redis import redis_client
 
 # --- Connection Manager for SSE ---
+class SSEConnection:
+    """
+    One SSE stream (a device/tab) with a bounded outbound queue.
+
+    When the queue is full the overflow policy decides what happens:
+    - "drop_oldest": discard the oldest queued message
+    - "collapse": replace everything queued with a single unread-count update
+    - "disconnect": evict the connection; the client reconnects and refetches
+    """
+    def __init__(self, user_id: str, maxsize: int):
+        self.id = str(uuid.uuid4())
+        self.user_id = user_id
+        # Items are (enqueued_at, event_id, message); a None message ends the stream
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.connected_at = time.time()
+        self.delivered = 0
+        self.dropped = 0
+        self.lag = 0.0  # seconds the last delivered message spent queued
+        self.closed = False
+
+    def put(self, message: dict, policy: str, event_id: Optional[int] = None):
+        if self.closed:
+            return
+        if self.queue.full():
+            if policy == "disconnect":
+                self.dropped += len(self._drain()) + 1
+                self.closed = True
+                self.queue.put_nowait((time.monotonic(), None, None))
+                return
+            if policy == "collapse" and self._collapse(message, event_id):
+                return
+            # drop_oldest (also used when there is no unread count to collapse into)
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait((time.monotonic(), event_id, message))
+
+    async def get(self, timeout: float) -> Tuple[Optional[int], Optional[dict]]:
+        """Next (event_id, message); message is None once the stream was evicted."""
+        enqueued_at, event_id, message = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        if message is not None:
+            self.delivered += 1
+            self.lag = time.monotonic() - enqueued_at
+        return event_id, message
+
+    def _drain(self) -> list:
+        drained = []
+        while not self.queue.empty():
+            drained.append(self.queue.get_nowait())
+        return drained
+
+    def _collapse(self, message: dict, event_id: Optional[int]) -> bool:
+        drained = self._drain()
+        # The newest message carries the freshest count; fall back to queued ones
+        unread_count = message.get("unread_count")
+        for _, _, queued in reversed(drained):
+            if unread_count is not None:
+                break
+            unread_count = queued.get("unread_count")
+
+        if unread_count is None:
+            for item in drained:
+                self.queue.put_nowait(item)
+            return False
+
+        self.dropped += len(drained) + 1
+        # Keep the newest event id so a later reconnect resumes after the collapsed events
+        summary = {"type": "unread_count", "unread_count": unread_count}
+        self.queue.put_nowait((time.monotonic(), event_id, summary))
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "id": self.id,
+            "connected_at": self.connected_at,
+            "queued": self.queue.qsize(),
+            "lag_seconds": round(self.lag, 3),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
 class ConnectionManager:
+    """
+    Per-process registry of SSE connections, bridged across processes by Redis pub/sub.
+
+    `send_personal_message` publishes to the recipient's channel. Every worker subscribes
+    only to the channels of users it holds a stream for, and fans the message out to all
+    of that user's local connections (one bounded queue per device/tab).
+    If Redis is unavailable (or the backplane is disabled) messages are delivered
+    to local connections only.
+
+    Every message gets a per-user, monotonically increasing event id and is kept
+    in a short ring buffer, so a reconnecting client can send `Last-Event-ID`
+    and receive only what it missed (see `replay`). The same buffer covers the
+    worker's own gaps: messages published while its subscription was down are
+    delivered from the buffer once the listener has resubscribed. Messages sent
+    while Redis is unreachable go out without an id: they are neither filtered
+    nor replayable, and a reconnect during the outage gets a `resync`.
+    """
+    CHANNEL_PREFIX = "notifications:user:"
+    RETRY_DELAY = 1.0  # seconds between backplane reconnect attempts
+
+    # Event id, replay buffer and publish in one step, so subscribers and the
+    # buffer see ids in the order they were assigned
+    _PUBLISH_SCRIPT = """
+local id = redis.call('INCR', KEYS[1])
+local envelope = '{"id": ' .. id .. ', "data": ' .. ARGV[1] .. '}'
+redis.call('RPUSH', KEYS[2], envelope)
+redis.call('LTRIM', KEYS[2], -tonumber(ARGV[2]), -1)
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('PUBLISH', ARGV[4], envelope)
+return id
+"""
+
     def __init__(self):
-        # user_id -> List[Queue] (support multiple devices/tabs)
-        self.active_connections: Dict[str, List[asyncio.Queue]] = {}
+        # user_id -> List[SSEConnection] (support multiple devices/tabs)
+        self.active_connections: Dict[str, List[SSEConnection]] = {}
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        # Users whose last local stream closed; unsubscribed by the listener
+        self._stale_users: Set[str] = set()
+        # user_id -> newest event id this worker has delivered, where catch-up resumes
+        self._delivered: Dict[str, int] = {}
+        # In-process event ids and replay buffers, used only without the backplane
+        self._local_seq: Dict[str, int] = {}
+        self._local_buffers: Dict[str, Deque[Tuple[int, dict]]] = {}
 
-    async def connect(self, user_id: str) -> asyncio.Queue:
-        queue = asyncio.Queue()
+    def _channel(self, user_id: str) -> str:
+        return f"{self.CHANNEL_PREFIX}{user_id}"
+
+    async def connect(self, user_id: str) -> SSEConnection:
+        connection = SSEConnection(user_id, maxsize=settings.SSE_QUEUE_MAXSIZE)
         if user_id not in self.active_connections:
             self.active_connections[user_id] = []
-        self.active_connections[user_id].append(queue)
+            self._stale_users.discard(user_id)
+            if settings.SSE_REDIS_BACKPLANE:
+                # Read before subscribing: if the subscribe fails, catch-up starts here
+                seq = await self._current_seq(user_id)
+                if seq is not None:
+                    self._delivered[user_id] = seq
+            await self._subscribe(user_id)
+        self.active_connections[user_id].append(connection)
         print(f"User {user_id} connected. Active connections: {len(self.active_connections.get(user_id, []))}")
-        return queue
+        return connection
 
-    def disconnect(self, user_id: str, queue: asyncio.Queue):
+    def disconnect(self, user_id: str, connection: SSEConnection):
         if user_id in self.active_connections:
-            if queue in self.active_connections[user_id]:
-                self.active_connections[user_id].remove(queue)
+            if connection in self.active_connections[user_id]:
+                self.active_connections[user_id].remove(connection)
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
+                self._stale_users.add(user_id)
+                self._delivered.pop(user_id, None)
         print(f"User {user_id} disconnected.")
 
     async def send_personal_message(self, user_id: str, message: dict):
+        if not settings.SSE_REDIS_BACKPLANE:
+            event_id = self._record_local(user_id, message)
+            await self._deliver_local(user_id, event_id, message)
+            return
+
+        try:
+            await redis_client.eval(
+                self._PUBLISH_SCRIPT, 2,
+                f"notifications:seq:{user_id}", f"notifications:replay:{user_id}",
+                json.dumps(message), settings.SSE_REPLAY_BUFFER_SIZE, settings.SSE_REPLAY_TTL,
+                self._channel(user_id),
+            )
+            return
+        except RedisError as e:
+            print(f"SSE backplane publish failed, delivering locally: {e}")
+        # Without an id: ids come from Redis only. A local counter would restart
+        # below the ids clients already hold, and streams drop ids they've seen.
+        await self._deliver_local(user_id, None, message)
+
+    def _record_local(self, user_id: str, message: dict) -> int:
+        """Assign the next in-process event id for `user_id` and keep the message for replay."""
+        event_id = self._local_seq.get(user_id, 0) + 1
+        self._local_seq[user_id] = event_id
+        buffer = self._local_buffers.setdefault(user_id, deque(maxlen=settings.SSE_REPLAY_BUFFER_SIZE))
+        buffer.append((event_id, message))
+        return event_id
+
+    async def replay(self, user_id: str, last_event_id: int) -> Tuple[List[Tuple[int, dict]], bool]:
+        """
+        Events after `last_event_id` that are still buffered, oldest first.
+        The flag is False when some missed events have already left the buffer
+        (or ids were reset, or Redis is unavailable), i.e. the client has to refetch instead.
+        """
+        events: List[Tuple[int, dict]] = []
+        if settings.SSE_REDIS_BACKPLANE:
+            try:
+                pipe = redis_client.pipeline(transaction=False)
+                pipe.get(f"notifications:seq:{user_id}")
+                pipe.lrange(f"notifications:replay:{user_id}", 0, -1)
+                seq, raw_events = await pipe.execute()
+            except RedisError as e:
+                print(f"SSE replay buffer read failed: {e}")
+                return [], False
+            current = int(seq or 0)
+            for raw in raw_events:
+                event = json.loads(raw)
+                events.append((event["id"], event["data"]))
+        else:
+            current = self._local_seq.get(user_id, 0)
+            events = list(self._local_buffers.get(user_id, ()))
+
+        if last_event_id > current:
+            return [], False
+        missed = [(event_id, data) for event_id, data in events if event_id > last_event_id]
+        complete = last_event_id == current or (bool(events) and events[0][0] <= last_event_id + 1)
+        return missed, complete
+
+    async def _deliver_local(self, user_id: str, event_id: Optional[int], message: dict):
+        # Never await a consumer here: a stalled tab must not delay the others
         if user_id in self.active_connections:
-            for queue in self.active_connections[user_id]:
-                await queue.put(message)
+            if event_id is not None:
+                self._delivered[user_id] = max(event_id, self._delivered.get(user_id, 0))
+            for connection in list(self.active_connections[user_id]):
+                connection.put(message, settings.SSE_OVERFLOW_POLICY, event_id)
+                if connection.closed:
+                    print(f"Evicting slow SSE consumer {connection.id} of user {user_id} (dropped {connection.dropped})")
+                    self.disconnect(user_id, connection)
             print(f"Sent message to user {user_id}: {message}")
 
+    def stats(self, user_id: str) -> List[dict]:
+        return [c.stats() for c in self.active_connections.get(user_id, [])]
+
+    async def _current_seq(self, user_id: str) -> Optional[int]:
+        try:
+            return int(await redis_client.get(f"notifications:seq:{user_id}") or 0)
+        except RedisError as e:
+            print(f"SSE sequence read failed for user {user_id}: {e}")
+            return None
+
+    async def _catch_up(self):
+        """After (re)subscribing, deliver what was published while this worker wasn't listening."""
+        for user_id in list(self.active_connections):
+            since = self._delivered.get(user_id)
+            if since is None:
+                # Connected while Redis was down: no position to resume from
+                seq = await self._current_seq(user_id)
+                if seq is not None:
+                    self._delivered[user_id] = seq
+                    await self._deliver_local(user_id, None, {"event": "resync"})
+                continue
+            missed, complete = await self.replay(user_id, since)
+            if not complete:
+                await self._deliver_local(user_id, None, {"event": "resync"})
+            for event_id, data in missed:
+                await self._deliver_local(user_id, event_id, data)
+
+    async def _subscribe(self, user_id: str):
+        if not settings.SSE_REDIS_BACKPLANE:
+            return
+        try:
+            if self._pubsub is None:
+                self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(self._channel(user_id))
+        except RedisError as e:
+            # The listener re-subscribes every local user once Redis is reachable again
+            print(f"SSE backplane subscribe failed for user {user_id}: {e}")
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        resubscribe = False
+        while True:
+            try:
+                if resubscribe and self.active_connections:
+                    if self._pubsub is None:
+                        self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                    await self._pubsub.subscribe(*(self._channel(u) for u in self.active_connections))
+                    await self._catch_up()
+                resubscribe = False
+
+                if self._pubsub is None or not self._pubsub.subscribed:
+                    # Nothing subscribed (yet), e.g. Redis was down at connect time
+                    resubscribe = bool(self.active_connections)
+                    await asyncio.sleep(self.RETRY_DELAY)
+                    continue
+
+                stale = [u for u in self._stale_users if u not in self.active_connections]
+                self._stale_users.clear()
+                if stale:
+                    await self._pubsub.unsubscribe(*(self._channel(u) for u in stale))
+
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message["type"] == "message":
+                    user_id = message["channel"][len(self.CHANNEL_PREFIX):]
+                    envelope = json.loads(message["data"])
+                    await self._deliver_local(user_id, envelope["id"], envelope["data"])
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, RuntimeError) as e:
+                print(f"SSE backplane listener error: {e}")
+                resubscribe = True
+                await asyncio.sleep(self.RETRY_DELAY)
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except RedisError:
+                pass
+            self._pubsub = None
+
 manager = ConnectionManager()
 
 # --- Service Functions ---
 
 from src.apps.users.models import User
 
-# ... existing code ...
+# Types merged into one row per (recipient, type, target) while unread
+GROUPED_TYPES = {NotificationType.LIKE, NotificationType.COMMENT, NotificationType.FOLLOW}
+
+# --- Read State ---
+# A notification is read when it was read individually (is_read) or was created
+# before the user's watermark for "all" or for its type. Mark-all only moves the
+# watermark, so its cost does not depend on how many notifications are unread.
+ALL_SCOPE = "all"
+
+async def get_read_watermarks(db: AsyncSession, user_id: str) -> Dict[str, datetime]:
+    result = await db.execute(
+        select(NotificationReadState).where(NotificationReadState.user_id == user_id)
+    )
+    return {state.scope: state.last_read_at for state in result.scalars().all()}
+
+def _watermark_for(watermarks: Dict[str, datetime], type: NotificationType) -> Optional[datetime]:
+    candidates = [w for w in (watermarks.get(ALL_SCOPE), watermarks.get(type.value)) if w is not None]
+    return max(candidates) if candidates else None
+
+def _watermark_subquery(user_id, scope: str):
+    # user_id may be a column (e.g. Notification.recipient_id) for a correlated subquery
+    return select(NotificationReadState.last_read_at).where(
+        and_(NotificationReadState.user_id == user_id, NotificationReadState.scope == scope)
+    ).scalar_subquery()
+
+def _unread_clause(user_id: str, watermarks: Dict[str, datetime]):
+    """
+    SQL for "unread" given the scopes the user has watermarks for.
+    Watermarks are compared inside the database (scalar subqueries on the
+    primary key) so both sides share the database's datetime representation.
+    """
+    clauses = [Notification.is_read == False]
+    if ALL_SCOPE in watermarks:
+        clauses.append(Notification.created_at >= _watermark_subquery(user_id, ALL_SCOPE))
+    for type in NotificationType:
+        if type.value in watermarks:
+            clauses.append(or_(
+                Notification.type != type,
+                Notification.created_at >= _watermark_subquery(user_id, type.value)
+            ))
+    return and_(*clauses)
+
+def read_clause():
+    """
+    SQL for "read" across all users, correlated on recipient_id.
+    Used by retention sweeps that are not scoped to one user.
+    """
+    return or_(
+        Notification.is_read == True,
+        Notification.created_at < _watermark_subquery(Notification.recipient_id, ALL_SCOPE),
+        *[
+            and_(
+                Notification.type == type,
+                Notification.created_at < _watermark_subquery(Notification.recipient_id, type.value)
+            )
+            for type in NotificationType
+        ]
+    )
+
+def _is_unread(notification: Notification, watermarks: Dict[str, datetime]) -> bool:
+    if notification.is_read:
+        return False
+    watermark = _watermark_for(watermarks, notification.type)
+    return watermark is None or notification.created_at >= watermark
+
+async def _find_group(
+    db: AsyncSession, notification_in: NotificationCreate, watermarks: Dict[str, datetime]
+) -> Optional[Notification]:
+    window_start = datetime.now(timezone.utc) - timedelta(seconds=settings.NOTIFICATION_GROUP_WINDOW)
+    stmt = select(Notification).where(
+        and_(
+            Notification.recipient_id == notification_in.recipient_id,
+            Notification.type == notification_in.type,
+            # FOLLOW has no target: `== None` compiles to IS NULL
+            Notification.post_id == notification_in.post_id,
+            _unread_clause(notification_in.recipient_id, watermarks),
+            Notification.created_at >= window_start
+        )
+    ).order_by(Notification.created_at.desc()).limit(1).with_for_update()
+    result = await db.execute(stmt)
+    return result.scalars().first()
+
+async def _lock_recipient(db: AsyncSession, recipient_id: str):
+    lock = select(NotificationGroupLock).where(NotificationGroupLock.recipient_id == recipient_id).with_for_update()
+    if (await db.execute(lock)).scalars().first() is None:
+        # First grouped notification for this user: the new row stays locked until
+        # commit. A concurrent first insert fails on the key and is retried.
+        db.add(NotificationGroupLock(recipient_id=recipient_id))
+        await db.flush()
+
+async def store_notification(db: AsyncSession, notification_in: NotificationCreate) -> Tuple[Notification, str]:
+    """
+    Insert or merge a notification without committing.
+    Returns the row and what happened to it: "created", "merged" or "duplicate"
+    (nothing changed). Commit with `commit_notifications`, then call `push_notifications`.
+    """
+    if notification_in.type in GROUPED_TYPES:
+        # Serialize dedup/merge per recipient until commit: concurrent likes would
+        # otherwise both miss the group (two groups) or both merge into one stale row.
+        # Row locks on the group alone can't cover the case where it doesn't exist yet.
+        await _lock_recipient(db, notification_in.recipient_id)
+
+    watermarks = await get_read_watermarks(db, notification_in.recipient_id)
 
-async def create_notification(db: AsyncSession, notification_in: NotificationCreate) -> Notification:
     # Business Logic: Avoid duplicate notifications for same action (e.g. repeated likes)
     # For LIKE type, check if unread notification exists
     if notification_in.type == NotificationType.LIKE:
@@ -53,7 +450,7 @@ async def create_notification(db: AsyncSession, notification_in: NotificationCre
                 Notification.sender_id == notification_in.sender_id,
                 Notification.type == NotificationType.LIKE,
                 Notification.post_id == notification_in.post_id,
-                Notification.is_read == False
+                _unread_clause(notification_in.recipient_id, watermarks)
             )
         )
         result = await db.execute(stmt)
@@ -61,89 +458,253 @@ async def create_notification(db: AsyncSession, notification_in: NotificationCre
         if existing:
             # Update timestamp to bring it to top? Or just ignore.
             # Let's ignore to avoid spam.
-            return existing
+            return existing, "duplicate"
 
-    db_notification = Notification(**notification_in.model_dump())
+    group = None
+    if notification_in.type in GROUPED_TYPES and settings.NOTIFICATION_GROUP_WINDOW > 0:
+        group = await _find_group(db, notification_in, watermarks)
+
+    if group is not None:
+        actor_ids = list(group.actor_ids or ([group.sender_id] if group.sender_id else []))
+        is_new_actor = notification_in.sender_id not in actor_ids
+        if not is_new_actor and notification_in.type != NotificationType.COMMENT:
+            # Same person liking/following again within the window
+            return group, "duplicate"
+
+        if is_new_actor:
+            # Incremented in the database, not from the possibly stale loaded value
+            group.actor_count = func.coalesce(Notification.actor_count, 1) + 1
+        recent = [notification_in.sender_id] + [a for a in actor_ids if a != notification_in.sender_id]
+        group.actor_ids = recent[:settings.NOTIFICATION_GROUP_MAX_ACTORS]
+        group.sender_id = notification_in.sender_id
+        group.comment_id = notification_in.comment_id
+        group.content = notification_in.content
+        # Bump to the top of the inbox; the window slides while the burst continues
+        group.created_at = func.now()
+        # Flush so later merges in the same transaction find this row
+        await db.flush()
+        return group, "merged"
+
+    db_notification = Notification(
+        **notification_in.model_dump(),
+        actor_ids=[notification_in.sender_id] if notification_in.sender_id else None
+    )
     db.add(db_notification)
-    await db.commit()
-    await db.refresh(db_notification)
-    
+    await db.flush()
+    return db_notification, "created"
+
+def _new_notifications(stored: List[Tuple[Notification, str]]) -> List[Notification]:
+    # A row created and then merged again within one batch is new once
+    new: Dict[str, Notification] = {}
+    for notification, outcome in stored:
+        if outcome == "created":
+            new[notification.id] = notification
+    return list(new.values())
+
+async def commit_notifications(db: AsyncSession, stored: List[Tuple[Notification, str]]):
+    """
+    Commit the transaction holding `stored`. New notifications stay pending on
+    their recipients' unread counters until `push_notifications` counts them, so
+    a count rebuilt in between (which already sees the rows) isn't cached.
+    """
+    changes: Dict[str, int] = {}
+    for notification in _new_notifications(stored):
+        changes[notification.recipient_id] = changes.get(notification.recipient_id, 0) + 1
+    for recipient_id, count in changes.items():
+        await cache.begin_unread_change(recipient_id, count)
+    try:
+        await db.commit()
+    except Exception:
+        for recipient_id, count in changes.items():
+            for _ in range(count):
+                await cache.adjust_unread_count(recipient_id, 0)
+        raise
+
+async def push_notifications(db: AsyncSession, stored: List[Tuple[Notification, str]]):
+    """Update unread counters and push notifications stored by `commit_notifications`."""
+    new_ids = {notification.id for notification in _new_notifications(stored)}
+    notifications: Dict[str, Notification] = {}
+    for notification, outcome in stored:
+        if outcome != "duplicate":
+            notifications[notification.id] = notification
+    if not notifications:
+        return
+
     # Real-time Push via SSE
     # We need to construct the payload.
     # Ideally we should fetch sender info to display "Alice liked your post"
-    sender_name = "Someone"
-    sender_avatar = None
-    
-    if db_notification.sender_id:
-        user_result = await db.execute(select(User).where(User.id == db_notification.sender_id))
-        sender = user_result.scalars().first()
-        if sender:
-            sender_name = sender.username
-            sender_avatar = sender.avatar
-
-    # Get unread count to push
-    unread_count = await get_unread_count(db, notification_in.recipient_id)
-    
-    push_payload = {
-        "type": notification_in.type.value,
-        "unread_count": unread_count,
-        "data": {
-            "id": db_notification.id,
-            "sender": {
-                "id": db_notification.sender_id,
-                "username": sender_name,
-                "avatar": sender_avatar
-            },
-            "content": db_notification.content
+    for notification in notifications.values():
+        await db.refresh(notification)
+    sender_ids = {n.sender_id for n in notifications.values() if n.sender_id}
+    senders: Dict[str, User] = {}
+    if sender_ids:
+        user_result = await db.execute(select(User).where(User.id.in_(sender_ids)))
+        senders = {u.id: u for u in user_result.scalars().all()}
+
+    for notification in notifications.values():
+        is_new = notification.id in new_ids
+        unread_count = None
+        if is_new:
+            unread_count = await cache.adjust_unread_count(notification.recipient_id, 1)
+        if notification.type in GROUPED_TYPES:
+            # Merged rows are still a single unread row, so the counter is unchanged.
+            # A popular post would otherwise push on every like: send at most one
+            # update per interval (a new row just starts the interval).
+            acquired = await cache.acquire_push_slot(notification.id, settings.NOTIFICATION_GROUP_PUSH_INTERVAL)
+            if not is_new and not acquired:
+                continue
+
+        # Get unread count to push (rebuilt from the database if not cached)
+        if unread_count is None:
+            unread_count = await get_unread_count(db, notification.recipient_id)
+
+        sender = senders.get(notification.sender_id)
+        push_payload = {
+            "type": notification.type.value,
+            "unread_count": unread_count,
+            "data": {
+                "id": notification.id,
+                "sender": {
+                    "id": notification.sender_id,
+                    "username": sender.username if sender else "Someone",
+                    "avatar": sender.avatar if sender else None
+                },
+                "content": notification.content,
+                "actor_count": notification.actor_count
+            }
         }
-    }
-    
-    await manager.send_personal_message(notification_in.recipient_id, push_payload)
-    
-    return db_notification
+
+        await manager.send_personal_message(notification.recipient_id, push_payload)
+
+async def create_notification(db: AsyncSession, notification_in: NotificationCreate) -> Notification:
+    """Create (or merge) a notification and push it right away, in its own transaction."""
+    notification, outcome = await store_notification(db, notification_in)
+    if outcome == "duplicate":
+        return notification
+    await commit_notifications(db, [(notification, outcome)])
+    await push_notifications(db, [(notification, outcome)])
+    return notification
 
 async def get_notifications(
     db: AsyncSession, 
     user_id: str, 
     skip: int = 0, 
     limit: int = 20,
-    type: str = None
+    type: Optional[NotificationType] = None,
+    cursor: Optional[str] = None
 ) -> List[Notification]:
+    """
+    Newest first. Pass the id of the last notification already shown as `cursor`
+    to page with a keyset seek instead of OFFSET; `skip` is kept for old clients.
+    """
     query = select(Notification).where(Notification.recipient_id == user_id)
     
     if type:
         query = query.where(Notification.type == type)
+
+    if cursor:
+        # Seek past the anchor row on (created_at, id), the order of the
+        # (recipient_id[, type], created_at) indexes. The anchor's timestamp is
+        # read in the database; an unknown or archived anchor yields an empty page.
+        anchor = select(Notification.created_at).where(
+            and_(Notification.id == cursor, Notification.recipient_id == user_id)
+        ).scalar_subquery()
+        query = query.where(or_(
+            Notification.created_at < anchor,
+            and_(Notification.created_at == anchor, Notification.id < cursor)
+        ))
         
-    query = query.order_by(Notification.created_at.desc()).offset(skip).limit(limit)
+    query = query.order_by(Notification.created_at.desc(), Notification.id.desc()).offset(skip).limit(limit)
     
     # Eager load sender for UI display
     from sqlalchemy.orm import selectinload
     query = query.options(selectinload(Notification.sender))
     
     result = await db.execute(query)
-    return result.scalars().all()
+    notifications = result.scalars().all()
+
+    # Rows behind the watermark are read even though their is_read flag was never set
+    watermarks = await get_read_watermarks(db, user_id)
+    for notification in notifications:
+        if not notification.is_read and not _is_unread(notification, watermarks):
+            set_committed_value(notification, "is_read", True)
+    return notifications
 
 async def get_unread_count(db: AsyncSession, user_id: str) -> int:
+    cached, generation = await cache.get_unread_count(user_id)
+    if cached is not None:
+        return cached
+
+    # Lazy rebuild: count once, then keep the counter up to date on writes.
+    # A range count over (recipient_id, created_at) above the watermark.
+    watermarks = await get_read_watermarks(db, user_id)
     stmt = select(func.count()).select_from(Notification).where(
-        and_(Notification.recipient_id == user_id, Notification.is_read == False)
+        and_(Notification.recipient_id == user_id, _unread_clause(user_id, watermarks))
     )
     result = await db.execute(stmt)
-    return result.scalar() or 0
+    count = result.scalar() or 0
+    # Not stored if the counter changed while we were counting
+    await cache.store_rebuilt_unread_count(user_id, count, generation)
+    return count
+
+async def mark_as_read(db: AsyncSession, notification_id: str, user_id: str) -> Optional[Notification]:
+    result = await db.execute(
+        select(Notification).where(
+            and_(Notification.id == notification_id, Notification.recipient_id == user_id)
+        )
+    )
+    notification = result.scalars().first()
+    if not notification:
+        return None
+
+    watermarks = await get_read_watermarks(db, user_id)
+    if not _is_unread(notification, watermarks):
+        set_committed_value(notification, "is_read", True)
+        return notification
 
-async def mark_as_read(db: AsyncSession, notification_id: str, user_id: str) -> Notification:
+    # Conditional update: concurrent requests decrement the counter only once
     stmt = update(Notification).where(
-        and_(Notification.id == notification_id, Notification.recipient_id == user_id)
+        and_(Notification.id == notification_id, Notification.is_read == False)
     ).values(is_read=True)
-    await db.execute(stmt)
+    result = await db.execute(stmt)
+    await cache.begin_unread_change(user_id)
     await db.commit()
-    
-    # Fetch updated notification
-    result = await db.execute(select(Notification).where(Notification.id == notification_id))
-    return result.scalars().first()
+    await cache.adjust_unread_count(user_id, -1 if result.rowcount else 0)
+    set_committed_value(notification, "is_read", True)
+    return notification
 
-async def mark_all_as_read(db: AsyncSession, user_id: str):
-    stmt = update(Notification).where(
-        and_(Notification.recipient_id == user_id, Notification.is_read == False)
-    ).values(is_read=True)
-    await db.execute(stmt)
+async def mark_all_as_read(db: AsyncSession, user_id: str, type: Optional[NotificationType] = None):
+    """
+    Move the user's read watermark (for all types, or just `type`) to now.
+    Does not rewrite the unread rows themselves, apart from the few stamped
+    with the watermark's own time.
+    """
+    scope = type.value if type else ALL_SCOPE
+
+    # Database time, the same clock that stamps created_at
+    state = await db.get(NotificationReadState, (user_id, scope))
+    if state is None:
+        db.add(NotificationReadState(user_id=user_id, scope=scope, last_read_at=func.now()))
+    else:
+        state.last_read_at = func.now()
+    await db.flush()
+
+    # Rows stamped with exactly the watermark's time are not covered by it
+    # (unread means created_at >= watermark), so flag those few individually.
+    # Later rows stay unread, even if they were committed before this UPDATE.
+    boundary = [
+        Notification.recipient_id == user_id,
+        Notification.created_at == _watermark_subquery(user_id, scope),
+        Notification.is_read == False,
+    ]
+    if type:
+        boundary.append(Notification.type == type)
+    await db.execute(
+        update(Notification).where(and_(*boundary)).values(is_read=True)
+        .execution_options(synchronize_session="fetch")
+    )
     await db.commit()
+
+    # Not simply zero: other types, or rows newer than the watermark, may still be
+    # unread. Recount lazily on the next read (a range count above the watermark).
+    await cache.invalidate_unread_count(user_id)
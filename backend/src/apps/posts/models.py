@@ -2,7 +2,7 @@ import enum
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import JSON, DateTime, Float, ForeignKey, Integer, LargeBinary, String, Text
 from sqlalchemy import Enum as SQLAlchemyEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.database.base import Base
@@ -68,6 +68,12 @@ class PostImage(Base):
     width: Mapped[int] = mapped_column(Integer, nullable=True)
     height: Mapped[int] = mapped_column(Integer, nullable=True)
     order: Mapped[int] = mapped_column(Integer, default=0) # To maintain order
+    # Resized copies generated at upload: {"webp": {"320": url, ...}, "jpeg": {...}}
+    renditions: Mapped[dict] = mapped_column(JSON, nullable=True)
+    # Filled by the AI backfill (python -m src.apps.ai.backfill)
+    ai_tags: Mapped[list] = mapped_column(JSON, nullable=True)
+    ai_labels_version: Mapped[str] = mapped_column(String(16), nullable=True) # labels_fingerprint() at tagging time
+    embedding: Mapped[bytes] = mapped_column(LargeBinary, nullable=True) # normalized CLIP image embedding, float32
     
     post = relationship("Post", back_populates="images")
     
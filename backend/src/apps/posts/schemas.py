@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, computed_field
 from src.apps.posts.models import DynamicRange, FilmSimulation
 from src.apps.users.schemas import UserResponse
 from src.apps.tags.schemas import TagResponse
@@ -47,6 +47,7 @@ class PostImageCreate(BaseModel):
     width: Optional[int] = None
     height: Optional[int] = None
     order: int = 0
+    renditions: Optional[Dict[str, Dict[str, str]]] = None
     exif: Optional[ExifDataCreate] = None
     recipe: Optional[FujiRecipeCreate] = None
 
@@ -56,10 +57,20 @@ class PostImageResponse(BaseModel):
     width: Optional[int] = None
     height: Optional[int] = None
     order: int
+    renditions: Optional[Dict[str, Dict[str, str]]] = None
     exif: Optional[ExifDataResponse] = None
     recipe: Optional[FujiRecipeResponse] = None
     model_config = ConfigDict(from_attributes=True)
 
+    @computed_field
+    @property
+    def srcset(self) -> Dict[str, str]:
+        """Per format, an `<img srcset>` value such as "…/320.webp 320w, …/640.webp 640w"."""
+        return {
+            fmt: ", ".join(f"{url} {width}w" for width, url in sorted(sizes.items(), key=lambda item: int(item[0])))
+            for fmt, sizes in (self.renditions or {}).items()
+        }
+
 class PostBase(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -79,7 +79,8 @@ async def create_post(db: AsyncSession, post_in: PostCreate, user_id: str) -> Po
             image_path=img_in.image_path,
             width=img_in.width,
             height=img_in.height,
-            order=idx
+            order=idx,
+            renditions=img_in.renditions
         )
         db.add(db_image)
         await db.flush() # get image ID
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Response
+from fastapi.responses import PlainTextResponse
+from src.apps.ai import service as ai_service
+from src.utils.metrics import render_metrics
+from src.utils.storage import storage_ready
+
+router = APIRouter()
+
+@router.get("/health")
+async def health(response: Response):
+    """
+    Readiness: 200 once object storage is set up and image tagging can serve
+    requests, 503 until then.
+    """
+    ai = await ai_service.readiness()
+    storage = storage_ready()
+    ready = storage and ai["ready"]
+    if not ready:
+        response.status_code = 503
+    return {"status": "ok" if ready else "starting", "storage": storage, "ai": ai}
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Process metrics in the Prometheus text format.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
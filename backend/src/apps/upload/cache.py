@@ -0,0 +1,170 @@
+import json
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from redis.exceptions import RedisError
+from src.core.config import settings
+from src.database.redis import redis_client
+
+# Background processing results (tags, renditions) of uploads, per uploader:
+# only the user who uploaded a file can read its result. Upload ids are
+# SHA-256s, so two users uploading the same file get separate entries.
+# In-process fallback while Redis is unavailable: only visible to this worker.
+_LOCAL_MAX = 1000
+_local_entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+# Marks an upload token whose /complete is still running
+_COMPLETING = "completing"
+
+# Add an upload to the pending job for its file. 1 if there was none (the
+# caller queues the job), 0 if the upload now waits for the pending one.
+_JOIN_JOB = """
+local first = redis.call('EXISTS', KEYS[1]) == 0
+redis.call('SADD', KEYS[1], ARGV[1])
+if first then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+def _result_key(user_id: str, upload_id: str) -> str:
+    return f"upload:result:{user_id}:{upload_id}"
+
+
+def _completion_key(token_id: str) -> str:
+    return f"upload:completed:{token_id}"
+
+
+def _job_key(sha256: str) -> str:
+    return f"upload:job:{sha256}"
+
+
+def _local_get(key: str) -> Optional[str]:
+    entry = _local_entries.get(key)
+    if entry is None:
+        return None
+    expires_at, value = entry
+    if expires_at < time.monotonic():
+        _local_entries.pop(key, None)
+        return None
+    return value
+
+
+def _local_set(key: str, value: str, ttl: int, nx: bool = False) -> bool:
+    if nx and _local_get(key) is not None:
+        return False
+    _local_entries[key] = (time.monotonic() + ttl, value)
+    _local_entries.move_to_end(key)
+    while len(_local_entries) > _LOCAL_MAX:
+        _local_entries.popitem(last=False)
+    return True
+
+
+async def set_result(user_id: str, upload_id: str, result: dict) -> None:
+    key, value, ttl = _result_key(user_id, upload_id), json.dumps(result), settings.UPLOAD_RESULT_TTL
+    try:
+        await redis_client.set(key, value, ex=ttl)
+        return
+    except RedisError as e:
+        print(f"Upload result cache write failed: {e}")
+    _local_set(key, value, ttl)
+
+
+async def get_result(user_id: str, upload_id: str) -> Optional[dict]:
+    key = _result_key(user_id, upload_id)
+    try:
+        raw = await redis_client.get(key)
+        if raw is not None:
+            return json.loads(raw)
+    except RedisError as e:
+        print(f"Upload result cache read failed: {e}")
+
+    raw = _local_get(key)
+    return json.loads(raw) if raw is not None else None
+
+
+async def claim_completion(token_id: str, ttl: int) -> Tuple[bool, Optional[dict]]:
+    """
+    (True, None) for the first /complete of an upload token. Repeats get
+    (False, response) with the first call's response, or (False, None) while
+    that call is still running.
+    """
+    key = _completion_key(token_id)
+    try:
+        if await redis_client.set(key, _COMPLETING, ex=ttl, nx=True):
+            return True, None
+        raw = await redis_client.get(key)
+    except RedisError as e:
+        print(f"Upload completion claim failed, using in-process claim: {e}")
+        if _local_set(key, _COMPLETING, ttl, nx=True):
+            return True, None
+        raw = _local_get(key)
+
+    if raw is None:
+        # Expired in between: let the caller retry
+        return False, None
+    return False, (None if raw == _COMPLETING else json.loads(raw))
+
+
+async def finish_completion(token_id: str, response: dict, ttl: int) -> None:
+    key, value = _completion_key(token_id), json.dumps(response)
+    try:
+        await redis_client.set(key, value, ex=ttl)
+        return
+    except RedisError as e:
+        print(f"Upload completion write failed: {e}")
+    _local_set(key, value, ttl)
+
+
+async def release_completion(token_id: str) -> None:
+    """Forget a claim whose /complete failed, so the client can retry."""
+    _local_entries.pop(_completion_key(token_id), None)
+    try:
+        await redis_client.delete(_completion_key(token_id))
+    except RedisError as e:
+        print(f"Upload completion release failed: {e}")
+
+
+async def join_job(sha256: str, user_id: str, object_key: str, ttl: int) -> bool:
+    """
+    Attach an upload to the pending job for the file with this SHA-256.
+    True if there is none and the caller should queue one; the job hands its
+    result to every upload attached by the time it finishes (`finish_job`).
+    """
+    key, member = _job_key(sha256), json.dumps([user_id, object_key])
+    try:
+        return bool(await redis_client.eval(_JOIN_JOB, 1, key, member, ttl))
+    except RedisError as e:
+        print(f"Upload job lookup failed, using in-process jobs: {e}")
+
+    raw = _local_get(key)
+    members = json.loads(raw) if raw is not None else []
+    if member not in members:
+        members.append(member)
+    _local_set(key, json.dumps(members), ttl)
+    return raw is None
+
+
+async def finish_job(sha256: str) -> List[Tuple[str, str]]:
+    """
+    The uploads attached to the file's job, as (user_id, object_key) pairs.
+    Uploads of the file after this start a new job.
+    """
+    key = _job_key(sha256)
+    members = set()
+    try:
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.smembers(key)
+        pipe.delete(key)
+        found, _ = await pipe.execute()
+        members.update(found)
+    except RedisError as e:
+        print(f"Upload job cleanup failed: {e}")
+    raw = _local_get(key)
+    _local_entries.pop(key, None)
+    if raw is not None:
+        members.update(json.loads(raw))
+    return [tuple(json.loads(member)) for member in members]
@@ -0,0 +1,107 @@
+import asyncio
+from dataclasses import dataclass
+from typing import List, Optional
+
+from src.apps.upload import cache, service
+from src.core.config import settings
+
+
+@dataclass
+class UploadJob:
+    upload_id: str
+    object_key: str
+    size: int
+    content_type: str
+    user_id: str
+    sha256: Optional[str] = None
+
+
+class UploadJobQueue:
+    """
+    Post-processing of stored uploads (tagging, renditions, asset record) on a
+    fixed number of in-process workers, so uploads return as soon as the
+    original is stored and CPU work never piles up beyond UPLOAD_JOB_WORKERS.
+
+    Job status lives in the upload result cache (Redis, or this worker's memory
+    while Redis is down) under the uploader's id, and is read through
+    GET /upload/{id}/status. Uploads of a file (by SHA-256) whose job is
+    already pending attach to that job instead of queueing another. Jobs still
+    queued when the process stops are lost and stay "queued" until their TTL;
+    uploads of the same file attach to them until UPLOAD_JOB_TTL has passed.
+    """
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=settings.UPLOAD_JOB_QUEUE_SIZE)
+        self._workers = [
+            asyncio.create_task(self._run()) for _ in range(max(1, settings.UPLOAD_JOB_WORKERS))
+        ]
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        for task in self._workers:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        self._queue = None
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def full(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    async def submit(self, job: UploadJob) -> bool:
+        """
+        Queue a job, or attach it to the pending job for the same file.
+        False without waiting when UPLOAD_JOB_QUEUE_SIZE jobs are already pending.
+        """
+        self.start()
+        if job.sha256 and not await cache.join_job(job.sha256, job.user_id, job.object_key, settings.UPLOAD_JOB_TTL):
+            await cache.set_result(job.user_id, job.upload_id, {"status": "queued"})
+            return True
+        if self._queue.full():
+            await self._abandon(job)
+            return False
+        await cache.set_result(job.user_id, job.upload_id, {"status": "queued"})
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            # Filled up while the status was written
+            await cache.set_result(job.user_id, job.upload_id, {"status": "failed"})
+            await self._abandon(job)
+            return False
+        return True
+
+    async def _abandon(self, job: UploadJob):
+        if not job.sha256:
+            return
+        # Uploads that attached in the meantime would otherwise wait for nothing
+        for user_id, object_key in await cache.finish_job(job.sha256):
+            if (user_id, object_key) != (job.user_id, job.object_key):
+                await cache.set_result(user_id, job.upload_id, {"status": "failed"})
+
+    async def _run(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await cache.set_result(job.user_id, job.upload_id, {"status": "processing"})
+                await service.postprocess_upload(
+                    job.object_key, job.size, job.content_type, job.user_id, job.sha256
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Upload job {job.upload_id} error: {e}")
+            finally:
+                self._queue.task_done()
+
+
+upload_jobs = UploadJobQueue()
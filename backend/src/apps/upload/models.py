@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, DateTime, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+from src.database.base import Base
+
+
+class ImageAsset(Base):
+    """
+    One stored original, keyed by the SHA-256 of its bytes.
+    Re-uploads of the same file reuse the object and everything derived from it.
+    """
+    __tablename__ = "image_assets"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    object_key: Mapped[str] = mapped_column(String(255), nullable=False)
+    content_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    width: Mapped[int] = mapped_column(Integer, nullable=True)
+    height: Mapped[int] = mapped_column(Integer, nullable=True)
+    exif: Mapped[dict] = mapped_column(JSON, nullable=True)
+    tags: Mapped[list] = mapped_column(JSON, nullable=True)
+    renditions: Mapped[dict] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=func.now(), server_default=func.now(), nullable=False
+    )
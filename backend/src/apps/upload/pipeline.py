@@ -0,0 +1,144 @@
+import io
+import time
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, Iterable, Optional, Tuple
+
+from PIL import Image, ImageOps
+from src.utils.exif_helper import extract_exif
+
+# CLIP ViT-B/32 resizes the short side to 224 and center-crops
+MODEL_INPUT_SIZE = 224
+
+ORIENTATION_TAG = 0x0112
+
+
+@dataclass
+class ProcessedImage:
+    exif: dict
+    width: int
+    height: int
+    # Upright RGB image, short side MODEL_INPUT_SIZE, ready for the CLIP processor
+    model_input: Optional[Image.Image] = None
+    # width -> upright RGB image no wider than that width
+    renditions: Dict[int, Image.Image] = field(default_factory=dict)
+    # stage -> milliseconds
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+def _scaled(img: Image.Image, size) -> Image.Image:
+    copy = img.copy()
+    copy.thumbnail(size, Image.Resampling.LANCZOS)
+    return copy
+
+
+def read_header(source: BinaryIO) -> ProcessedImage:
+    """
+    EXIF and dimensions only. `source` may be just the first few hundred KB of
+    the file: nothing past the header is needed.
+    """
+    started = time.perf_counter()
+    try:
+        with Image.open(source) as img:
+            result = ProcessedImage(exif=extract_exif(img), width=img.width, height=img.height)
+    except Exception as e:
+        print(f"Error reading image header: {e}")
+        return ProcessedImage(exif={}, width=0, height=0)
+    result.timings["header"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def process_image(source: BinaryIO, rendition_widths: Iterable[int] = ()) -> ProcessedImage:
+    """
+    Open and decode an image once and derive everything uploads need from it.
+
+    Blocking (CPU bound): run it in a worker thread or process.
+    The header pass gives EXIF and dimensions without decoding. The pixels are
+    then decoded a single time, at reduced scale where the format allows it
+    (JPEG DCT scaling), and the model input and renditions are resized from
+    that one bitmap.
+    """
+    timings: Dict[str, float] = {}
+    widths = sorted(set(rendition_widths), reverse=True)
+
+    started = time.perf_counter()
+    source.seek(0)
+    try:
+        img = Image.open(source)
+        width, height = img.size
+        exif_info = extract_exif(img)
+    except Exception as e:
+        print(f"Error reading image header: {e}")
+        return ProcessedImage(exif={}, width=0, height=0)
+    timings["header"] = (time.perf_counter() - started) * 1000
+
+    result = ProcessedImage(exif=exif_info, width=width, height=height, timings=timings)
+    opened = img
+    try:
+        started = time.perf_counter()
+        # Decode no larger than the biggest output needs; never upscale
+        # Rendition widths apply to the upright image (EXIF orientations 5-8 swap the axes)
+        upright_width = height if img.getexif().get(ORIENTATION_TAG) in (5, 6, 7, 8) else width
+        scale = min(width, height) / MODEL_INPUT_SIZE
+        if widths:
+            scale = min(scale, upright_width / widths[0])
+        if scale > 1:
+            img.draft("RGB", (int(width / scale), int(height / scale)))
+        img = ImageOps.exif_transpose(img.convert("RGB"))
+        timings["decode"] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        # Largest first, each resized from the previous one rather than the full bitmap.
+        # Widths the source doesn't reach are skipped: clients fall back to the original.
+        current = img
+        model_source = img
+        for w in widths:
+            if w >= current.width:
+                continue
+            current = _scaled(current, (w, current.height))
+            result.renditions[w] = current
+            if min(current.size) >= MODEL_INPUT_SIZE:
+                model_source = current
+        timings["renditions"] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        short_side = min(model_source.size)
+        if short_side > MODEL_INPUT_SIZE:
+            ratio = MODEL_INPUT_SIZE / short_side
+            model_source = model_source.resize(
+                (max(1, round(model_source.width * ratio)), max(1, round(model_source.height * ratio))),
+                Image.Resampling.BICUBIC
+            )
+        result.model_input = model_source
+        timings["model_input"] = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        print(f"Error decoding image: {e}")
+    finally:
+        # Only free the bitmap: ImageFile.close() would also close `source`,
+        # which belongs to the caller (PNG keeps it open after loading)
+        Image.Image.close(opened)
+        source.seek(0)
+
+    return result
+
+
+# Encoder name and content type per rendition format
+RENDITION_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "avif": ("AVIF", "image/avif"),  # needs Pillow built with libavif
+}
+
+
+def encode_renditions(images: Dict[int, Image.Image], formats: Iterable[str], quality: int) -> Dict[Tuple[int, str], bytes]:
+    """
+    Encode every (width, format) pair. Pure CPU work on already resized images,
+    meant to run in a process pool (PIL images pickle as raw pixels).
+    """
+    encoded = {}
+    for width, img in images.items():
+        for fmt in formats:
+            encoder, _ = RENDITION_FORMATS[fmt]
+            buf = io.BytesIO()
+            img.save(buf, format=encoder, quality=quality)
+            encoded[(width, fmt)] = buf.getvalue()
+    return encoded
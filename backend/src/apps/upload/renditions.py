@@ -0,0 +1,68 @@
+import asyncio
+import io
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from PIL import Image
+from src.apps.upload.pipeline import RENDITION_FORMATS, encode_renditions
+from src.core.config import settings
+from src.utils.storage import get_storage
+
+# Rendition keys derive from the original's key, which never changes content
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Encoding is CPU bound; a process pool keeps it off the API workers' GIL.
+# Created on first use so importing this module never forks.
+_executor: Optional[ProcessPoolExecutor] = None
+
+# Bounds how many uploads wait on the pool with decoded pixels in memory
+_slots = asyncio.Semaphore(max(1, settings.UPLOAD_RENDITION_WORKERS) * 2)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=max(1, settings.UPLOAD_RENDITION_WORKERS))
+    return _executor
+
+
+def rendition_key(original_key: str, width: int, fmt: str) -> str:
+    """Deterministic object key: derived from the original's key, width and format only."""
+    stem = original_key.rsplit(".", 1)[0]
+    return f"renditions/{stem}/{width}.{fmt}"
+
+
+async def generate_renditions(original_key: str, images: Dict[int, Image.Image]) -> Dict[str, Dict[str, str]]:
+    """
+    Encode and store the resized images produced by the upload pipeline.
+    Returns {format: {width: url}}, the shape stored on PostImage.renditions.
+    """
+    formats = list(settings.UPLOAD_RENDITION_FORMATS)
+    if not images or not formats:
+        return {}
+
+    async with _slots:
+        loop = asyncio.get_running_loop()
+        encoded = await loop.run_in_executor(
+            _get_executor(), encode_renditions, images, formats, settings.UPLOAD_RENDITION_QUALITY
+        )
+
+    storage = get_storage()
+
+    async def store(width: int, fmt: str, data: bytes):
+        _, content_type = RENDITION_FORMATS[fmt]
+        key = rendition_key(original_key, width, fmt)
+        await storage.put(key, io.BytesIO(data), len(data), content_type, IMMUTABLE_CACHE_CONTROL)
+        return fmt, width, storage.public_url(key)
+
+    renditions: Dict[str, Dict[str, str]] = {}
+    for fmt, width, url in await asyncio.gather(*(store(w, f, d) for (w, f), d in encoded.items())):
+        renditions.setdefault(fmt, {})[str(width)] = url
+    return renditions
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
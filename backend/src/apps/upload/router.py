@@ -1,88 +1,173 @@
 from typing import Any
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from PIL import Image
-from src.utils.minio_client import minio_client
-from src.utils.exif_helper import extract_exif
+from jose import JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.core import deps
+from src.core.config import settings
+from src.core.security import decode_upload_token
 from src.apps.users.models import User
-from src.apps.ai.service import get_image_tags
-import uuid
-import os
-import io
-import tempfile
+from src.apps.upload import schemas, service
+from src.apps.upload.jobs import UploadJob, upload_jobs
+from src.database.session import get_db
+from src.utils.storage import ObjectNotFound
 
 router = APIRouter()
 
-import asyncio
+_BUSY = "Too many uploads are being processed, try again shortly"
 
 @router.post("/image", response_model=dict)
 async def upload_image(
     file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
-    # ... existing validation ...
-    if file.content_type not in ["image/jpeg", "image/png", "image/webp"]:
+    """
+    Store an image and return its URL, EXIF and dimensions. Suggested tags and
+    renditions follow once its job is done: poll /{upload_id}/status or listen
+    for the `upload_processed` SSE event.
+    """
+    if file.content_type not in service.ALLOWED_CONTENT_TYPES:
         raise HTTPException(status_code=400, detail="Invalid image format. Supported formats: JPEG, PNG, WEBP")
-    
-    file_ext = file.filename.split(".")[-1]
-    file_name = f"{uuid.uuid4()}.{file_ext}"
-    
-    tmp_path = None
+
     try:
-        # Read content (still in memory for now, but acceptable for <20MB)
-        contents = await file.read()
-        if len(contents) > 20 * 1024 * 1024:
+        # The body is already spooled by the multipart parser; never read it into memory
+        size = service.get_file_size(file.file)
+        if size > settings.UPLOAD_MAX_SIZE:
              raise HTTPException(status_code=400, detail="File size exceeds 20MB limit")
-             
-        file_data = io.BytesIO(contents)
-        
-        # ... EXIF extraction ...
-        exif_info = extract_exif(io.BytesIO(contents))
-        
-        # ... Dimensions ...
-        width, height = 0, 0
-        try:
-            with Image.open(io.BytesIO(contents)) as img:
-                width, height = img.size
-        except Exception as e:
-            print(f"Error getting image size: {e}")
-
-        # AI Tagging
-        suggested_tags = []
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_ext}") as tmp:
-                tmp.write(contents)
-                tmp_path = tmp.name
-            
-            suggested_tags = await get_image_tags(tmp_path)
-        except Exception as e:
-            print(f"AI Tagging failed: {e}")
-        
-        # Upload to MinIO (Offload blocking I/O to thread pool)
-        # Using asyncio.to_thread to prevent blocking event loop
-        file_url = await asyncio.to_thread(
-            minio_client.upload_file,
-            file_data, 
-            file_name, 
-            file.content_type
-        )
-        
-        return {
-            "url": file_url, 
-            "exif": exif_info,
-            "width": width,
-            "height": height,
-            "suggested_tags": suggested_tags
-        }
+
+        result = await service.process_upload(db, current_user.id, file.file, size, file.content_type)
+        if result["status"] == "processing":
+            queued = await upload_jobs.submit(UploadJob(
+                upload_id=result["upload_id"],
+                object_key=result["key"],
+                size=size,
+                content_type=file.content_type,
+                user_id=current_user.id,
+                sha256=result["sha256"],
+            ))
+            if not queued:
+                # The original is stored; uploading it again queues the job without re-storing it
+                raise HTTPException(status_code=503, detail=_BUSY)
+        return result
     except Exception as e:
         if isinstance(e, HTTPException):
             raise e
         print(f"Upload error: {e}")
         raise HTTPException(status_code=500, detail="Failed to upload image")
-    finally:
-        # Clean up temp file
-        if tmp_path and os.path.exists(tmp_path):
-            try:
-                os.remove(tmp_path)
-            except Exception as e:
-                print(f"Error removing temp file: {e}")
+
+@router.post("/presign", response_model=schemas.PresignResponse)
+async def presign_upload(
+    request: schemas.PresignRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Start a direct upload: PUT the file to `upload_url`, then call /complete.
+    With `sha256`, a file that is already stored needs no upload at all.
+    """
+    if request.content_type not in service.ALLOWED_CONTENT_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid image format. Supported formats: JPEG, PNG, WEBP")
+    if request.size > settings.UPLOAD_MAX_SIZE:
+        raise HTTPException(status_code=400, detail="File size exceeds 20MB limit")
+    if not service.presigned_uploads_supported():
+        raise HTTPException(status_code=400, detail="Direct uploads are not available; use POST /upload/image")
+    return await service.presign_upload(
+        db, current_user.id, request.filename, request.content_type, request.sha256
+    )
+
+@router.post("/complete", response_model=dict)
+async def complete_upload(
+    request: schemas.UploadCompleteRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Finish a direct upload. Returns EXIF and dimensions right away;
+    tags and renditions are produced by a job (see /{upload_id}/status).
+    Completing the same upload token again returns the same response.
+    """
+    try:
+        claims = decode_upload_token(request.upload_token)
+    except JWTError:
+        raise HTTPException(status_code=400, detail="Invalid or expired upload token")
+    if claims.get("sub") != current_user.id:
+        raise HTTPException(status_code=403, detail="Upload token belongs to another user")
+
+    claimed, previous = await service.claim_completion(request.upload_token)
+    if not claimed:
+        # Replays of a token answer like the first call and never schedule its job again
+        if previous is None:
+            raise HTTPException(status_code=409, detail="Upload completion already in progress")
+        return previous
+
+    try:
+        result = await _complete(db, claims, current_user.id)
+    except BaseException:
+        await service.release_completion(request.upload_token)
+        raise
+    await service.finish_completion(request.upload_token, result)
+    return result
+
+async def _complete(db: AsyncSession, claims: dict, user_id: str) -> dict:
+    object_key = claims["key"]
+    sha256 = claims.get("sha256")
+
+    asset = await service.get_asset(db, sha256)
+    if asset is not None:
+        return await service.asset_result(user_id, asset)
+
+    try:
+        stat = await service.inspect_object(object_key)
+    except ObjectNotFound:
+        raise HTTPException(status_code=404, detail="Uploaded object not found")
+
+    # A presigned PUT can't limit what is sent: check it now and discard bad uploads
+    if stat.size > settings.UPLOAD_MAX_SIZE or stat.content_type not in service.ALLOWED_CONTENT_TYPES:
+        await service.discard_object(object_key)
+        raise HTTPException(status_code=400, detail="Uploaded file is not a supported image under 20MB")
+    # Refuse before reading anything; the client can retry with the same token
+    if upload_jobs.full():
+        raise HTTPException(status_code=503, detail=_BUSY)
+
+    # Only the header is read here: the job downloads the object once, and
+    # verifies hashed uploads before moving them to their content key
+    result = await service.complete_upload(object_key, stat.content_type, sha256)
+    queued = await upload_jobs.submit(UploadJob(
+        upload_id=result["upload_id"],
+        object_key=object_key,
+        size=stat.size,
+        content_type=stat.content_type,
+        user_id=user_id,
+        sha256=sha256,
+    ))
+    if not queued:
+        raise HTTPException(status_code=503, detail=_BUSY)
+    return result
+
+@router.get("/result/{key:path}", response_model=schemas.UploadResult)
+async def read_upload_result(
+    key: str,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Processing status by object key; same as /{upload_id}/status.
+    """
+    result = await service.get_upload_result(current_user.id, service.upload_id(key))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return result
+
+@router.get("/{upload_id}/status", response_model=schemas.UploadResult)
+async def read_upload_status(
+    upload_id: str,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Status of an upload's processing job: queued, processing, done or failed.
+    `suggested_tags` and `renditions` are filled in once it is done.
+    Only the uploader can read it.
+    """
+    result = await service.get_upload_result(current_user.id, upload_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return result
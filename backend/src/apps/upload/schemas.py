@@ -0,0 +1,31 @@
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class PresignRequest(BaseModel):
+    filename: str
+    content_type: str
+    size: int
+    # Hex SHA-256 of the file: enables dedup and a content-addressed key
+    sha256: Optional[str] = Field(None, pattern="^[0-9a-f]{64}$")
+
+
+class PresignResponse(BaseModel):
+    key: str
+    upload_url: Optional[str] = None # PUT the file here with `headers`; None if it already exists
+    upload_token: str # pass to /complete
+    expires_in: int
+    url: str # public URL once uploaded
+    headers: Dict[str, str] = {}
+    exists: bool = False
+
+
+class UploadCompleteRequest(BaseModel):
+    upload_token: str
+
+
+class UploadResult(BaseModel):
+    status: str # queued | processing | done | failed
+    suggested_tags: List[str] = []
+    renditions: Dict[str, Dict[str, str]] = {}
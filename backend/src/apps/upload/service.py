@@ -0,0 +1,382 @@
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.apps.ai.service import get_image_tags
+from src.apps.notifications.service import manager
+from src.apps.upload import cache
+from src.apps.upload.models import ImageAsset
+from src.apps.upload.pipeline import ProcessedImage, process_image, read_header
+from src.apps.upload.renditions import IMMUTABLE_CACHE_CONTROL, generate_renditions
+from src.core.config import settings
+from src.core.security import create_upload_token
+from src.database.session import SessionLocal
+from src.utils.storage import ObjectInfo, get_storage
+
+ALLOWED_CONTENT_TYPES = ["image/jpeg", "image/png", "image/webp"]
+
+# Extension by content type, so identical bytes always map to the same key
+CONTENT_TYPE_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}
+
+
+def get_file_size(file: BinaryIO) -> int:
+    """Size of a seekable file object, leaving the position at the start."""
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(0)
+    return size
+
+
+def hash_file(file: BinaryIO, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file object, read in chunks; leaves the position at the start."""
+    file.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.read(chunk_size), b""):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def content_key(sha256: str, content_type: str) -> str:
+    return f"images/{sha256[:2]}/{sha256}.{CONTENT_TYPE_EXTENSIONS[content_type]}"
+
+
+def new_object_key(filename: str) -> str:
+    file_ext = filename.split(".")[-1]
+    return f"{uuid.uuid4()}.{file_ext}"
+
+
+def _asset_response(asset: ImageAsset) -> dict:
+    return {
+        "url": get_storage().public_url(asset.object_key),
+        "sha256": asset.sha256,
+        "exif": asset.exif or {},
+        "width": asset.width,
+        "height": asset.height,
+        "suggested_tags": asset.tags or [],
+        "renditions": asset.renditions or {},
+        "deduplicated": True,
+    }
+
+
+async def _record_asset_result(user_id: str, asset: ImageAsset):
+    # Deduplicated uploads have no job, but their /status must still answer
+    await cache.set_result(user_id, asset.sha256, {
+        "status": "done", "suggested_tags": asset.tags or [], "renditions": asset.renditions or {},
+    })
+
+
+async def _save_asset(db: AsyncSession, asset: ImageAsset):
+    db.add(asset)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # The same file was uploaded concurrently and recorded first
+        await db.rollback()
+
+
+async def _tag(processed: ProcessedImage, timings: Dict[str, float]) -> list:
+    if processed.model_input is None:
+        return []
+    started = time.perf_counter()
+    try:
+        return await get_image_tags(processed.model_input)
+    except Exception as e:
+        print(f"AI Tagging failed: {e}")
+        return []
+    finally:
+        timings["tagging"] = (time.perf_counter() - started) * 1000
+
+
+async def _renditions(object_key: str, processed: ProcessedImage, timings: Dict[str, float]) -> dict:
+    # Smaller sizes for grids and 3D textures; the upload still succeeds without them
+    started = time.perf_counter()
+    try:
+        return await generate_renditions(object_key, processed.renditions)
+    except Exception as e:
+        print(f"Rendition generation failed: {e}")
+        return {}
+    finally:
+        processed.renditions.clear()
+        timings["renditions_store"] = (time.perf_counter() - started) * 1000
+
+
+def _log_timings(object_key: str, size: int, timings: Dict[str, float]):
+    print(f"Upload {object_key} ({size} bytes): " + ", ".join(f"{k}={v:.1f}ms" for k, v in timings.items()))
+
+
+def upload_id(object_key: str) -> str:
+    """
+    Id of an upload's processing job: the key's file name without extension,
+    i.e. the SHA-256 for content-addressed keys and a UUID otherwise.
+    """
+    return object_key.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+
+
+async def process_upload(db: AsyncSession, user_id: str, file: BinaryIO, size: int, content_type: str) -> dict:
+    """
+    Store an uploaded image and describe what is known right away.
+
+    `file` is the spooled upload (memory up to 1 MB, then a temp file on disk).
+    Objects are keyed by the SHA-256 of their bytes: a file we have seen before
+    is neither stored nor processed again. For new files only the header is
+    read (EXIF, dimensions) before streaming them to object storage; tags and
+    renditions come from a job the caller queues (status "processing").
+    """
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    sha256 = await asyncio.to_thread(hash_file, file)
+    timings["hash"] = (time.perf_counter() - started) * 1000
+
+    asset = await db.get(ImageAsset, sha256)
+    if asset is not None:
+        _log_timings(asset.object_key, size, timings)
+        await _record_asset_result(user_id, asset)
+        return {**_asset_response(asset), "upload_id": sha256, "status": "done"}
+
+    file_name = content_key(sha256, content_type)
+
+    header = await asyncio.to_thread(read_header, file)
+    file.seek(0)
+    timings.update(header.timings)
+
+    # Stream to storage in UPLOAD_PART_SIZE parts.
+    # The object may exist without an asset row if an earlier upload failed midway.
+    storage = get_storage()
+    started = time.perf_counter()
+    if not await storage.exists(file_name):
+        await storage.put(file_name, file, size, content_type, IMMUTABLE_CACHE_CONTROL)
+    timings["storage"] = (time.perf_counter() - started) * 1000
+    _log_timings(file_name, size, timings)
+
+    return {
+        "upload_id": sha256,
+        "key": file_name,
+        "url": storage.public_url(file_name),
+        "sha256": sha256,
+        "exif": header.exif,
+        "width": header.width,
+        "height": header.height,
+        "suggested_tags": [],
+        "renditions": {},
+        "deduplicated": False,
+        "status": "processing",
+    }
+
+
+# --- Presigned uploads ---
+# 1. presign: the client gets a PUT URL and an upload token. Clients that send
+#    the file's SHA-256 get no URL at all when that file is already stored.
+# 2. the client PUTs the bytes directly to MinIO, always under a new per-upload
+#    key: content-addressed keys are served as immutable, so nobody may write
+#    to one before the API has checked the bytes against their hash
+# 3. complete: the API reads the object's header for EXIF/dimensions and
+#    queues a job, which downloads the object once for tagging and renditions.
+#    Hashed uploads are verified by that job and only then moved to their
+#    content key. The result is fetched later by upload id
+
+def presigned_uploads_supported() -> bool:
+    return get_storage().presigned_uploads
+
+
+async def presign_upload(
+    db: AsyncSession, user_id: str, filename: str, content_type: str, sha256: Optional[str] = None
+) -> dict:
+    storage = get_storage()
+    expires = settings.UPLOAD_PRESIGN_EXPIRES
+    asset = await get_asset(db, sha256)
+
+    if asset is not None:
+        # Nothing to upload: call /complete with the token right away
+        object_key = key = asset.object_key
+        upload_url, headers = None, {}
+    else:
+        object_key = new_object_key(filename)
+        # Hashed uploads end up at their content key once their job has verified them
+        key = final_key(object_key, content_type, sha256)
+        upload_url = await storage.presigned_put_url(object_key, expires)
+        headers = {"Content-Type": content_type}
+
+    return {
+        "key": key,
+        "upload_url": upload_url,
+        "upload_token": create_upload_token(user_id, object_key, timedelta(seconds=expires), sha256),
+        "expires_in": expires,
+        "url": storage.public_url(key),
+        "headers": headers,
+        "exists": asset is not None,
+    }
+
+
+async def get_asset(db: AsyncSession, sha256: Optional[str]) -> Optional[ImageAsset]:
+    if not sha256:
+        return None
+    return await db.get(ImageAsset, sha256)
+
+
+async def asset_result(user_id: str, asset: ImageAsset) -> dict:
+    """/complete response for a file that was already processed."""
+    await _record_asset_result(user_id, asset)
+    return {**_asset_response(asset), "upload_id": asset.sha256, "key": asset.object_key, "status": "done"}
+
+
+async def inspect_object(object_key: str) -> ObjectInfo:
+    """Size and content type from a HEAD request. Raises ObjectNotFound if missing."""
+    return await get_storage().stat(object_key)
+
+
+async def discard_object(object_key: str):
+    await get_storage().remove(object_key)
+
+
+def final_key(object_key: str, content_type: str, sha256: Optional[str] = None) -> str:
+    """Where an upload ends up: its content key if hashed, else where it was put."""
+    return content_key(sha256, content_type) if sha256 else object_key
+
+
+async def complete_upload(object_key: str, content_type: str, sha256: Optional[str] = None) -> dict:
+    """
+    EXIF and dimensions from a ranged read of the object's first bytes.
+    Queue an upload job afterwards for tags and renditions (and, for hashed
+    uploads, the move to the content key the response already names).
+    """
+    storage = get_storage()
+    header = await storage.read_range(object_key, 0, settings.UPLOAD_HEADER_BYTES)
+    processed = read_header(io.BytesIO(header))
+    key = final_key(object_key, content_type, sha256)
+    return {
+        "upload_id": upload_id(key),
+        "key": key,
+        "url": storage.public_url(key),
+        "exif": processed.exif,
+        "width": processed.width,
+        "height": processed.height,
+        "status": "processing",
+    }
+
+
+async def _process_stored(
+    object_key: str, key: str, size: int, content_type: str, sha256: Optional[str], timings: Dict[str, float]
+) -> dict:
+    storage = get_storage()
+    if sha256:
+        async with SessionLocal() as db:
+            asset = await db.get(ImageAsset, sha256)
+        if asset is not None:
+            # Recorded by an earlier job after this upload checked for it
+            if object_key != asset.object_key:
+                await storage.remove(object_key)
+            return {"status": "done", "suggested_tags": asset.tags or [], "renditions": asset.renditions or {}}
+
+    # Spooled like an API upload: memory up to 1 MB, then a temp file
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as file:
+        started = time.perf_counter()
+        await storage.download_to(object_key, file)
+        timings["download"] = (time.perf_counter() - started) * 1000
+
+        if sha256 and await asyncio.to_thread(hash_file, file) != sha256:
+            if object_key != key:
+                await storage.remove(object_key)
+            raise ValueError("content does not match its SHA-256")
+        if object_key != key:
+            # Already there if an earlier upload of this file failed before its asset row
+            if not await storage.exists(key):
+                await storage.copy(object_key, key, content_type, IMMUTABLE_CACHE_CONTROL)
+            await storage.remove(object_key)
+
+        processed = await asyncio.to_thread(process_image, file, settings.UPLOAD_RENDITION_WIDTHS)
+        timings.update(processed.timings)
+
+    suggested_tags = await _tag(processed, timings)
+    renditions = await _renditions(key, processed, timings)
+
+    if sha256:
+        async with SessionLocal() as db:
+            await _save_asset(db, ImageAsset(
+                sha256=sha256,
+                object_key=key,
+                content_type=content_type,
+                size=size,
+                width=processed.width,
+                height=processed.height,
+                exif=processed.exif,
+                tags=suggested_tags,
+                renditions=renditions,
+            ))
+
+    return {"status": "done", "suggested_tags": suggested_tags, "renditions": renditions}
+
+
+async def postprocess_upload(
+    object_key: str, size: int, content_type: str, user_id: str, sha256: Optional[str] = None
+):
+    """
+    Upload job: tags and renditions from a single download and decode of the
+    stored object. Hashed uploads are checked against their SHA-256 on the same
+    download and recorded as an ImageAsset; direct uploads are moved from their
+    per-upload key to their content key only once they match. The uploader, and
+    everyone whose upload of the same file attached to this job, gets the result
+    and an `upload_processed` SSE event.
+    """
+    timings: Dict[str, float] = {}
+    key = final_key(object_key, content_type, sha256)
+    result_id = upload_id(key)
+    try:
+        result = await _process_stored(object_key, key, size, content_type, sha256, timings)
+    except Exception as e:
+        print(f"Post-processing {object_key} failed: {e}")
+        result = {"status": "failed", "suggested_tags": [], "renditions": {}}
+    _log_timings(key, size, timings)
+
+    uploads = {(user_id, object_key)}
+    if sha256:
+        uploads.update(await cache.finish_job(sha256))
+    for uploader, upload_key in uploads:
+        if upload_key not in (object_key, key):
+            # An attached direct upload's own copy of the file
+            try:
+                await get_storage().remove(upload_key)
+            except Exception as e:
+                print(f"Removing duplicate upload {upload_key} failed: {e}")
+
+    for uploader in {uploader for uploader, _ in uploads}:
+        await cache.set_result(uploader, result_id, result)
+        await manager.send_personal_message(uploader, {
+            "event": "upload_processed",
+            "upload_id": result_id,
+            "key": key,
+            **result,
+        })
+
+
+async def get_upload_result(user_id: str, upload_id: str) -> Optional[dict]:
+    """The result of one of `user_id`'s own uploads; None for anyone else's."""
+    return await cache.get_result(user_id, upload_id)
+
+
+def completion_id(upload_token: str) -> str:
+    return hashlib.sha256(upload_token.encode()).hexdigest()
+
+
+async def claim_completion(upload_token: str) -> Tuple[bool, Optional[dict]]:
+    """
+    /complete runs once per upload token; see cache.claim_completion.
+    Claims last as long as the token itself is valid.
+    """
+    return await cache.claim_completion(completion_id(upload_token), settings.UPLOAD_PRESIGN_EXPIRES)
+
+
+async def finish_completion(upload_token: str, response: dict):
+    await cache.finish_completion(completion_id(upload_token), response, settings.UPLOAD_PRESIGN_EXPIRES)
+
+
+async def release_completion(upload_token: str):
+    await cache.release_completion(completion_id(upload_token))
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import List, Literal, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Lumen Park"
@@ -28,15 +28,88 @@ class Settings(BaseSettings):
     MINIO_BUCKET: str = "lumen-park"
     MINIO_SECURE: bool = False
 
+    # Storage
+    STORAGE_BACKEND: Literal["minio", "local"] = "minio"
+    STORAGE_MAX_WORKERS: int = 8  # threads running blocking storage calls
+    STORAGE_PARALLEL_UPLOADS: int = 3  # multipart parts in flight per upload
+    STORAGE_CONNECT_TIMEOUT: float = 5.0  # seconds
+    STORAGE_READ_TIMEOUT: float = 60.0  # seconds
+    STORAGE_INIT_TIMEOUT: float = 10.0  # seconds per bucket setup attempt at startup
+    STORAGE_INIT_ATTEMPTS: int = 0  # 0 = keep retrying until storage is up
+    STORAGE_INIT_BACKOFF: float = 1.0  # seconds, doubled after each failed attempt
+    STORAGE_INIT_MAX_BACKOFF: float = 60.0  # seconds
+    STORAGE_LOCAL_ROOT: str = "media"  # local backend only
+    STORAGE_LOCAL_BASE_URL: str = "/media"
+
+    # Upload
+    UPLOAD_MAX_SIZE: int = 20 * 1024 * 1024  # bytes
+    UPLOAD_PART_SIZE: int = 5 * 1024 * 1024  # multipart chunk streamed to MinIO; S3 minimum is 5 MiB
+    UPLOAD_RENDITION_WIDTHS: List[int] = [320, 640, 1280, 2048]  # px; empty disables renditions
+    UPLOAD_RENDITION_FORMATS: List[Literal["webp", "jpeg", "avif"]] = ["webp", "jpeg"]
+    UPLOAD_RENDITION_QUALITY: int = 80
+    UPLOAD_RENDITION_WORKERS: int = 2  # encoder processes
+    UPLOAD_PRESIGN_EXPIRES: int = 15 * 60  # seconds a presigned PUT URL stays valid
+    UPLOAD_HEADER_BYTES: int = 256 * 1024  # prefix read on completion for EXIF and dimensions
+    UPLOAD_RESULT_TTL: int = 24 * 60 * 60  # seconds background processing results are kept
+    UPLOAD_JOB_WORKERS: int = 2  # concurrent post-processing jobs (tagging, renditions) per API worker
+    UPLOAD_JOB_QUEUE_SIZE: int = 100  # pending jobs before uploads are refused with 503
+    UPLOAD_JOB_TTL: int = 15 * 60  # seconds later uploads of a file attach to its pending job instead of queueing another
+
+    # AI tagging
+    AI_BATCH_MAX_SIZE: int = 8  # images per CLIP forward pass
+    AI_BATCH_MAX_WAIT_MS: float = 10.0  # how long a batch waits to fill after its first image
+    AI_BACKEND: Literal["torch", "onnx"] = "torch"  # vision encoder runtime; onnx needs onnxruntime and an export
+    AI_ONNX_QUANTIZED: bool = True  # use the int8 export
+    AI_ONNX_MODEL: Optional[str] = None  # path override; default core/model/clip-vision[-int8].onnx
+    AI_ONNX_THREADS: int = 0  # ONNX Runtime intra-op threads; 0 lets it decide
+    AI_INFERENCE_MODE: Literal["local", "remote"] = "local"  # remote: tag via the worker, no torch in API processes
+    AI_WORKER_SOCKET: str = "/tmp/lumen-park-ai.sock"
+    AI_WORKER_PROCESSES: int = 1  # model processes in the inference worker, each with its own copy of CLIP
+    AI_WORKER_THREADS: int = 0  # torch intra-op threads per model process; 0 keeps torch's default
+    AI_WORKER_MAX_PENDING: int = 64  # requests admitted at once; more are rejected as overloaded
+    AI_REQUEST_TIMEOUT: float = 10.0  # seconds per tagging request
+    AI_PRELOAD: bool = True  # local mode: load and warm up the model at startup instead of on the first upload
+    AI_PRELOAD_BACKOFF: float = 5.0  # seconds before retrying a failed preload, doubled after each failure
+    AI_PRELOAD_MAX_BACKOFF: float = 300.0  # seconds
+    AI_OFFLINE: bool = False  # never download the model; fail fast if it isn't on disk
+    AI_CACHE_TTL: int = 30 * 24 * 60 * 60  # seconds tags/embeddings stay cached in Redis by pixel hash
+    AI_CACHE_LOCAL_SIZE: int = 1024  # entries in the in-process LRU in front of Redis
+
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
-    
+    REDIS_SOCKET_TIMEOUT: float = 1.0
+
     @property
     def REDIS_URL(self) -> str:
         return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
 
+    # Notifications
+    SSE_REDIS_BACKPLANE: bool = True  # fan out pushes across workers via Redis pub/sub
+    SSE_QUEUE_MAXSIZE: int = 100  # per-connection buffered messages
+    SSE_OVERFLOW_POLICY: Literal["drop_oldest", "collapse", "disconnect"] = "drop_oldest"
+    SSE_REPLAY_BUFFER_SIZE: int = 100  # events kept per user for Last-Event-ID replay
+    SSE_REPLAY_TTL: int = 60 * 60  # seconds
+    SSE_RECONNECT_DELAY_MS: int = 3000  # base EventSource retry; jittered per stream
+    NOTIFICATION_UNREAD_CACHE_TTL: int = 24 * 60 * 60  # seconds
+    NOTIFICATION_GROUP_WINDOW: int = 24 * 60 * 60  # seconds; 0 disables aggregation
+    NOTIFICATION_GROUP_MAX_ACTORS: int = 5  # recent actor ids kept on a grouped row
+    NOTIFICATION_GROUP_PUSH_INTERVAL: int = 10  # seconds between SSE updates of one group
+    NOTIFICATION_OUTBOX_BATCH_SIZE: int = 100
+    NOTIFICATION_OUTBOX_POLL_INTERVAL: float = 2.0  # seconds; commits also wake the dispatcher
+    NOTIFICATION_OUTBOX_MAX_ATTEMPTS: int = 5
+    NOTIFICATION_RETENTION_DAYS: int = 90  # read notifications older than this leave the hot table; 0 disables
+    NOTIFICATION_RETENTION_MODE: Literal["archive", "delete"] = "archive"
+    NOTIFICATION_RETENTION_BATCH_SIZE: int = 1000
+    NOTIFICATION_RETENTION_INTERVAL: int = 60 * 60  # seconds between sweeps
+    NOTIFICATION_ARCHIVE_RETENTION_MONTHS: int = 0  # MySQL: drop archive partitions older than this; 0 keeps all
+    NOTIFICATION_ARCHIVE_PARTITIONS_AHEAD: int = 2  # MySQL: monthly archive partitions created in advance
+
+    # Interactions
+    INTERACTION_STATUS_CACHE_TTL: int = 60 * 60  # seconds
+    INTERACTION_STATUS_MAX_IDS: int = 200
+
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
 settings = Settings()
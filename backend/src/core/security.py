@@ -45,3 +45,17 @@ def create_access_token(subject: Union[str, Any], expires_delta: timedelta = Non
     to_encode = {"exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
+
+# Upload tokens are signed with a derived key so they can't be used as access tokens
+def _upload_token_key() -> str:
+    return f"{settings.SECRET_KEY}:upload"
+
+def create_upload_token(user_id: str, object_key: str, expires_delta: timedelta, sha256: str = None) -> str:
+    to_encode = {"exp": datetime.utcnow() + expires_delta, "sub": str(user_id), "key": object_key}
+    if sha256:
+        to_encode["sha256"] = sha256
+    return jwt.encode(to_encode, _upload_token_key(), algorithm=settings.ALGORITHM)
+
+def decode_upload_token(token: str) -> dict:
+    """Returns the claims; raises jose.JWTError if invalid or expired."""
+    return jwt.decode(token, _upload_token_key(), algorithms=[settings.ALGORITHM])
@@ -0,0 +1,12 @@
+import redis.asyncio as redis
+from src.core.config import settings
+
+# Shared async Redis client. The connection pool is created lazily on first use,
+# so importing this module never touches the network.
+# Callers treat Redis as a cache: every RedisError must fall back to the database.
+redis_client = redis.from_url(
+    settings.REDIS_URL,
+    decode_responses=True,
+    socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+)
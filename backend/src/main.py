@@ -1,17 +1,57 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 from src.apps.interactions.router import router as interactions_router
 from src.apps.notifications.router import router as notifications_router
+from src.apps.notifications.outbox import outbox_dispatcher
+from src.apps.notifications.retention import retention_job
+from src.apps.notifications.service import manager as notification_manager
 from src.apps.posts.router import router as posts_router
+from src.apps.system.router import router as system_router
 from src.apps.albums.router import router as albums_router
+from src.apps.ai import service as ai_service
 from src.apps.tags.router import router as tags_router
 from src.apps.upload.router import router as upload_router
+from src.apps.upload import renditions as upload_renditions
+from src.apps.upload.jobs import upload_jobs
 from src.apps.users.router import router as users_router
 from src.core.config import settings
+from src.utils.storage import close_storage, init_storage
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bucket setup in the background: the app serves while MinIO comes up
+    storage_init = asyncio.create_task(init_storage())
+    # Model load and warmup off the event loop; /health reports ready once done
+    ai_preload = asyncio.create_task(ai_service.preload()) if settings.AI_PRELOAD else None
+    outbox_dispatcher.start()
+    retention_job.start()
+    upload_jobs.start()
+    yield
+    storage_init.cancel()
+    if ai_preload is not None:
+        ai_preload.cancel()
+    await upload_jobs.stop()
+    await ai_service.shutdown()
+    await retention_job.stop()
+    await outbox_dispatcher.stop()
+    # Stop the SSE backplane listener and release its Redis connection
+    await notification_manager.close()
+    upload_renditions.shutdown()
+    await close_storage()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_STR}/openapi.json")
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        openapi_url=f"{settings.API_V1_STR}/openapi.json",
+        lifespan=lifespan,
+    )
     
     # Set all CORS enabled origins
     app.add_middleware(
@@ -29,6 +69,16 @@ def create_app() -> FastAPI:
     app.include_router(albums_router, prefix=f"{settings.API_V1_STR}/albums", tags=["albums"])
     app.include_router(upload_router, prefix=f"{settings.API_V1_STR}/upload", tags=["upload"])
     app.include_router(tags_router, prefix=f"{settings.API_V1_STR}/tags", tags=["tags"])
+    app.include_router(system_router, tags=["system"])
+
+    if settings.STORAGE_BACKEND == "local":
+        # MinIO serves its own public URLs; local objects are served from here
+        os.makedirs(settings.STORAGE_LOCAL_ROOT, exist_ok=True)
+        app.mount(
+            settings.STORAGE_LOCAL_BASE_URL,
+            StaticFiles(directory=settings.STORAGE_LOCAL_ROOT),
+            name="media",
+        )
     
     return app
 
@@ -44,9 +44,13 @@ def format_shutter_speed(val):
     return str(val)[:20]
 
 def extract_exif(file_stream):
+    """
+    Read camera EXIF from a file-like object or an already opened PIL image.
+    Only the header is parsed; pixel data is never decoded.
+    """
     exif_data = {}
     try:
-        image = Image.open(file_stream)
+        image = file_stream if isinstance(file_stream, Image.Image) else Image.open(file_stream)
         info = image._getexif()
         if info:
             for tag, value in info.items():
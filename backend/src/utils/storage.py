@@ -0,0 +1,410 @@
+import asyncio
+import json
+import mimetypes
+import os
+import shutil
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import BinaryIO, Optional
+
+from src.core.config import settings
+from src.utils.metrics import Histogram
+
+storage_latency = Histogram(
+    "storage_operation_seconds", "Object storage operation latency", labelnames=("backend", "operation")
+)
+
+
+class ObjectNotFound(Exception):
+    pass
+
+
+@dataclass
+class ObjectInfo:
+    size: int
+    content_type: Optional[str]
+
+
+class ObjectStorage(ABC):
+    """
+    Async object storage used by uploads. `MinioStorage` in production;
+    tests swap in `LocalFileStorage` with `set_storage`.
+    """
+    name = ""
+    # Whether clients can PUT directly to `presigned_put_url`
+    presigned_uploads = False
+
+    @abstractmethod
+    async def put(self, key: str, data: BinaryIO, length: int, content_type: str, cache_control: Optional[str] = None) -> None:
+        """Store `length` bytes read from `data`."""
+
+    @abstractmethod
+    async def copy(self, source_key: str, key: str, content_type: str, cache_control: Optional[str] = None) -> None:
+        """Server-side copy with new headers. Raises ObjectNotFound if `source_key` is missing."""
+
+    @abstractmethod
+    async def stat(self, key: str) -> ObjectInfo:
+        """Raises ObjectNotFound."""
+
+    async def exists(self, key: str) -> bool:
+        try:
+            await self.stat(key)
+            return True
+        except ObjectNotFound:
+            return False
+
+    @abstractmethod
+    async def read_range(self, key: str, offset: int, length: int) -> bytes:
+        ...
+
+    @abstractmethod
+    async def download_to(self, key: str, file_obj: BinaryIO) -> None:
+        """Stream the object into `file_obj` and rewind it."""
+
+    @abstractmethod
+    async def remove(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def public_url(self, key: str) -> str:
+        ...
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        """Object key of one of our public URLs; None for anything else."""
+        prefix = self.public_url("")
+        return (url[len(prefix):] or None) if url.startswith(prefix) else None
+
+    async def presigned_put_url(self, key: str, expires_seconds: int) -> str:
+        """Only called when `presigned_uploads` is True."""
+        raise NotImplementedError(f"{type(self).__name__} does not support presigned uploads")
+
+    async def initialize(self) -> None:
+        """One-time setup that needs the network; run by `init_storage`."""
+
+    async def close(self) -> None:
+        pass
+
+
+class MinioStorage(ObjectStorage):
+    """
+    The synchronous MinIO SDK on its own thread pool, so storage I/O never
+    competes with CLIP inference or other `asyncio.to_thread` work for the
+    default executor. HTTP connections are pooled and kept alive by one
+    urllib3 PoolManager sized to match the executor.
+
+    Constructing it makes no network calls; bucket setup is `initialize`.
+    """
+    name = "minio"
+    presigned_uploads = True
+
+    def __init__(self):
+        import certifi
+        import urllib3
+        from minio import Minio
+
+        self.bucket_name = settings.MINIO_BUCKET
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.STORAGE_MAX_WORKERS, thread_name_prefix="storage"
+        )
+        self._http = urllib3.PoolManager(
+            # One connection per worker thread plus the parallel multipart parts they may upload
+            maxsize=settings.STORAGE_MAX_WORKERS * max(1, settings.STORAGE_PARALLEL_UPLOADS),
+            timeout=urllib3.Timeout(
+                connect=settings.STORAGE_CONNECT_TIMEOUT, read=settings.STORAGE_READ_TIMEOUT
+            ),
+            retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+            cert_reqs="CERT_REQUIRED",
+            ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+        )
+        self.client = Minio(
+            settings.MINIO_ENDPOINT,
+            access_key=settings.MINIO_ACCESS_KEY,
+            secret_key=settings.MINIO_SECRET_KEY,
+            secure=settings.MINIO_SECURE,
+            http_client=self._http,
+        )
+
+    def _ensure_bucket(self):
+        if not self.client.bucket_exists(self.bucket_name):
+            self.client.make_bucket(self.bucket_name)
+        # Set public read policy
+        policy = {
+            "Version": "2012-10-17",
+            "Statement": [
+                {
+                    "Effect": "Allow",
+                    "Principal": {"AWS": ["*"]},
+                    "Action": ["s3:GetObject"],
+                    "Resource": [f"arn:aws:s3:::{self.bucket_name}/*"]
+                }
+            ]
+        }
+        self.client.set_bucket_policy(self.bucket_name, json.dumps(policy))
+
+    async def initialize(self):
+        await self._run("initialize", self._ensure_bucket)
+
+    async def _run(self, operation: str, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        with storage_latency.time(backend=self.name, operation=operation):
+            return await loop.run_in_executor(self._executor, lambda: fn(*args, **kwargs))
+
+    @staticmethod
+    def _not_found(e) -> bool:
+        return getattr(e, "code", None) in ("NoSuchKey", "NoSuchObject")
+
+    async def put(self, key, data, length, content_type, cache_control=None):
+        # With a known length the SDK sends parts of UPLOAD_PART_SIZE, up to
+        # STORAGE_PARALLEL_UPLOADS at a time; memory is part size x parallel parts
+        await self._run(
+            "put",
+            self.client.put_object,
+            self.bucket_name,
+            key,
+            data,
+            length=length,
+            part_size=settings.UPLOAD_PART_SIZE,
+            num_parallel_uploads=settings.STORAGE_PARALLEL_UPLOADS,
+            content_type=content_type,
+            metadata={"Cache-Control": cache_control} if cache_control else None,
+        )
+
+    async def copy(self, source_key, key, content_type, cache_control=None):
+        from minio.commonconfig import REPLACE, CopySource
+        from minio.error import S3Error
+
+        headers = {"Content-Type": content_type}
+        if cache_control:
+            headers["Cache-Control"] = cache_control
+        try:
+            await self._run(
+                "copy",
+                self.client.copy_object,
+                self.bucket_name,
+                key,
+                CopySource(self.bucket_name, source_key),
+                metadata=headers,
+                metadata_directive=REPLACE,
+            )
+        except S3Error as e:
+            if self._not_found(e):
+                raise ObjectNotFound(source_key) from e
+            raise
+
+    async def stat(self, key):
+        from minio.error import S3Error
+
+        try:
+            result = await self._run("stat", self.client.stat_object, self.bucket_name, key)
+        except S3Error as e:
+            if self._not_found(e):
+                raise ObjectNotFound(key) from e
+            raise
+        return ObjectInfo(size=result.size, content_type=result.content_type)
+
+    def _read_range(self, key, offset, length):
+        response = self.client.get_object(self.bucket_name, key, offset=offset, length=length)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    async def read_range(self, key, offset, length):
+        return await self._run("read_range", self._read_range, key, offset, length)
+
+    def _download_to(self, key, file_obj, chunk_size=1024 * 1024):
+        response = self.client.get_object(self.bucket_name, key)
+        try:
+            for chunk in response.stream(chunk_size):
+                file_obj.write(chunk)
+        finally:
+            response.close()
+            response.release_conn()
+        file_obj.seek(0)
+
+    async def download_to(self, key, file_obj):
+        await self._run("download", self._download_to, key, file_obj)
+
+    async def remove(self, key):
+        await self._run("remove", self.client.remove_object, self.bucket_name, key)
+
+    def public_url(self, key):
+        protocol = "https" if settings.MINIO_SECURE else "http"
+        return f"{protocol}://{settings.MINIO_ENDPOINT}/{self.bucket_name}/{key}"
+
+    async def presigned_put_url(self, key, expires_seconds):
+        # The client PUTs the bytes straight to MinIO; nothing passes through the API
+        return await self._run(
+            "presign", self.client.presigned_put_object,
+            self.bucket_name, key, expires=timedelta(seconds=expires_seconds)
+        )
+
+    async def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._http.clear()
+
+
+class LocalFileStorage(ObjectStorage):
+    """
+    Objects as files under `root`. For tests and single-machine development.
+    The app serves them at `base_url`; no presigned uploads.
+    """
+    name = "local"
+
+    def __init__(self, root: str, base_url: str = "/media"):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(os.path.abspath(self.root) + os.sep):
+            raise ValueError(f"Invalid object key: {key}")
+        return path
+
+    def _put(self, key, data, length):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            remaining = length
+            while remaining > 0:
+                chunk = data.read(min(remaining, 1024 * 1024))
+                if not chunk:
+                    break
+                f.write(chunk)
+                remaining -= len(chunk)
+
+    async def put(self, key, data, length, content_type, cache_control=None):
+        with storage_latency.time(backend=self.name, operation="put"):
+            await asyncio.to_thread(self._put, key, data, length)
+
+    def _copy(self, source_key, key):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(self._path(source_key), path)
+
+    async def copy(self, source_key, key, content_type, cache_control=None):
+        await self.stat(source_key)
+        with storage_latency.time(backend=self.name, operation="copy"):
+            await asyncio.to_thread(self._copy, source_key, key)
+
+    async def stat(self, key):
+        path = self._path(key)
+        if not os.path.isfile(path):
+            raise ObjectNotFound(key)
+        # No stored metadata: typed by extension, like the files served at `base_url`
+        return ObjectInfo(size=os.path.getsize(path), content_type=mimetypes.guess_type(key)[0])
+
+    def _read_range(self, key, offset, length):
+        with open(self._path(key), "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    async def read_range(self, key, offset, length):
+        await self.stat(key)
+        return await asyncio.to_thread(self._read_range, key, offset, length)
+
+    def _download_to(self, key, file_obj):
+        with open(self._path(key), "rb") as f:
+            shutil.copyfileobj(f, file_obj)
+        file_obj.seek(0)
+
+    async def download_to(self, key, file_obj):
+        await self.stat(key)
+        await asyncio.to_thread(self._download_to, key, file_obj)
+
+    async def remove(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def public_url(self, key):
+        return f"{self.base_url}/{key}"
+
+
+_storage: Optional[ObjectStorage] = None
+_ready = False
+
+
+def _create_storage() -> ObjectStorage:
+    if settings.STORAGE_BACKEND == "local":
+        return LocalFileStorage(settings.STORAGE_LOCAL_ROOT, settings.STORAGE_LOCAL_BASE_URL)
+    return MinioStorage()
+
+
+def get_storage() -> ObjectStorage:
+    global _storage
+    if _storage is None:
+        _storage = _create_storage()
+    return _storage
+
+
+def set_storage(storage: Optional[ObjectStorage]) -> None:
+    """Replace the storage backend (tests), or reset it with None."""
+    global _storage, _ready
+    _storage = storage
+    _ready = False
+
+
+def storage_ready() -> bool:
+    return _ready
+
+
+async def init_storage(
+    attempts: Optional[int] = None, timeout: Optional[float] = None, backoff: Optional[float] = None
+) -> bool:
+    """
+    Bucket setup, started from the app lifespan as a background task so a slow
+    or unreachable MinIO never delays startup. Failures are retried with
+    exponential backoff (capped at STORAGE_INIT_MAX_BACKOFF) until storage is
+    up, or until `attempts` have failed if that is non-zero. Requests are
+    served meanwhile and fail individually if storage is really down.
+
+    An attempt running longer than `timeout` counts as failed but is not
+    abandoned: its blocking call can't be interrupted, so the next attempt
+    waits for it rather than starting another one beside it.
+    """
+    global _ready
+    attempts = attempts if attempts is not None else settings.STORAGE_INIT_ATTEMPTS
+    timeout = timeout if timeout is not None else settings.STORAGE_INIT_TIMEOUT
+    backoff = backoff if backoff is not None else settings.STORAGE_INIT_BACKOFF
+
+    pending: Optional[asyncio.Future] = None
+    attempt = 0
+    try:
+        while True:
+            attempt += 1
+            if pending is None:
+                pending = asyncio.ensure_future(get_storage().initialize())
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if done:
+                error = pending.exception()
+                pending = None
+                if error is None:
+                    _ready = True
+                    return True
+            else:
+                error = TimeoutError(f"no response within {timeout}s")
+
+            limit = f"/{attempts}" if attempts else ""
+            print(f"Storage initialization attempt {attempt}{limit} failed: {error!r}")
+            if attempts and attempt >= attempts:
+                return False
+            # Exponent bounded so the delay never overflows before the cap applies
+            delay = backoff * 2 ** min(attempt - 1, 30)
+            await asyncio.sleep(min(delay, settings.STORAGE_INIT_MAX_BACKOFF))
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+async def close_storage() -> None:
+    global _storage, _ready
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
+    _ready = False
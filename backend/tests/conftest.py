@@ -0,0 +1,19 @@
+import fakeredis
+import pytest
+from src.apps.ai import cache as ai_cache
+from src.apps.interactions import cache as interactions_cache
+from src.apps.notifications import cache as notifications_cache
+from src.apps.notifications import service as notifications_service
+from src.apps.upload import cache as upload_cache
+
+# Modules holding their own reference to the shared client
+_REDIS_USERS = (ai_cache, interactions_cache, notifications_cache, notifications_service, upload_cache)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """In-memory Redis (Lua included) instead of whatever REDIS_URL points at."""
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    for module in _REDIS_USERS:
+        monkeypatch.setattr(module, "redis_client", client)
+    return client
@@ -0,0 +1,130 @@
+import io
+import json
+import os
+
+import pytest
+import pytest_asyncio
+from PIL import Image
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from src.database.base import Base
+from src.apps.ai import backfill as backfill_module
+from src.apps.ai.backfill import Backfill, Checkpoint
+from src.apps.ai.cache import unpack_embedding
+from src.apps.users.models import User
+from src.apps.tags.models import post_tags
+from src.apps.posts.models import Post, PostImage
+from src.apps.interactions.models import Comment
+from src.apps.notifications.models import Notification
+from src.utils.storage import LocalFileStorage
+
+
+def _jpeg(color) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest_asyncio.fixture
+async def images(tmp_path):
+    # A file, not :memory:, so the pipeline's concurrent sessions get their own connections
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'backfill.db'}", echo=False)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    storage = LocalFileStorage(str(tmp_path / "media"), "http://cdn.test/media/")
+    async with async_session() as db:
+        for i in range(7):
+            data = _jpeg((i * 30, 0, 0))
+            key = f"uploads/{i}.jpg"
+            await storage.put(key, io.BytesIO(data), len(data), "image/jpeg")
+            db.add(PostImage(id=f"img-{i}", post_id="p", image_path=storage.public_url(key)))
+        # Not one of our objects: counted as failed, doesn't stop the run
+        db.add(PostImage(id="img-9", post_id="p", image_path="https://elsewhere.test/x.jpg"))
+        await db.commit()
+
+    yield async_session, storage
+    await engine.dispose()
+
+
+def _analyze(calls):
+    def analyze_batch(batch):
+        calls.append(len(batch))
+        return [{"tags": ["红色"], "embedding": [0.5, -0.25]} for _ in batch]
+    return analyze_batch
+
+
+@pytest.mark.asyncio
+async def test_backfill_updates_rows_and_checkpoints(images, tmp_path):
+    async_session, storage = images
+    path = str(tmp_path / "checkpoint.json")
+    calls = []
+
+    backfill = Backfill(
+        async_session, storage, _analyze(calls), Checkpoint(path, "v1"),
+        batch_size=3, chunk_size=3, concurrency=2
+    )
+    stats = await backfill.run()
+
+    assert (stats.processed, stats.failed) == (7, 1)
+    assert sum(calls) == 7 and max(calls) <= 3
+    async with async_session() as db:
+        rows = {row.id: row for row in (await db.execute(select(PostImage))).scalars()}
+    assert rows["img-0"].ai_tags == ["红色"]
+    assert rows["img-0"].ai_labels_version == "v1"
+    assert unpack_embedding(rows["img-6"].embedding) == [0.5, -0.25]
+    assert rows["img-9"].ai_labels_version is None
+
+    with open(path) as f:
+        state = json.load(f)
+    assert state == {"version": "v1", "last_id": "img-9", "processed": 7, "failed": 1}
+
+    # Done rows are skipped; a new labels version redoes them
+    calls.clear()
+    stats = await Backfill(async_session, storage, _analyze(calls), Checkpoint(None, "v1")).run()
+    assert (stats.processed, stats.failed) == (0, 1)
+    stats = await Backfill(async_session, storage, _analyze(calls), Checkpoint(None, "v2")).run()
+    assert (stats.processed, stats.failed) == (7, 1)
+
+
+@pytest.mark.asyncio
+async def test_backfill_resumes_after_checkpoint(images, tmp_path):
+    async_session, storage = images
+    path = str(tmp_path / "checkpoint.json")
+    with open(path, "w") as f:
+        json.dump({"version": "v1", "last_id": "img-3", "processed": 4, "failed": 0}, f)
+
+    stats = await Backfill(async_session, storage, _analyze([]), Checkpoint(path, "v1")).run()
+    assert (stats.processed, stats.failed) == (3, 1)
+    async with async_session() as db:
+        done = (await db.execute(
+            select(PostImage.id).where(PostImage.ai_labels_version == "v1").order_by(PostImage.id)
+        )).scalars().all()
+    assert done == ["img-4", "img-5", "img-6"]
+
+    # A checkpoint from another labels version, or --restart, starts over
+    assert Checkpoint(path, "v2").last_id is None
+    assert Checkpoint(path, "v1", restart=True).last_id is None
+    assert not os.path.exists(f"{path}.tmp")
+
+
+@pytest.mark.asyncio
+async def test_backfill_bounds_buffered_bytes(images, monkeypatch):
+    async_session, storage = images
+    backfill = Backfill(
+        async_session, storage, _analyze([]), Checkpoint(None, "v1"),
+        concurrency=4, decode_workers=2, buffer_bytes=1
+    )
+    process_image = backfill_module.process_image
+
+    def decode(source):
+        # Each original exceeds the budget, so only the one being decoded is held
+        assert backfill.buffered.used == len(source.getvalue())
+        return process_image(source)
+
+    monkeypatch.setattr(backfill_module, "process_image", decode)
+    stats = await backfill.run()
+    assert (stats.processed, stats.failed) == (7, 1)
+    assert backfill.buffered.used == 0
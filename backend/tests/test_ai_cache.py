@@ -0,0 +1,100 @@
+import pytest
+from PIL import Image
+from src.apps.ai import cache, service
+from src.core.config import settings
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    calls = []
+
+    def analyze_batch(images):
+        calls.append(len(images))
+        return [{"tags": ["猫"], "embedding": [0.5, -0.25]} for _ in images]
+
+    monkeypatch.setattr(settings, "AI_INFERENCE_MODE", "local")
+    monkeypatch.setattr(service, "_analyze_batch", analyze_batch)
+    monkeypatch.setattr(service, "_batcher", None)
+    cache._local.clear()
+    yield calls
+    cache._local.clear()
+
+
+def test_pixel_hash_ignores_metadata():
+    a = Image.new("RGB", (8, 8), (1, 2, 3))
+    b = Image.new("RGB", (8, 8), (1, 2, 3))
+    b.info["exif"] = b"edited"
+    assert cache.pixel_hash(a) == cache.pixel_hash(b)
+    assert cache.pixel_hash(a) != cache.pixel_hash(Image.new("RGB", (8, 8), (1, 2, 4)))
+    assert cache.pixel_hash(a) != cache.pixel_hash(Image.new("RGB", (4, 16), (1, 2, 3)))
+
+
+def test_encoding_round_trip():
+    result = {"tags": ["猫"], "embedding": [0.5, -0.25, 1.0]}
+    assert cache._decode(cache._encode(result)) == result
+
+
+@pytest.mark.asyncio
+async def test_hit_skips_inference(fake_model):
+    hits = cache.cache_requests.value(result="hit", tier="local")
+
+    assert await service.get_image_tags(Image.new("RGB", (8, 8), (9, 9, 9))) == ["猫"]
+    # Same pixels, new object: served from the cache
+    assert await service.get_image_tags(Image.new("RGB", (8, 8), (9, 9, 9))) == ["猫"]
+    await service.shutdown()
+
+    assert fake_model == [1]
+    assert cache.cache_requests.value(result="hit", tier="local") == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_failed_inference_is_not_cached(fake_model, monkeypatch):
+    monkeypatch.setattr(service, "_analyze_batch", lambda images: [{"tags": [], "embedding": None} for _ in images])
+    assert await service.get_image_tags(Image.new("RGB", (8, 8), (5, 5, 5))) == []
+    await service.shutdown()
+    assert not cache._local
+
+
+def test_backend_change_uses_new_keys(monkeypatch):
+    before = cache._key("abc")
+    monkeypatch.setattr(settings, "AI_BACKEND", "onnx")
+    assert cache._key("abc") != before
+
+
+def test_onnx_export_change_uses_new_keys(monkeypatch):
+    monkeypatch.setattr(settings, "AI_BACKEND", "onnx")
+    monkeypatch.setattr(settings, "AI_ONNX_MODEL", None)
+    monkeypatch.setattr(settings, "AI_ONNX_QUANTIZED", True)
+    int8 = cache._key("abc")
+    monkeypatch.setattr(settings, "AI_ONNX_QUANTIZED", False)
+    fp32 = cache._key("abc")
+    monkeypatch.setattr(settings, "AI_ONNX_MODEL", "/models/custom.onnx")
+    assert len({int8, fp32, cache._key("abc")}) == 3
+
+
+@pytest.mark.asyncio
+async def test_remote_results_are_keyed_by_the_workers_encoder(fake_redis, monkeypatch):
+    class Worker:
+        variant = None
+
+        async def backend_variant(self):
+            self.variant = "onnx-int8"
+            return self.variant
+
+        async def analyze(self, image):
+            return {"tags": ["猫"], "embedding": [0.5]}
+
+    monkeypatch.setattr(settings, "AI_INFERENCE_MODE", "remote")
+    monkeypatch.setattr(settings, "AI_BACKEND", "torch")
+    monkeypatch.setattr(service, "_remote", Worker())
+    cache._local.clear()
+    try:
+        content_hash = cache.pixel_hash(Image.new("RGB", (8, 8), (3, 3, 3)))
+        assert await service.get_image_tags(Image.new("RGB", (8, 8), (3, 3, 3))) == ["猫"]
+        assert await cache.get_analysis(content_hash, "onnx-int8") is not None
+        # Not under this process's own (torch) setting
+        cache._local.clear()
+        assert await cache.get_analysis(content_hash) is None
+    finally:
+        monkeypatch.setattr(service, "_remote", None)
+        cache._local.clear()
@@ -0,0 +1,33 @@
+import unittest
+from unittest import mock
+
+from src.apps.ai import labels
+from src.common.constants import TAG_CATEGORIES
+
+
+class TestLabelsFingerprint(unittest.TestCase):
+    def setUp(self):
+        # Memoized per process; these tests change the labels in place
+        labels.labels_fingerprint.cache_clear()
+        self.addCleanup(labels.labels_fingerprint.cache_clear)
+
+    def test_stable(self):
+        self.assertEqual(labels.labels_fingerprint(), labels.labels_fingerprint())
+
+    def test_changes_with_labels(self):
+        before = labels.labels_fingerprint()
+        with mock.patch.dict(labels.LABELS_MAP, {"forest": "森林"}):
+            labels.labels_fingerprint.cache_clear()
+            self.assertNotEqual(labels.labels_fingerprint(), before)
+        labels.labels_fingerprint.cache_clear()
+        self.assertEqual(labels.labels_fingerprint(), before)
+
+    def test_changes_with_tag_categories(self):
+        before = labels.labels_fingerprint()
+        with mock.patch.dict(TAG_CATEGORIES, {"extra": {"label": "其他", "tags": ["森林"]}}):
+            labels.labels_fingerprint.cache_clear()
+            self.assertNotEqual(labels.labels_fingerprint(), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import sys
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from src.apps.ai import service as ai_service
+from httpx import ASGITransport, AsyncClient
+from src.apps.system.router import router
+from src.core.config import settings
+from src.utils import storage
+from src.utils.storage import LocalFileStorage, init_storage
+
+
+@pytest.fixture
+def client_app(monkeypatch):
+    monkeypatch.setattr(settings, "AI_INFERENCE_MODE", "local")
+    monkeypatch.setattr(settings, "AI_PRELOAD", False)
+    app = FastAPI()
+    app.include_router(router)
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.set_storage(LocalFileStorage(tmp))
+        yield app
+        storage.set_storage(None)
+
+
+@pytest.mark.asyncio
+async def test_health_waits_for_storage(client_app):
+    async with AsyncClient(transport=ASGITransport(app=client_app), base_url="http://test") as client:
+        response = await client.get("/health")
+        assert response.status_code == 503
+        assert response.json()["storage"] is False
+
+        assert await init_storage(attempts=1, timeout=1, backoff=0)
+        response = await client.get("/health")
+        assert response.status_code == 200
+        assert response.json()["ai"]["mode"] == "local"
+
+
+@pytest.mark.asyncio
+async def test_health_waits_for_preloaded_model(client_app, monkeypatch):
+    monkeypatch.setattr(settings, "AI_PRELOAD", True)
+    assert await init_storage(attempts=1, timeout=1, backoff=0)
+    async with AsyncClient(transport=ASGITransport(app=client_app), base_url="http://test") as client:
+        response = await client.get("/health")
+    # The model isn't loaded in this process
+    assert response.status_code == 503
+    assert response.json()["ai"]["loaded"] is False
+
+
+@pytest.mark.asyncio
+async def test_failed_preload_is_retried_until_loaded(client_app, monkeypatch):
+    monkeypatch.setattr(settings, "AI_PRELOAD", True)
+    monkeypatch.setattr(settings, "AI_PRELOAD_BACKOFF", 0)
+    # Stands in for the model module, so torch is never imported
+    tagger = SimpleNamespace(ready=False)
+    monkeypatch.setitem(sys.modules, "src.apps.ai.model", SimpleNamespace(tagger=tagger))
+    calls = []
+
+    def load_and_warm_up():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("model files not found")
+        tagger.ready = True
+
+    monkeypatch.setattr(ai_service, "_load_and_warm_up", load_and_warm_up)
+    monkeypatch.setattr(ai_service, "_preload_error", None)
+
+    await ai_service.preload()
+    assert len(calls) == 3
+    status = await ai_service.readiness()
+    assert status["ready"] and "error" not in status
+
+
+@pytest.mark.asyncio
+async def test_preload_error_is_cleared_once_loaded(client_app, monkeypatch):
+    monkeypatch.setattr(settings, "AI_PRELOAD", True)
+    tagger = SimpleNamespace(ready=False)
+    monkeypatch.setitem(sys.modules, "src.apps.ai.model", SimpleNamespace(tagger=tagger))
+    monkeypatch.setattr(ai_service, "_preload_error", "model files not found")
+    assert (await ai_service.readiness())["error"] == "model files not found"
+
+    # Loaded lazily by an upload
+    tagger.ready = True
+    status = await ai_service.readiness()
+    assert status["ready"] and "error" not in status
@@ -0,0 +1,68 @@
+import io
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from src.apps.upload.pipeline import MODEL_INPUT_SIZE, encode_renditions, process_image
+
+
+def make_jpeg(size, orientation=None) -> io.BytesIO:
+    buf = io.BytesIO()
+    exif = Image.Exif()
+    exif[0x010F] = "Fujifilm"  # Make
+    if orientation:
+        exif[0x0112] = orientation
+    Image.new("RGB", size, (200, 120, 40)).save(buf, format="JPEG", exif=exif.tobytes())
+    buf.seek(0)
+    return buf
+
+
+class TestImagePipeline(unittest.TestCase):
+    def test_single_decode_outputs(self):
+        source = make_jpeg((3000, 2000))
+        result = process_image(source, rendition_widths=[640, 320, 4000])
+
+        self.assertEqual((result.width, result.height), (3000, 2000))
+        self.assertEqual(result.exif.get("camera_make"), "Fujifilm")
+        # Wider than the source: skipped
+        self.assertEqual(sorted(result.renditions), [320, 640])
+        self.assertEqual(result.renditions[640].size, (640, 427))
+        self.assertEqual(result.model_input.mode, "RGB")
+        self.assertEqual(min(result.model_input.size), MODEL_INPUT_SIZE)
+        self.assertTrue({"header", "decode", "renditions", "model_input"} <= set(result.timings))
+        # Caller can keep reading the same file object
+        self.assertEqual(source.tell(), 0)
+
+    def test_exif_orientation_is_applied(self):
+        result = process_image(make_jpeg((1200, 800), orientation=6), rendition_widths=[320])
+        # Stored landscape, displayed portrait
+        self.assertEqual((result.width, result.height), (1200, 800))
+        self.assertEqual(result.renditions[320].size, (320, 480))
+
+    def test_not_an_image(self):
+        result = process_image(io.BytesIO(b"not an image"))
+        self.assertEqual((result.width, result.height), (0, 0))
+        self.assertIsNone(result.model_input)
+
+    def test_source_is_left_open(self):
+        source = io.BytesIO()
+        Image.new("RGB", (400, 300), "red").save(source, format="PNG")
+        result = process_image(source, rendition_widths=[320])
+
+        self.assertEqual(sorted(result.renditions), [320])
+        self.assertFalse(source.closed)
+        self.assertEqual(source.tell(), 0)
+
+    def test_renditions_encode_in_process_pool(self):
+        result = process_image(make_jpeg((1600, 1200)), rendition_widths=[320, 640])
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            encoded = pool.submit(encode_renditions, result.renditions, ["webp", "jpeg"], 80).result()
+
+        self.assertEqual(set(encoded), {(320, "webp"), (320, "jpeg"), (640, "webp"), (640, "jpeg")})
+        webp = Image.open(io.BytesIO(encoded[(640, "webp")]))
+        self.assertEqual((webp.format, webp.size), ("WEBP", (640, 480)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import pytest
+from src.apps.ai.batching import InferenceBatcher, batch_size_histogram
+
+
+def make_batcher(max_batch_size, max_wait, name):
+    calls = []
+
+    def run_batch(items):
+        calls.append(list(items))
+        return [item * 10 for item in items]
+
+    return InferenceBatcher(run_batch, max_batch_size=max_batch_size, max_wait=max_wait, name=name), calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_a_batch():
+    batcher, calls = make_batcher(max_batch_size=4, max_wait=0.05, name="test-share")
+    try:
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(6)))
+    finally:
+        await batcher.stop()
+
+    # Results keep request order; at most max_batch_size per forward pass
+    assert results == [0, 10, 20, 30, 40, 50]
+    assert [len(batch) for batch in calls] == [4, 2]
+    assert batch_size_histogram.count(model="test-share") == 2
+
+
+@pytest.mark.asyncio
+async def test_single_request_waits_at_most_max_wait():
+    batcher, calls = make_batcher(max_batch_size=8, max_wait=0.01, name="test-wait")
+    try:
+        assert await asyncio.wait_for(batcher.submit(1), timeout=1) == 10
+    finally:
+        await batcher.stop()
+    assert calls == [[1]]
+
+
+@pytest.mark.asyncio
+async def test_batch_failure_reaches_every_caller():
+    def run_batch(items):
+        raise RuntimeError("model unavailable")
+
+    batcher = InferenceBatcher(run_batch, max_batch_size=4, max_wait=0.01, name="test-fail")
+    try:
+        results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        # The scheduler keeps serving after a failed batch
+        batcher.run_batch = lambda items: items
+        assert await batcher.submit(3) == 3
+    finally:
+        await batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_batches():
+    running = 0
+    peak = 0
+
+    def run_batch(items):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        time.sleep(0.05)
+        running -= 1
+        return items
+
+    batcher = InferenceBatcher(run_batch, max_batch_size=1, max_wait=0, name="test-concurrency", concurrency=2)
+    try:
+        assert await asyncio.gather(*(batcher.submit(i) for i in range(4))) == [0, 1, 2, 3]
+    finally:
+        await batcher.stop()
+    assert peak == 2
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import tempfile
+import time
+
+import pytest
+from PIL import Image
+from src.apps.ai.client import InferenceUnavailable, RemoteTagger
+from src.apps.ai.worker import InferenceServer
+
+
+def tag_by_color(images):
+    # Stands in for the model process: one tag per image, from its first pixel
+    return [{"tags": [f"{mode}:{size[0]}x{size[1]}:{data[0]}"], "embedding": [1.0]} for mode, size, data in images]
+
+
+@pytest.fixture
+def socket_path():
+    with tempfile.TemporaryDirectory() as tmp:
+        yield os.path.join(tmp, "ai.sock")
+
+
+@pytest.mark.asyncio
+async def test_remote_tagging(socket_path):
+    server = InferenceServer(tag_by_color, socket_path=socket_path, max_pending=8, timeout=1)
+    await server.start()
+    client = RemoteTagger(socket_path, timeout=1)
+    try:
+        tags = await asyncio.gather(
+            client.analyze(Image.new("RGB", (4, 3), (10, 0, 0))),
+            client.analyze(Image.new("L", (2, 2), 200)),
+        )
+        assert [result["tags"] for result in tags] == [["RGB:4x3:10"], ["RGB:2x2:200"]]
+        # Connections are reused between requests
+        assert (await client.analyze(Image.new("RGB", (1, 1), (7, 7, 7))))["tags"] == ["RGB:1x1:7"]
+        assert len(client._idle) >= 1
+        assert "variant" not in tags[0]
+        assert await client.ping()
+        assert client.variant == "torch"
+    finally:
+        await client.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_admission_control_and_timeout(socket_path):
+    def slow(images):
+        time.sleep(0.3)
+        return [{"tags": [], "embedding": None} for _ in images]
+
+    server = InferenceServer(slow, socket_path=socket_path, max_pending=1, timeout=0.1)
+    await server.start()
+    client = RemoteTagger(socket_path, timeout=2)
+    try:
+        results = await asyncio.gather(
+            client.analyze(Image.new("RGB", (1, 1))),
+            client.analyze(Image.new("RGB", (1, 1))),
+            return_exceptions=True,
+        )
+        errors = sorted(str(r) for r in results)
+        assert errors == ["inference worker: overloaded", "inference worker: timeout"]
+    finally:
+        await client.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_worker_down(socket_path):
+    client = RemoteTagger(socket_path, timeout=1)
+    with pytest.raises(InferenceUnavailable):
+        await client.analyze(Image.new("RGB", (1, 1)))
+    assert not await client.ping()
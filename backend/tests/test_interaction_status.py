@@ -0,0 +1,103 @@
+
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from src.database.base import Base
+from src.apps.interactions import cache
+from src.apps.interactions.service import get_interaction_status
+from src.apps.interactions.models import Bookmark, Follow, Like
+from src.apps.users.models import User
+from src.apps.tags.models import post_tags
+from src.apps.posts.models import Post
+
+# Use SQLite for testing (Redis is not required: a cold/unavailable cache falls back to the DB)
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+@pytest.mark.asyncio
+async def test_batched_status():
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db:
+        alice = User(username="alice", email="alice@example.com", hashed_password="x")
+        bob = User(username="bob", email="bob@example.com", hashed_password="x")
+        carol = User(username="carol", email="carol@example.com", hashed_password="x")
+        db.add_all([alice, bob, carol])
+        await db.commit()
+
+        p1 = Post(title="P1", user_id=bob.id)
+        p2 = Post(title="P2", user_id=bob.id)
+        p3 = Post(title="P3", user_id=carol.id)
+        db.add_all([p1, p2, p3])
+        await db.commit()
+
+        db.add_all([
+            Like(user_id=alice.id, post_id=p1.id),
+            Bookmark(user_id=alice.id, post_id=p2.id),
+            Follow(follower_id=alice.id, followed_id=bob.id),
+        ])
+        await db.commit()
+
+        status = await get_interaction_status(
+            db, alice.id, [p1.id, p2.id, p3.id, p1.id], [bob.id, carol.id]
+        )
+
+        assert status["liked"] == {p1.id: True, p2.id: False, p3.id: False}
+        assert status["bookmarked"] == {p1.id: False, p2.id: True, p3.id: False}
+        assert status["following"] == {bob.id: True, carol.id: False}
+
+        # Empty batches don't query anything
+        empty = await get_interaction_status(db, alice.id, [], [])
+        assert empty == {"liked": {}, "bookmarked": {}, "following": {}}
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_status_cache_loads_only_missing_ids(fake_redis):
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db:
+        db.add_all([Like(user_id="u1", post_id="p1"), Like(user_id="u1", post_id="p9")])
+        await db.commit()
+
+        status = await get_interaction_status(db, "u1", ["p1", "p2"], [])
+        assert status["liked"] == {"p1": True, "p2": False}
+        # Only the requested ids are cached, not the user's whole relation
+        assert await fake_redis.hgetall("interactions:liked:u1") == {"p1": "1", "p2": "0"}
+
+        # Answered from the cache: the database no longer agrees, the cache wins
+        await db.execute(delete(Like).where(Like.post_id == "p1"))
+        await db.commit()
+        status = await get_interaction_status(db, "u1", ["p1", "p2", "p9"], [])
+        assert status["liked"] == {"p1": True, "p2": False, "p9": True}
+
+        await cache.invalidate("u1", cache.LIKED)
+        status = await get_interaction_status(db, "u1", ["p1", "p9"], [])
+        assert status["liked"] == {"p1": False, "p9": True}
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_stale_warm_after_invalidate_is_refused(fake_redis):
+    # A reader looked up the version before a write committed...
+    _, missing, version = await cache.get_members("u1", cache.LIKED, ["p1"])
+    assert missing == ["p1"]
+    # ...the write invalidates...
+    await cache.invalidate("u1", cache.LIKED)
+    # ...and the reader's pre-write result must not land in the cache
+    await cache.warm("u1", cache.LIKED, {"p1": False}, version)
+    assert await fake_redis.exists("interactions:liked:u1") == 0
+
+    _, _, version = await cache.get_members("u1", cache.LIKED, ["p1"])
+    await cache.warm("u1", cache.LIKED, {"p1": True}, version)
+    cached, missing, _ = await cache.get_members("u1", cache.LIKED, ["p1"])
+    assert cached == {"p1": True} and missing == []
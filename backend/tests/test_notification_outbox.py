@@ -0,0 +1,108 @@
+
+import pytest
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from src.database.base import Base
+from src.apps.interactions.service import follow_user, like_post
+from src.apps.notifications import service
+from src.apps.notifications.models import Notification, NotificationOutbox
+from src.apps.notifications.outbox import dispatch_batch
+from src.apps.users.models import User
+from src.apps.tags.models import post_tags
+from src.apps.posts.models import Post
+from src.core.config import settings
+
+# Use SQLite for testing
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+async def count(db, model):
+    return (await db.execute(select(func.count()).select_from(model))).scalar()
+
+@pytest.mark.asyncio
+async def test_interactions_write_outbox_then_dispatch():
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db:
+        author = User(username="author", email="author@example.com", hashed_password="x")
+        fan = User(username="fan", email="fan@example.com", hashed_password="x")
+        db.add_all([author, fan])
+        await db.commit()
+
+        post = Post(title="Test Post", user_id=author.id, likes_count=0)
+        db.add(post)
+        await db.commit()
+
+        assert await like_post(db, post.id, fan.id) == True
+        assert await follow_user(db, author.id, fan.id) == True
+
+        # The request path only staged the notifications
+        assert await count(db, NotificationOutbox) == 2
+        assert await count(db, Notification) == 0
+
+        assert await dispatch_batch(db, limit=100) == 2
+        assert await count(db, NotificationOutbox) == 0
+
+        notifications = (await db.execute(select(Notification))).scalars().all()
+        assert sorted((n.type.value, n.recipient_id, n.sender_id) for n in notifications) == [
+            ("follow", author.id, fan.id),
+            ("like", author.id, fan.id),
+        ]
+
+        # Nothing left to do
+        assert await dispatch_batch(db, limit=100) == 0
+
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_failing_rows_are_dead_lettered(monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFICATION_OUTBOX_MAX_ATTEMPTS", 2)
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db:
+        author = User(username="author", email="author@example.com", hashed_password="x")
+        db.add(author)
+        await db.commit()
+
+        store = service.store_notification
+
+        async def flaky_store(db, notification_in):
+            if notification_in.content == "boom":
+                raise RuntimeError("push target gone")
+            return await store(db, notification_in)
+
+        monkeypatch.setattr(service, "store_notification", flaky_store)
+        db.add_all([
+            NotificationOutbox(payload={"recipient_id": author.id}),  # can never validate
+            NotificationOutbox(payload={"recipient_id": author.id, "type": "system", "content": "boom"}),
+            NotificationOutbox(payload={"recipient_id": author.id, "type": "system", "content": "欢迎"}),
+        ])
+        await db.commit()
+
+        # The good row goes through; the others are counted, not retried unchanged forever
+        assert await dispatch_batch(db, limit=100) == 3
+        assert await count(db, Notification) == 1
+        rows = {r.id: r for r in (await db.execute(select(NotificationOutbox))).scalars()}
+        invalid, failing = sorted(rows.values(), key=lambda r: r.id)
+        assert invalid.attempts == 1 and invalid.failed_at is not None
+        assert failing.attempts == 1 and failing.failed_at is None
+        assert failing.last_error == "push target gone"
+
+        assert await dispatch_batch(db, limit=100) == 1
+        await db.refresh(failing)
+        assert failing.attempts == 2 and failing.failed_at is not None
+
+        # Dead letters stay for inspection but are no longer picked up
+        assert await dispatch_batch(db, limit=100) == 0
+        assert await count(db, NotificationOutbox) == 2
+
+    await engine.dispose()
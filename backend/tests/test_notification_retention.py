@@ -0,0 +1,106 @@
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from src.database.base import Base
+from src.apps.notifications import retention, service
+from src.apps.notifications.models import Notification, NotificationArchive
+from src.apps.notifications.schemas import NotificationCreate, NotificationType
+from src.apps.users.models import User
+from src.apps.tags.models import post_tags
+from src.apps.posts.models import Post
+from src.apps.interactions.models import Comment
+from src.core.config import settings
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+@pytest.mark.asyncio
+async def test_old_read_notifications_are_archived(monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFICATION_RETENTION_DAYS", 30)
+    monkeypatch.setattr(settings, "NOTIFICATION_RETENTION_MODE", "archive")
+    monkeypatch.setattr(settings, "NOTIFICATION_RETENTION_BATCH_SIZE", 2)
+
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db:
+        alice = User(username="alice", email="alice@example.com", hashed_password="x")
+        bob = User(username="bob", email="bob@example.com", hashed_password="x")
+        db.add_all([alice, bob])
+        await db.commit()
+
+        async def notify(type, content):
+            return await service.create_notification(db, NotificationCreate(
+                recipient_id=alice.id, sender_id=bob.id if type == NotificationType.FOLLOW else None,
+                type=type, content=content
+            ))
+
+        read_row = await notify(NotificationType.SYSTEM, "已读")
+        old_unread = await notify(NotificationType.SYSTEM, "未读")
+        old_follow = await notify(NotificationType.FOLLOW, "关注了你")
+        recent_read = await notify(NotificationType.SYSTEM, "最近")
+        await service.mark_as_read(db, read_row.id, alice.id)
+        await service.mark_as_read(db, recent_read.id, alice.id)
+        # Read through the per-type watermark only
+        await service.mark_all_as_read(db, alice.id, type=NotificationType.FOLLOW)
+
+        old = datetime.utcnow() - timedelta(days=60)
+        await db.execute(
+            update(Notification)
+            .where(Notification.id.in_([read_row.id, old_unread.id, old_follow.id]))
+            .values(created_at=old)
+        )
+        await db.commit()
+
+        assert await retention.run_retention(db) == 2
+
+        remaining = (await db.execute(select(Notification.id))).scalars().all()
+        assert sorted(remaining) == sorted([old_unread.id, recent_read.id])
+        assert await service.get_unread_count(db, alice.id) == 1
+
+        archived = await retention.get_archived_notifications(db, alice.id)
+        assert sorted(n.id for n in archived) == sorted([read_row.id, old_follow.id])
+        assert await retention.get_archived_notifications(db, alice.id, cursor=archived[-1].id) == []
+        assert await retention.get_archived_notifications(db, bob.id) == []
+
+        # Nothing left to move
+        assert await retention.run_retention(db) == 0
+
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_delete_mode_skips_archive(monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFICATION_RETENTION_DAYS", 30)
+    monkeypatch.setattr(settings, "NOTIFICATION_RETENTION_MODE", "delete")
+
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db:
+        alice = User(username="alice", email="alice@example.com", hashed_password="x")
+        db.add(alice)
+        await db.commit()
+
+        n = await service.create_notification(db, NotificationCreate(
+            recipient_id=alice.id, type=NotificationType.SYSTEM, content="欢迎"
+        ))
+        await service.mark_all_as_read(db, alice.id)
+        await db.execute(
+            update(Notification).where(Notification.id == n.id)
+            .values(created_at=datetime.utcnow() - timedelta(days=60))
+        )
+        await db.commit()
+
+        assert await retention.run_retention(db) == 1
+        assert (await db.execute(select(NotificationArchive))).scalars().all() == []
+
+    await engine.dispose()
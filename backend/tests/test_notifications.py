@@ -0,0 +1,338 @@
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from redis.exceptions import ConnectionError
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from src.database.base import Base
+from src.apps.notifications import cache, service
+from src.apps.notifications.models import Notification
+from src.apps.notifications.schemas import NotificationCreate, NotificationType
+from src.apps.users.models import User
+from src.apps.tags.models import post_tags
+from src.apps.posts.models import Post
+from src.apps.interactions.models import Comment
+
+# Use SQLite for testing, and fakeredis so the cached counters are exercised too
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+@pytest.fixture(autouse=True)
+def redis(fake_redis):
+    return fake_redis
+
+@pytest.mark.asyncio
+async def test_unread_count_lifecycle():
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db:
+        alice = User(username="alice", email="alice@example.com", hashed_password="x")
+        bob = User(username="bob", email="bob@example.com", hashed_password="x")
+        db.add_all([alice, bob])
+        await db.commit()
+
+        first = await service.create_notification(db, NotificationCreate(
+            recipient_id=alice.id, sender_id=bob.id, type=NotificationType.FOLLOW, content="关注了你"
+        ))
+        await service.create_notification(db, NotificationCreate(
+            recipient_id=alice.id, type=NotificationType.SYSTEM, content="欢迎"
+        ))
+        assert await service.get_unread_count(db, alice.id) == 2
+
+        await service.mark_as_read(db, first.id, alice.id)
+        # Marking the same notification twice must not decrement again
+        await service.mark_as_read(db, first.id, alice.id)
+        assert await service.get_unread_count(db, alice.id) == 1
+
+        await service.mark_all_as_read(db, alice.id)
+        assert await service.get_unread_count(db, alice.id) == 0
+        assert await service.get_unread_count(db, bob.id) == 0
+
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_likes_are_grouped_per_post():
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db:
+        author = User(username="author", email="author@example.com", hashed_password="x")
+        fans = [User(username=f"fan{i}", email=f"fan{i}@example.com", hashed_password="x") for i in range(3)]
+        db.add_all([author, *fans])
+        await db.commit()
+
+        post = Post(title="Popular", user_id=author.id)
+        db.add(post)
+        await db.commit()
+
+        for fan in [*fans, fans[0]]:  # fan0 likes twice
+            await service.create_notification(db, NotificationCreate(
+                recipient_id=author.id, sender_id=fan.id, type=NotificationType.LIKE,
+                post_id=post.id, content="赞了你的作品"
+            ))
+
+        notifications = await service.get_notifications(db, author.id)
+        assert len(notifications) == 1
+        group = notifications[0]
+        assert group.actor_count == 3
+        assert group.sender_id == fans[2].id
+        assert group.actor_ids == [fans[2].id, fans[1].id, fans[0].id]
+        assert await service.get_unread_count(db, author.id) == 1
+
+        # Once read, the next like starts a new group
+        await service.mark_all_as_read(db, author.id)
+        await service.create_notification(db, NotificationCreate(
+            recipient_id=author.id, sender_id=fans[1].id, type=NotificationType.LIKE,
+            post_id=post.id, content="赞了你的作品"
+        ))
+        assert len(await service.get_notifications(db, author.id)) == 2
+        assert await service.get_unread_count(db, author.id) == 1
+
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_read_watermark_per_type():
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db:
+        alice = User(username="alice", email="alice@example.com", hashed_password="x")
+        bob = User(username="bob", email="bob@example.com", hashed_password="x")
+        db.add_all([alice, bob])
+        await db.commit()
+
+        await service.create_notification(db, NotificationCreate(
+            recipient_id=alice.id, sender_id=bob.id, type=NotificationType.FOLLOW, content="关注了你"
+        ))
+        await service.create_notification(db, NotificationCreate(
+            recipient_id=alice.id, type=NotificationType.SYSTEM, content="欢迎"
+        ))
+
+        await service.mark_all_as_read(db, alice.id, type=NotificationType.FOLLOW)
+        assert await service.get_unread_count(db, alice.id) == 1
+        by_type = {n.type: n.is_read for n in await service.get_notifications(db, alice.id)}
+        assert by_type == {NotificationType.FOLLOW: True, NotificationType.SYSTEM: False}
+
+        # Arrives after the watermark moved: unread again
+        await service.create_notification(db, NotificationCreate(
+            recipient_id=alice.id, type=NotificationType.SYSTEM, content="公告"
+        ))
+        await service.mark_all_as_read(db, alice.id)
+        await service.create_notification(db, NotificationCreate(
+            recipient_id=alice.id, type=NotificationType.SYSTEM, content="维护通知"
+        ))
+        assert await service.get_unread_count(db, alice.id) == 1
+        unread = [n for n in await service.get_notifications(db, alice.id) if not n.is_read]
+        assert [n.content for n in unread] == ["维护通知"]
+
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_keyset_pagination():
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db:
+        alice = User(username="alice", email="alice@example.com", hashed_password="x")
+        db.add(alice)
+        await db.commit()
+
+        # Created within the same second: ties are broken by id
+        for i in range(7):
+            await service.create_notification(db, NotificationCreate(
+                recipient_id=alice.id, type=NotificationType.SYSTEM, content=f"公告 {i}"
+            ))
+
+        seen = []
+        cursor = None
+        while True:
+            page = await service.get_notifications(db, alice.id, limit=3, cursor=cursor)
+            if not page:
+                break
+            seen.extend(n.id for n in page)
+            cursor = page[-1].id
+
+        everything = await service.get_notifications(db, alice.id, limit=100)
+        assert seen == [n.id for n in everything]
+        assert len(set(seen)) == 7
+
+        # Type filter uses the same cursor
+        assert await service.get_notifications(
+            db, alice.id, type=NotificationType.LIKE, cursor=cursor
+        ) == []
+
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_unread_counter_is_cached_and_adjusted(redis):
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db:
+        alice = User(username="alice", email="alice@example.com", hashed_password="x")
+        db.add(alice)
+        await db.commit()
+
+        assert await service.get_unread_count(db, alice.id) == 0
+        assert await redis.get(f"notifications:unread:{alice.id}") == "0"
+        await service.create_notification(db, NotificationCreate(
+            recipient_id=alice.id, type=NotificationType.SYSTEM, content="欢迎"
+        ))
+        # Adjusted in place, not rebuilt
+        assert await redis.get(f"notifications:unread:{alice.id}") == "1"
+        assert await service.get_unread_count(db, alice.id) == 1
+
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_mark_all_leaves_later_notifications_unread():
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db:
+        alice = User(username="alice", email="alice@example.com", hashed_password="x")
+        db.add(alice)
+        await db.commit()
+
+        # Stamped after the watermark but committed before mark-all's UPDATE runs
+        later = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(minutes=1)
+        db.add(Notification(recipient_id=alice.id, type=NotificationType.SYSTEM, content="公告", created_at=later))
+        await db.commit()
+
+        await service.mark_all_as_read(db, alice.id)
+        assert await service.get_unread_count(db, alice.id) == 1
+
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_rebuild_racing_a_change_is_not_stored(redis):
+    # A reader finds no counter and starts counting in the database...
+    cached, generation = await cache.get_unread_count("u1")
+    assert cached is None
+    # ...meanwhile a notification arrives; the counter isn't cached, so nothing to adjust...
+    assert await cache.adjust_unread_count("u1", 1) is None
+    # ...and the count taken before it must not be cached
+    await cache.store_rebuilt_unread_count("u1", 0, generation)
+    assert await redis.get("notifications:unread:u1") is None
+
+    _, generation = await cache.get_unread_count("u1")
+    await cache.store_rebuilt_unread_count("u1", 1, generation)
+    assert await cache.get_unread_count("u1") == (1, generation)
+
+    # An invalidation also moves the generation
+    _, generation = await cache.get_unread_count("u1")
+    await cache.invalidate_unread_count("u1")
+    await cache.store_rebuilt_unread_count("u1", 5, generation)
+    assert (await cache.get_unread_count("u1"))[0] is None
+
+@pytest.mark.asyncio
+async def test_rebuild_between_commit_and_counter_update(tmp_path, redis, monkeypatch):
+    # A file database, so the reader's session sees the writer's commits
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", echo=False)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db, async_session() as reader:
+        alice = User(username="alice", email="alice@example.com", hashed_password="x")
+        db.add(alice)
+        await db.commit()
+        key = f"notifications:unread:{alice.id}"
+
+        stored = [await service.store_notification(db, NotificationCreate(
+            recipient_id=alice.id, type=NotificationType.SYSTEM, content="欢迎"
+        ))]
+        await service.commit_notifications(db, stored)
+        # Another request misses the counter and counts the committed row before the push
+        assert await service.get_unread_count(reader, alice.id) == 1
+        await service.push_notifications(db, stored)
+        assert await service.get_unread_count(reader, alice.id) == 1
+        assert await redis.get(key) == "1"
+
+        adjust = cache.adjust_unread_count
+
+        async def rebuild_then_adjust(user_id, delta):
+            await redis.delete(key)
+            assert await service.get_unread_count(reader, user_id) == 0
+            return await adjust(user_id, delta)
+
+        monkeypatch.setattr(cache, "adjust_unread_count", rebuild_then_adjust)
+        await service.mark_as_read(db, stored[0][0].id, alice.id)
+        monkeypatch.setattr(cache, "adjust_unread_count", adjust)
+        assert await service.get_unread_count(reader, alice.id) == 0
+        assert await redis.get(key) in (None, "0")
+
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_group_merge_increments_in_database():
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db, async_session() as other:
+        author = User(username="author", email="author@example.com", hashed_password="x")
+        fans = [User(username=f"fan{i}", email=f"fan{i}@example.com", hashed_password="x") for i in range(2)]
+        db.add_all([author, *fans])
+        await db.commit()
+        post = Post(title="Popular", user_id=author.id)
+        db.add(post)
+        await db.commit()
+
+        def like(fan):
+            return NotificationCreate(
+                recipient_id=author.id, sender_id=fan.id, type=NotificationType.LIKE,
+                post_id=post.id, content="赞了你的作品"
+            )
+
+        group = await service.create_notification(db, like(fans[0]))
+        assert group.actor_count == 1
+        # Another worker merges a like into the group; `db` still holds actor_count=1
+        await other.execute(update(Notification).where(Notification.id == group.id).values(actor_count=2))
+        await other.commit()
+
+        merged = await service.create_notification(db, like(fans[1]))
+        assert merged.id == group.id
+        assert merged.actor_count == 3
+
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_local_push_slots_expire(redis, monkeypatch):
+    async def unreachable(*args, **kwargs):
+        raise ConnectionError("Connection refused")
+
+    monkeypatch.setattr(redis, "set", unreachable)
+    now = [1000.0]
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    monkeypatch.setattr(cache, "_local_push_slots", cache.OrderedDict())
+
+    assert await cache.acquire_push_slot("n1", 10)
+    assert not await cache.acquire_push_slot("n1", 10)
+    now[0] += 5
+    assert await cache.acquire_push_slot("n2", 10)
+
+    # Slots whose interval has passed are dropped, not kept forever
+    now[0] += 6
+    assert await cache.acquire_push_slot("n3", 10)
+    assert list(cache._local_push_slots) == ["n2", "n3"]
@@ -0,0 +1,91 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from src.apps.ai import export_onnx
+from src.apps.ai.backends import (
+    OnnxVisionBackend,
+    TorchVisionBackend,
+    create_backend,
+    onnx_model_path,
+)
+from src.apps.ai.labels import ENGLISH_LABELS
+from src.apps.ai.model import tagger
+from src.core.config import settings
+
+IMAGE_SIZE = 32
+
+
+@pytest.fixture
+def tiny_tagger(monkeypatch):
+    """The real tagger around a small randomly initialized CLIP, so no download is needed."""
+    torch.manual_seed(0)
+    config = transformers.CLIPConfig(
+        text_config={
+            "hidden_size": 32, "intermediate_size": 37, "num_hidden_layers": 2,
+            "num_attention_heads": 4, "vocab_size": 99, "max_position_embeddings": 77,
+        },
+        vision_config={
+            "hidden_size": 32, "intermediate_size": 37, "num_hidden_layers": 2,
+            "num_attention_heads": 4, "image_size": IMAGE_SIZE, "patch_size": 8,
+        },
+        projection_dim=16,
+    )
+    model = transformers.CLIPModel(config).eval()
+    processor = transformers.CLIPImageProcessor(
+        size={"shortest_edge": IMAGE_SIZE}, crop_size={"height": IMAGE_SIZE, "width": IMAGE_SIZE}
+    )
+    label_embeddings = torch.randn(len(ENGLISH_LABELS), 16)
+    state = {
+        "model": model,
+        "processor": processor,
+        "device": "cpu",
+        "label_embeddings": label_embeddings / label_embeddings.norm(dim=-1, keepdim=True),
+        "logit_scale": 100.0,
+        "backend": TorchVisionBackend(model, "cpu"),
+        "ready": True,
+    }
+    for name, value in state.items():
+        monkeypatch.setattr(tagger, name, value)
+    return tagger
+
+
+def test_reference_images_are_fixed():
+    first = export_onnx.reference_images(8, IMAGE_SIZE)
+    second = export_onnx.reference_images(8, IMAGE_SIZE)
+    assert [name for name, _ in first] == [name for name, _ in second]
+    assert all(a.tobytes() == b.tobytes() for (_, a), (_, b) in zip(first, second))
+
+
+def test_onnx_export_tags_like_torch(tiny_tagger, tmp_path):
+    path = str(tmp_path / "clip-vision.onnx")
+    export_onnx.export(tiny_tagger.model, IMAGE_SIZE, path, opset=17)
+
+    images = export_onnx.reference_images(8, IMAGE_SIZE)
+    assert export_onnx.check(path, images, min_agreement=1.0)
+    # check() leaves the tagger on PyTorch
+    assert isinstance(tiny_tagger.backend, TorchVisionBackend)
+
+    pixel_values = tiny_tagger.processor(images=[image for _, image in images], return_tensors="pt")["pixel_values"]
+    expected = TorchVisionBackend(tiny_tagger.model, "cpu").image_features(pixel_values)
+    actual = OnnxVisionBackend(path).image_features(pixel_values)
+    assert torch.allclose(expected, actual, atol=1e-4)
+
+
+def test_create_backend(tiny_tagger, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "AI_BACKEND", "torch")
+    assert isinstance(create_backend(tiny_tagger.model, "cpu", str(tmp_path)), TorchVisionBackend)
+
+    monkeypatch.setattr(settings, "AI_BACKEND", "onnx")
+    monkeypatch.setattr(settings, "AI_ONNX_MODEL", None)
+    monkeypatch.setattr(settings, "AI_ONNX_QUANTIZED", False)
+    with pytest.raises(RuntimeError):
+        create_backend(tiny_tagger.model, "cpu", str(tmp_path))
+
+    export_onnx.export(tiny_tagger.model, IMAGE_SIZE, onnx_model_path(str(tmp_path), quantized=False), opset=17)
+    backend = create_backend(tiny_tagger.model, "cpu", str(tmp_path))
+    assert isinstance(backend, OnnxVisionBackend)
+    assert backend.path == onnx_model_path(str(tmp_path), quantized=False)
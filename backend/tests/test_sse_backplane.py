@@ -0,0 +1,92 @@
+import pytest
+import pytest_asyncio
+from redis.exceptions import ConnectionError
+from src.apps.notifications.service import ConnectionManager
+from src.core.config import settings
+
+
+@pytest_asyncio.fixture
+async def workers(fake_redis, monkeypatch):
+    # Two API workers sharing one Redis
+    monkeypatch.setattr(settings, "SSE_REDIS_BACKPLANE", True)
+    monkeypatch.setattr(ConnectionManager, "RETRY_DELAY", 0.01)
+    managers = (ConnectionManager(), ConnectionManager())
+    yield managers
+    for manager in managers:
+        await manager.close()
+
+
+def _like(count):
+    return {"type": "like", "unread_count": count}
+
+
+@pytest.mark.asyncio
+async def test_cross_worker_delivery(workers):
+    a, b = workers
+    connection = await a.connect("u1")
+
+    await b.send_personal_message("u1", _like(1))
+    await b.send_personal_message("u1", _like(2))
+
+    assert await connection.get(timeout=2) == (1, _like(1))
+    assert await connection.get(timeout=2) == (2, _like(2))
+    assert b.stats("u1") == []
+
+
+@pytest.mark.asyncio
+async def test_resubscribe_after_dropped_connection_replays_missed(workers, monkeypatch):
+    a, b = workers
+    connection = await a.connect("u1")
+    await b.send_personal_message("u1", _like(1))
+    assert (await connection.get(timeout=2))[0] == 1
+
+    pubsub = a._pubsub
+    get_message = pubsub.get_message
+
+    async def dropped(**kwargs):
+        monkeypatch.setattr(pubsub, "get_message", get_message)
+        # The connection is gone and its subscriptions with it...
+        await pubsub.unsubscribe()
+        # ...so this one never reaches worker a through pub/sub
+        await b.send_personal_message("u1", _like(2))
+        raise ConnectionError("Connection reset by peer")
+
+    monkeypatch.setattr(pubsub, "get_message", dropped)
+
+    # Delivered from the replay buffer once the listener has resubscribed
+    assert await connection.get(timeout=2) == (2, _like(2))
+    await b.send_personal_message("u1", _like(3))
+    assert await connection.get(timeout=2) == (3, _like(3))
+    assert connection.queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_messages_published_while_subscribe_fails_are_caught_up(workers, fake_redis, monkeypatch):
+    a, b = workers
+    pubsub = fake_redis.pubsub(ignore_subscribe_messages=True)
+    subscribe = pubsub.subscribe
+    failures = [ConnectionError("Connection refused")]
+
+    async def flaky_subscribe(*channels):
+        if failures:
+            await b.send_personal_message("u1", _like(1))
+            raise failures.pop()
+        return await subscribe(*channels)
+
+    monkeypatch.setattr(pubsub, "subscribe", flaky_subscribe)
+    monkeypatch.setattr(fake_redis, "pubsub", lambda **kwargs: pubsub)
+
+    connection = await a.connect("u1")
+    assert await connection.get(timeout=2) == (1, _like(1))
+
+
+@pytest.mark.asyncio
+async def test_close_stops_listener(workers):
+    a, _ = workers
+    await a.connect("u1")
+    listener = a._listener
+    assert listener is not None and not listener.done()
+
+    await a.close()
+    assert listener.done()
+    assert a._listener is None and a._pubsub is None
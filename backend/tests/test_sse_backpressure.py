@@ -0,0 +1,39 @@
+import pytest
+from src.apps.notifications.service import SSEConnection
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest():
+    conn = SSEConnection("u1", maxsize=2)
+    for i in range(3):
+        conn.put({"type": "like", "unread_count": i}, "drop_oldest")
+
+    assert conn.dropped == 1
+    assert (await conn.get(timeout=1))[1]["unread_count"] == 1
+    assert (await conn.get(timeout=1))[1]["unread_count"] == 2
+    assert conn.delivered == 2
+
+
+@pytest.mark.asyncio
+async def test_collapse_into_unread_count():
+    conn = SSEConnection("u1", maxsize=2)
+    for i in range(3):
+        conn.put({"type": "like", "unread_count": i + 1}, "collapse", event_id=i + 1)
+
+    assert conn.queue.qsize() == 1
+    assert conn.dropped == 3
+    assert await conn.get(timeout=1) == (3, {"type": "unread_count", "unread_count": 3})
+
+
+@pytest.mark.asyncio
+async def test_disconnect_slow_consumer():
+    conn = SSEConnection("u1", maxsize=1)
+    conn.put({"type": "like", "unread_count": 1}, "disconnect")
+    conn.put({"type": "like", "unread_count": 2}, "disconnect")
+
+    assert conn.closed
+    assert conn.dropped == 2
+    # The stream is terminated with a sentinel; later messages are ignored
+    conn.put({"type": "like", "unread_count": 3}, "disconnect")
+    assert (await conn.get(timeout=1))[1] is None
+    assert conn.queue.empty()
@@ -0,0 +1,103 @@
+import pytest
+from redis.exceptions import ConnectionError
+from src.apps.notifications.service import ConnectionManager
+from src.core.config import settings
+
+
+@pytest.fixture
+def local_manager(monkeypatch):
+    # Exercise the in-process buffer; the Redis path stores the same events
+    monkeypatch.setattr(settings, "SSE_REDIS_BACKPLANE", False)
+    monkeypatch.setattr(settings, "SSE_REPLAY_BUFFER_SIZE", 3)
+    return ConnectionManager()
+
+
+@pytest.mark.asyncio
+async def test_event_ids_and_replay(local_manager):
+    connection = await local_manager.connect("u1")
+    for i in range(3):
+        await local_manager.send_personal_message("u1", {"type": "like", "unread_count": i + 1})
+
+    assert [(await connection.get(timeout=1))[0] for _ in range(3)] == [1, 2, 3]
+
+    missed, complete = await local_manager.replay("u1", 1)
+    assert complete
+    assert [event_id for event_id, _ in missed] == [2, 3]
+    assert missed[-1][1]["unread_count"] == 3
+
+    # Up to date: nothing to replay
+    assert await local_manager.replay("u1", 3) == ([], True)
+
+
+@pytest.mark.asyncio
+async def test_replay_gap_requires_resync(local_manager):
+    for i in range(5):
+        await local_manager.send_personal_message("u1", {"type": "like", "unread_count": i + 1})
+
+    # Only events 3..5 are still buffered
+    missed, complete = await local_manager.replay("u1", 1)
+    assert not complete
+    assert [event_id for event_id, _ in missed] == [3, 4, 5]
+
+    missed, complete = await local_manager.replay("u1", 2)
+    assert complete
+
+    # Ids ahead of the server (e.g. counters were reset) also force a resync
+    assert await local_manager.replay("u1", 99) == ([], False)
+
+
+def test_named_events():
+    from src.apps.notifications.router import _sse_event
+
+    assert _sse_event({"type": "like"}, 4) == 'id: 4\ndata: {"type": "like"}\n\n'
+    # Non-notification messages must not reach EventSource.onmessage
+    assert _sse_event({"event": "upload_processed", "status": "done"}, 5).startswith(
+        "id: 5\nevent: upload_processed\ndata: "
+    )
+
+
+@pytest.mark.asyncio
+async def test_redis_ids_are_buffered_in_order(fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "SSE_REDIS_BACKPLANE", True)
+    monkeypatch.setattr(settings, "SSE_REPLAY_BUFFER_SIZE", 3)
+    manager = ConnectionManager()
+    for i in range(4):
+        await manager.send_personal_message("u1", {"type": "like", "unread_count": i + 1})
+
+    missed, complete = await manager.replay("u1", 2)
+    assert complete
+    assert missed == [(3, {"type": "like", "unread_count": 3}), (4, {"type": "like", "unread_count": 4})]
+    assert await fake_redis.llen("notifications:replay:u1") == 3
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_sends_unnumbered_events(fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "SSE_REDIS_BACKPLANE", True)
+    manager = ConnectionManager()
+    connection = await manager.connect("u1")
+    await manager.send_personal_message("u1", {"type": "like", "unread_count": 1})
+    assert (await connection.get(timeout=2))[0] == 1
+
+    async def unreachable(*args, **kwargs):
+        raise ConnectionError("Connection refused")
+
+    monkeypatch.setattr(fake_redis, "eval", unreachable)
+    monkeypatch.setattr(fake_redis, "pipeline", lambda **kwargs: _BrokenPipeline())
+    await manager.send_personal_message("u1", {"type": "like", "unread_count": 2})
+
+    # Not numbered from a restarted local counter, so streams holding id 1 don't drop it
+    assert await connection.get(timeout=1) == (None, {"type": "like", "unread_count": 2})
+    # What was missed can't be told while Redis is down
+    assert await manager.replay("u1", 1) == ([], False)
+    await manager.close()
+
+
+class _BrokenPipeline:
+    def get(self, *args):
+        pass
+
+    def lrange(self, *args):
+        pass
+
+    async def execute(self):
+        raise ConnectionError("Connection refused")
@@ -0,0 +1,146 @@
+import asyncio
+import io
+import tempfile
+import unittest
+
+from src.utils.metrics import Counter, Histogram, render_metrics
+from src.utils import storage as storage_module
+from src.utils.storage import LocalFileStorage, ObjectNotFound, init_storage, storage_latency
+
+
+class TestLocalFileStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = LocalFileStorage(self.tmp.name, "http://cdn.test/media/")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_put_stat_read(self):
+        data = b"0123456789" * 100
+        self.run_async(self.storage.put("images/ab/abc.jpg", io.BytesIO(data), len(data), "image/jpeg"))
+
+        self.assertTrue(self.run_async(self.storage.exists("images/ab/abc.jpg")))
+        self.assertEqual(self.run_async(self.storage.stat("images/ab/abc.jpg")).size, len(data))
+        self.assertEqual(self.run_async(self.storage.read_range("images/ab/abc.jpg", 10, 5)), b"01234")
+
+        out = io.BytesIO()
+        self.run_async(self.storage.download_to("images/ab/abc.jpg", out))
+        self.assertEqual(out.tell(), 0)
+        self.assertEqual(out.read(), data)
+        self.assertEqual(self.storage.public_url("images/ab/abc.jpg"), "http://cdn.test/media/images/ab/abc.jpg")
+
+    def test_put_reads_only_length(self):
+        self.run_async(self.storage.put("a.jpg", io.BytesIO(b"abcdef"), 3, "image/jpeg"))
+        self.assertEqual(self.run_async(self.storage.stat("a.jpg")).size, 3)
+
+    def test_missing_and_remove(self):
+        with self.assertRaises(ObjectNotFound):
+            self.run_async(self.storage.stat("missing.jpg"))
+        self.assertFalse(self.run_async(self.storage.exists("missing.jpg")))
+
+        self.run_async(self.storage.put("a.jpg", io.BytesIO(b"x"), 1, "image/jpeg"))
+        self.run_async(self.storage.remove("a.jpg"))
+        self.assertFalse(self.run_async(self.storage.exists("a.jpg")))
+        # Removing twice is not an error
+        self.run_async(self.storage.remove("a.jpg"))
+
+    def test_rejects_keys_outside_root(self):
+        with self.assertRaises(ValueError):
+            self.run_async(self.storage.put("../escape.jpg", io.BytesIO(b"x"), 1, "image/jpeg"))
+
+    def test_put_is_timed(self):
+        before = storage_latency.count(backend="local", operation="put")
+        self.run_async(self.storage.put("a.jpg", io.BytesIO(b"x"), 1, "image/jpeg"))
+        self.assertEqual(storage_latency.count(backend="local", operation="put"), before + 1)
+
+
+class FlakyStorage(LocalFileStorage):
+    def __init__(self, root, failures, delay=0):
+        super().__init__(root)
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+
+    async def initialize(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.calls <= self.failures:
+            raise ConnectionError("storage unavailable")
+
+
+class TestInitStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        storage_module.set_storage(None)
+        self.tmp.cleanup()
+
+    def test_retries_until_ready(self):
+        storage = FlakyStorage(self.tmp.name, failures=2)
+        storage_module.set_storage(storage)
+        self.assertTrue(asyncio.run(init_storage(attempts=3, timeout=1, backoff=0)))
+        self.assertEqual(storage.calls, 3)
+        self.assertTrue(storage_module.storage_ready())
+
+    def test_gives_up_after_attempts(self):
+        storage = FlakyStorage(self.tmp.name, failures=5)
+        storage_module.set_storage(storage)
+        self.assertFalse(asyncio.run(init_storage(attempts=2, timeout=1, backoff=0)))
+        self.assertEqual(storage.calls, 2)
+        self.assertFalse(storage_module.storage_ready())
+
+    def test_attempt_timeout(self):
+        storage = FlakyStorage(self.tmp.name, failures=0, delay=1)
+        storage_module.set_storage(storage)
+        self.assertFalse(asyncio.run(init_storage(attempts=1, timeout=0.01, backoff=0)))
+
+    def test_keeps_retrying_without_attempt_limit(self):
+        storage = FlakyStorage(self.tmp.name, failures=8)
+        storage_module.set_storage(storage)
+        self.assertTrue(asyncio.run(init_storage(attempts=0, timeout=1, backoff=0)))
+        self.assertEqual(storage.calls, 9)
+
+    def test_slow_attempt_is_awaited_not_restarted(self):
+        storage = FlakyStorage(self.tmp.name, failures=0, delay=0.1)
+        storage_module.set_storage(storage)
+        self.assertTrue(asyncio.run(init_storage(attempts=0, timeout=0.01, backoff=0)))
+        self.assertEqual(storage.calls, 1)
+
+
+class TestMetrics(unittest.TestCase):
+    def test_counter(self):
+        counter = Counter("test_requests", "Test requests", labelnames=("status",))
+        counter.inc(status="ok")
+        counter.inc(2, status="ok")
+        self.assertEqual(counter.value(status="ok"), 3)
+        self.assertEqual(counter.value(status="error"), 0)
+        self.assertIn('test_requests_total{status="ok"} 3', render_metrics())
+
+    def test_histogram(self):
+        histogram = Histogram("test_latency_seconds", "Test latency", labelnames=("op",), buckets=(0.1, 1))
+        histogram.observe(0.05, op="get")
+        histogram.observe(0.5, op="get")
+        histogram.observe(5, op="get")
+
+        text = render_metrics()
+        self.assertIn("# TYPE test_latency_seconds histogram", text)
+        self.assertIn('test_latency_seconds_bucket{op="get",le="0.1"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{op="get",le="1"} 2', text)
+        self.assertIn('test_latency_seconds_bucket{op="get",le="+Inf"} 3', text)
+        self.assertIn('test_latency_seconds_count{op="get"} 3', text)
+
+    def test_histogram_time_records_on_error(self):
+        histogram = Histogram("test_block_seconds", "Test block")
+        with self.assertRaises(RuntimeError):
+            with histogram.time():
+                raise RuntimeError()
+        self.assertEqual(histogram.count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
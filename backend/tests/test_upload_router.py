@@ -0,0 +1,295 @@
+import asyncio
+import hashlib
+import io
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from PIL import Image
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from src.apps.interactions.models import Comment  # noqa: F401
+from src.apps.posts.models import Post  # noqa: F401
+from src.apps.tags.models import post_tags  # noqa: F401
+from src.apps.upload import cache, router, service
+from src.apps.upload.jobs import UploadJob, UploadJobQueue
+from src.apps.upload.models import ImageAsset
+from src.core import deps
+from src.core.config import settings
+from src.core.security import create_upload_token
+from src.database.base import Base
+from src.database.session import get_db
+from src.utils import storage
+from src.utils.storage import LocalFileStorage
+
+
+class _Jobs:
+    def __init__(self):
+        self.submitted = []
+        self.room = True
+
+    def full(self):
+        return not self.room
+
+    async def submit(self, job):
+        if not self.room:
+            return False
+        self.submitted.append(job)
+        return True
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 24), "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest_asyncio.fixture
+async def upload_app(fake_redis, tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with async_session() as db:
+            yield db
+
+    # Requests run as whoever `user.id` names at the time
+    user = SimpleNamespace(id="alice")
+    jobs = _Jobs()
+    monkeypatch.setattr(router, "upload_jobs", jobs)
+    store = LocalFileStorage(str(tmp_path / "media"))
+    storage.set_storage(store)
+
+    app = FastAPI()
+    app.include_router(router.router, prefix="/upload")
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[deps.get_current_user] = lambda: user
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield SimpleNamespace(client=client, user=user, jobs=jobs, storage=store, session=async_session)
+
+    storage.set_storage(None)
+    await engine.dispose()
+
+
+async def _store(store, key: str, data: bytes = None):
+    data = data or _png()
+    await store.put(key, io.BytesIO(data), len(data), "image/png")
+
+
+@pytest.mark.asyncio
+async def test_upload_results_are_visible_to_the_uploader_only(upload_app):
+    await cache.set_result("alice", "abc", {"status": "done", "suggested_tags": ["cat"]})
+
+    response = await upload_app.client.get("/upload/abc/status")
+    assert response.status_code == 200
+    assert response.json()["suggested_tags"] == ["cat"]
+    assert (await upload_app.client.get("/upload/result/images/ab/abc.png")).status_code == 200
+
+    upload_app.user.id = "bob"
+    assert (await upload_app.client.get("/upload/abc/status")).status_code == 404
+    assert (await upload_app.client.get("/upload/result/images/ab/abc.png")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_complete_is_idempotent_per_token(upload_app):
+    token = create_upload_token("alice", "uploads/photo.png", timedelta(minutes=5))
+
+    # A failed completion can be retried with the same token
+    response = await upload_app.client.post("/upload/complete", json={"upload_token": token})
+    assert response.status_code == 404
+    assert upload_app.jobs.submitted == []
+
+    await _store(upload_app.storage, "uploads/photo.png")
+    first = await upload_app.client.post("/upload/complete", json={"upload_token": token})
+    assert first.status_code == 200
+    assert first.json()["width"] == 32
+
+    replay = await upload_app.client.post("/upload/complete", json={"upload_token": token})
+    assert replay.status_code == 200
+    assert replay.json() == first.json()
+    assert len(upload_app.jobs.submitted) == 1
+    assert upload_app.jobs.submitted[0].user_id == "alice"
+
+
+@pytest.mark.asyncio
+async def test_hashed_upload_is_verified_by_its_job(upload_app, monkeypatch):
+    async def tags(model_input):
+        return ["red"]
+
+    monkeypatch.setattr(service, "get_image_tags", tags)
+    monkeypatch.setattr(service, "SessionLocal", upload_app.session)
+    data = _png()
+    sha256 = hashlib.sha256(data).hexdigest()
+    key = service.content_key(sha256, "image/png")
+
+    async def run(job):
+        await service.postprocess_upload(job.object_key, job.size, job.content_type, job.user_id, job.sha256)
+
+    async def no_download(*args):
+        raise AssertionError("/complete must only read the header")
+
+    # /complete reads the header alone; the job downloads the object once
+    await _store(upload_app.storage, "uploads/good.png", data)
+    token = create_upload_token("alice", "uploads/good.png", timedelta(minutes=5), sha256)
+    with monkeypatch.context() as m:
+        m.setattr(upload_app.storage, "download_to", no_download)
+        response = await upload_app.client.post("/upload/complete", json={"upload_token": token})
+    assert response.status_code == 200
+    assert response.json()["key"] == key
+    assert response.json()["upload_id"] == sha256
+    assert not await upload_app.storage.exists(key)
+
+    job = upload_app.jobs.submitted[-1]
+    assert job.object_key == "uploads/good.png"
+    await run(job)
+    assert await upload_app.storage.exists(key)
+    assert not await upload_app.storage.exists("uploads/good.png")
+    assert (await cache.get_result("alice", sha256))["suggested_tags"] == ["red"]
+    async with upload_app.session() as db:
+        assert (await db.get(ImageAsset, sha256)).object_key == key
+
+    # Bytes that don't match the hash never reach the content key
+    wrong = "0" * 64
+    await _store(upload_app.storage, "uploads/bad.png", data)
+    token = create_upload_token("alice", "uploads/bad.png", timedelta(minutes=5), wrong)
+    response = await upload_app.client.post("/upload/complete", json={"upload_token": token})
+    assert response.status_code == 200
+    await run(upload_app.jobs.submitted[-1])
+    assert not await upload_app.storage.exists("uploads/bad.png")
+    assert not await upload_app.storage.exists(service.content_key(wrong, "image/png"))
+    assert (await cache.get_result("alice", wrong))["status"] == "failed"
+
+
+@pytest.mark.asyncio
+async def test_presign_is_refused_without_direct_upload_support(upload_app):
+    response = await upload_app.client.post("/upload/presign", json={
+        "filename": "photo.png", "content_type": "image/png", "size": 100,
+    })
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_local_objects_are_served(tmp_path, monkeypatch):
+    pytest.importorskip("nanoid")  # the full app's dependencies
+    from src.main import create_app
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(settings, "STORAGE_LOCAL_ROOT", str(tmp_path))
+    store = LocalFileStorage(str(tmp_path), settings.STORAGE_LOCAL_BASE_URL)
+    await _store(store, "images/ab/photo.png")
+
+    app = create_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(store.public_url("images/ab/photo.png"))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+
+
+@pytest.mark.asyncio
+async def test_full_job_queue_refuses_completion(upload_app):
+    await _store(upload_app.storage, "uploads/photo.png")
+    token = create_upload_token("alice", "uploads/photo.png", timedelta(minutes=5))
+
+    upload_app.jobs.room = False
+    response = await upload_app.client.post("/upload/complete", json={"upload_token": token})
+    assert response.status_code == 503
+
+    upload_app.jobs.room = True
+    response = await upload_app.client.post("/upload/complete", json={"upload_token": token})
+    assert response.status_code == 200
+    assert len(upload_app.jobs.submitted) == 1
+
+
+@pytest.mark.asyncio
+async def test_deduplicated_upload_has_a_status(upload_app):
+    data = _png()
+    sha256 = hashlib.sha256(data).hexdigest()
+    async with upload_app.session() as db:
+        db.add(ImageAsset(
+            sha256=sha256, object_key=service.content_key(sha256, "image/png"), content_type="image/png",
+            size=len(data), width=32, height=24, tags=["red"], renditions={},
+        ))
+        await db.commit()
+
+    response = await upload_app.client.post(
+        "/upload/image", files={"file": ("photo.png", data, "image/png")}
+    )
+    assert response.status_code == 200
+    assert response.json()["status"] == "done"
+    assert upload_app.jobs.submitted == []
+
+    status = await upload_app.client.get(f"/upload/{sha256}/status")
+    assert status.status_code == 200
+    assert status.json()["suggested_tags"] == ["red"]
+
+
+@pytest.mark.asyncio
+async def test_job_queue_refuses_jobs_when_full(fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_JOB_WORKERS", 1)
+    monkeypatch.setattr(settings, "UPLOAD_JOB_QUEUE_SIZE", 1)
+    release = asyncio.Event()
+
+    async def postprocess(*args):
+        await release.wait()
+
+    monkeypatch.setattr(service, "postprocess_upload", postprocess)
+    jobs = UploadJobQueue()
+
+    def job(n):
+        return UploadJob(upload_id=str(n), object_key=f"{n}.png", size=1, content_type="image/png", user_id="alice")
+
+    try:
+        assert await jobs.submit(job(1))
+        await asyncio.sleep(0.01)  # taken by the only worker
+        assert await jobs.submit(job(2))
+        assert not await jobs.submit(job(3))
+        assert await cache.get_result("alice", "3") is None
+    finally:
+        release.set()
+        await jobs.stop()
+
+
+@pytest.mark.asyncio
+async def test_uploads_of_a_pending_file_share_its_job(upload_app, monkeypatch):
+    release = asyncio.Event()
+    tagged = []
+
+    async def tags(model_input):
+        tagged.append(model_input)
+        await release.wait()
+        return ["red"]
+
+    monkeypatch.setattr(service, "get_image_tags", tags)
+    monkeypatch.setattr(service, "SessionLocal", upload_app.session)
+    jobs = UploadJobQueue()
+    monkeypatch.setattr(router, "upload_jobs", jobs)
+    data = _png()
+    sha256 = hashlib.sha256(data).hexdigest()
+
+    async def result(user_id):
+        for _ in range(200):
+            found = await cache.get_result(user_id, sha256)
+            if found and found["status"] in ("done", "failed"):
+                return found
+            await asyncio.sleep(0.01)
+
+    try:
+        # Both before the first job has recorded an asset
+        for user_id in ("alice", "bob"):
+            upload_app.user.id = user_id
+            response = await upload_app.client.post(
+                "/upload/image", files={"file": ("photo.png", data, "image/png")}
+            )
+            assert response.json()["status"] == "processing"
+        release.set()
+        assert (await result("alice"))["suggested_tags"] == ["red"]
+        assert (await result("bob"))["suggested_tags"] == ["red"]
+    finally:
+        release.set()
+        await jobs.stop()
+    assert len(tagged) == 1
@@ -0,0 +1,31 @@
+import unittest
+from datetime import timedelta
+
+from jose import JWTError, jwt
+
+from src.core.config import settings
+from src.core.security import create_access_token, create_upload_token, decode_upload_token
+
+
+class TestUploadToken(unittest.TestCase):
+    def test_round_trip(self):
+        token = create_upload_token("user-1", "abc.jpg", timedelta(minutes=5))
+        claims = decode_upload_token(token)
+        self.assertEqual(claims["sub"], "user-1")
+        self.assertEqual(claims["key"], "abc.jpg")
+
+    def test_expired(self):
+        token = create_upload_token("user-1", "abc.jpg", timedelta(seconds=-1))
+        with self.assertRaises(JWTError):
+            decode_upload_token(token)
+
+    def test_not_interchangeable_with_access_tokens(self):
+        upload_token = create_upload_token("user-1", "abc.jpg", timedelta(minutes=5))
+        with self.assertRaises(JWTError):
+            jwt.decode(upload_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        with self.assertRaises(JWTError):
+            decode_upload_token(create_access_token("user-1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
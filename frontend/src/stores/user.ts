@@ -85,6 +85,11 @@ export const useUserStore = defineStore('user', () => {
       }
     };
 
+    // Server could not replay everything missed while disconnected: refetch
+    eventSource.addEventListener('resync', () => {
+      fetchUnreadCount();
+    });
+
     eventSource.onerror = (err) => {
       console.error('SSE Error:', err);
       // Browser handles reconnection automatically for network errors.